@@ -7,19 +7,34 @@
 
 from flask import Flask, request, jsonify, session
 from flask_cors import CORS
-import pymysql
 from datetime import datetime, date, timedelta
 import json
 
 # 导入配置
 from config import config
 
+# 导入数据库连接池（所有Blueprint共用）
+from db_pool import get_pool_stats
+
+# 导入响应压缩
+from compression import compress_response
+
+# 导入请求指标中间件
+from request_metrics import init_request_metrics
+
+# 导入SQL追踪
+from sql_tracer import init_sql_tracer
+
+# 导入统计缓存预热
+from stats_warmer import init_stats_warmer
+
 # 导入移动端API模块
 from mobile_auth_api import mobile_auth_bp
 from mobile_customer_api import mobile_customer_bp
 from mobile_order_api import mobile_order_bp
 from mobile_statistics_api import mobile_statistics_bp
 from mobile_log_api import mobile_log_bp
+from mobile_metrics_api import mobile_metrics_bp
 
 # 创建Flask应用
 app = Flask(__name__)
@@ -28,13 +43,14 @@ app.secret_key = config.SECRET_KEY
 # 配置CORS
 CORS(app, supports_credentials=config.CORS_SUPPORTS_CREDENTIALS, origins=config.CORS_ORIGINS)
 
-# 数据库配置
-DB_CONFIG = config.DB_CONFIG.copy()
-DB_CONFIG['cursorclass'] = pymysql.cursors.DictCursor
+# 请求指标（需在其它after_request之前注册，最后执行）
+init_request_metrics(app)
+
+# SQL追踪与慢查询日志
+init_sql_tracer(app)
 
-def get_db_connection():
-    """获取数据库连接"""
-    return pymysql.connect(**DB_CONFIG)
+# 统计缓存预热（第一个请求时在当前worker启动后台线程）
+init_stats_warmer(app)
 
 def json_serial(obj):
     """JSON序列化日期时间对象"""
@@ -48,6 +64,7 @@ app.register_blueprint(mobile_customer_bp)
 app.register_blueprint(mobile_order_bp)
 app.register_blueprint(mobile_statistics_bp)
 app.register_blueprint(mobile_log_bp)
+app.register_blueprint(mobile_metrics_bp)
 
 # 健康检查接口
 @app.route('/api/mobile/health', methods=['GET'])
@@ -57,7 +74,8 @@ def health_check():
         'success': True,
         'service': 'mobile-erp-backend',
         'status': 'running',
-        'timestamp': datetime.now().isoformat()
+        'timestamp': datetime.now().isoformat(),
+        'db_pool': get_pool_stats()
     }), 200
 
 # 错误处理
@@ -86,9 +104,9 @@ def log_request():
 
 @app.after_request
 def after_request(response):
-    """添加响应头"""
+    """添加响应头并按需压缩"""
     response.headers['X-Service'] = 'mobile-erp-backend'
-    return response
+    return compress_response(response)
 
 if __name__ == '__main__':
     # 生产环境使用gunicorn或uwsgi运行，这里仅用于开发测试
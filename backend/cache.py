@@ -0,0 +1,115 @@
+# -*- coding: utf-8 -*-
+"""
+移动端进程内缓存
+提供带过期时间的线程安全缓存，以及基于数据版本号的跨进程失效判断
+
+数据版本号保存在tenant_data_versions表，由orders/customers上的触发器在数据变化时递增
+（见order_rollups.py），缓存项记录写入时的版本号，版本变化即视为失效，
+这样PC端或其它worker写入数据后，本进程的缓存也能及时失效。
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+
+class TTLCache:
+    """
+    线程安全的TTL缓存（超出容量时淘汰最久未使用的项）
+
+    键约定为元组，且第一个元素为租户ID，便于按租户失效。
+
+    参数：
+        ttl: 默认过期秒数
+        max_entries: 最大缓存项数
+    """
+
+    def __init__(self, ttl=60, max_entries=10000):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._data = OrderedDict()
+        self._hits = 0
+        self._misses = 0
+
+    def get(self, key, default=None):
+        """读取缓存，过期或不存在时返回default"""
+        now = time.monotonic()
+        with self._lock:
+            item = self._data.get(key)
+            if item is None or item[0] <= now:
+                if item is not None:
+                    del self._data[key]
+                self._misses += 1
+                return default
+            self._data.move_to_end(key)
+            self._hits += 1
+            return item[1]
+
+    def set(self, key, value, ttl=None):
+        """写入缓存"""
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        """删除单个缓存项"""
+        with self._lock:
+            self._data.pop(key, None)
+
+    def invalidate_tenant(self, tenant_id, scope=None):
+        """
+        失效指定租户的缓存
+
+        参数：
+            tenant_id: 租户ID（键的第一个元素）
+            scope: 只失效第二个元素等于scope的键，默认失效该租户全部缓存
+        """
+        with self._lock:
+            keys = [
+                key for key in self._data
+                if key[0] == tenant_id and (scope is None or (len(key) > 1 and key[1] == scope))
+            ]
+            for key in keys:
+                del self._data[key]
+        return len(keys)
+
+    def clear(self):
+        """清空缓存"""
+        with self._lock:
+            self._data.clear()
+
+    def stats(self):
+        """缓存统计"""
+        with self._lock:
+            return {
+                'entries': len(self._data),
+                'hits': self._hits,
+                'misses': self._misses
+            }
+
+
+# ============================================================
+# 数据版本号
+# ============================================================
+
+def get_data_versions(cursor, tenant_id):
+    """
+    读取租户的数据版本号（主键范围查询，各分桶求和，见order_rollups.py）
+
+    返回：
+        dict: {'orders': 12, 'customers': 3}，没有记录的范围视为0
+    """
+    cursor.execute("""
+        SELECT scope, SUM(version) as version
+        FROM tenant_data_versions
+        WHERE company_id = %s
+        GROUP BY scope
+    """, (tenant_id,))
+    versions = {'orders': 0, 'customers': 0}
+    for row in cursor.fetchall():
+        versions[row['scope']] = int(row['version'])
+    return versions
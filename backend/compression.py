@@ -0,0 +1,126 @@
+# -*- coding: utf-8 -*-
+"""
+移动端响应压缩
+根据Accept-Encoding协商gzip/brotli压缩，小于阈值的响应不压缩；
+流式响应逐块压缩并立即刷出，不会把整个响应缓冲到内存
+"""
+
+import gzip
+import time
+import zlib
+
+from flask import request
+
+from config import config
+from metrics import registry
+
+# brotli为可选依赖，未安装时只使用gzip
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# 可压缩的响应类型
+COMPRESSIBLE_MIMETYPES = {
+    'application/json',
+    'application/javascript',
+    'text/plain',
+    'text/html',
+    'text/css',
+    'text/csv'
+}
+
+
+def _choose_encoding(streamed):
+    """按客户端Accept-Encoding选择压缩算法（流式响应只使用gzip）"""
+    candidates = ['gzip'] if streamed or brotli is None else ['br', 'gzip']
+    return request.accept_encodings.best_match(candidates)
+
+
+def _record(encoding, size_in, size_out, cpu_seconds):
+    """记录压缩指标（压缩率 = bytes_out / bytes_in）"""
+    registry.inc('compression_responses_total', encoding=encoding)
+    registry.inc('compression_bytes_in_total', size_in, encoding=encoding)
+    registry.inc('compression_bytes_out_total', size_out, encoding=encoding)
+    registry.inc('compression_cpu_seconds_total', cpu_seconds, encoding=encoding)
+
+
+def _compress_stream(chunks, level):
+    """逐块gzip压缩，每块后SYNC_FLUSH，客户端可以边收边解压"""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)  # 31 = gzip头
+    size_in = size_out = 0
+    cpu_seconds = 0.0
+    try:
+        for chunk in chunks:
+            if isinstance(chunk, str):
+                chunk = chunk.encode('utf-8')
+            if not chunk:
+                continue
+            started = time.thread_time()
+            out = compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)
+            cpu_seconds += time.thread_time() - started
+            size_in += len(chunk)
+            size_out += len(out)
+            yield out
+        tail = compressor.flush(zlib.Z_FINISH)
+        size_out += len(tail)
+        yield tail
+    finally:
+        close = getattr(chunks, 'close', None)
+        if close is not None:
+            close()
+        _record('gzip', size_in, size_out, cpu_seconds)
+
+
+def compress_response(response):
+    """
+    按需压缩响应（在app.after_request中调用）
+
+    跳过：未启用、非2xx/204、已有Content-Encoding、direct_passthrough（文件发送）、
+    不可压缩的类型、小于COMPRESS_MIN_SIZE的响应
+    """
+    if not config.COMPRESS_ENABLED:
+        return response
+
+    if response.status_code < 200 or response.status_code >= 300 or response.status_code == 204:
+        return response
+
+    if response.direct_passthrough or 'Content-Encoding' in response.headers:
+        return response
+
+    if response.mimetype not in COMPRESSIBLE_MIMETYPES:
+        return response
+
+    # 可压缩的响应都声明Vary，避免中间缓存把压缩内容发给不支持的客户端
+    response.vary.add('Accept-Encoding')
+
+    streamed = response.is_streamed
+    encoding = _choose_encoding(streamed)
+    if not encoding:
+        return response
+
+    if streamed:
+        response.response = _compress_stream(response.response, config.COMPRESS_LEVEL)
+        response.headers['Content-Encoding'] = 'gzip'
+        response.headers.pop('Content-Length', None)
+        return response
+
+    data = response.get_data()
+    if len(data) < config.COMPRESS_MIN_SIZE:
+        return response
+
+    started = time.thread_time()
+    if encoding == 'br':
+        compressed = brotli.compress(data, quality=config.COMPRESS_BROTLI_QUALITY)
+    else:
+        compressed = gzip.compress(data, compresslevel=config.COMPRESS_LEVEL, mtime=0)
+    cpu_seconds = time.thread_time() - started
+
+    _record(encoding, len(data), len(compressed), cpu_seconds)
+
+    if len(compressed) >= len(data):
+        return response
+
+    response.set_data(compressed)
+    response.headers['Content-Encoding'] = encoding
+    return response
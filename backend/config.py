@@ -27,6 +27,89 @@ class Config:
         'cursorclass': 'DictCursor'
     }
     
+    # 数据库连接池配置（每个worker进程一个连接池）
+    DB_POOL_MIN_SIZE = int(os.environ.get('DB_POOL_MIN_SIZE', 2))
+    DB_POOL_MAX_SIZE = int(os.environ.get('DB_POOL_MAX_SIZE', 10))
+    DB_POOL_MAX_IDLE_SECONDS = 300       # 空闲超过5分钟的连接回收（保留最少连接数）
+    DB_POOL_MAX_LIFETIME_SECONDS = 3600  # 单个连接最长存活1小时，避开MySQL wait_timeout
+    DB_POOL_PING_AFTER_SECONDS = 5       # 借出时空闲超过5秒的连接先ping检查
+    DB_POOL_TIMEOUT = 10                 # 连接池耗尽时最长等待秒数
+    
+    # 列表总数缓存配置
+    COUNT_CACHE_TTL = 60                 # 总数缓存秒数（数据版本变化时立即失效）
+    COUNT_CACHE_MAX_ENTRIES = 10000
+    APPROXIMATE_COUNT_THRESHOLD = 10000  # approximate_total模式下，估算超过该值时直接返回估算值
+    
+    # 统计结果缓存配置（统计数据允许延迟5分钟，见ARCHITECTURE.md）
+    STATS_CACHE_TTL = 300
+    STATS_CACHE_MAX_ENTRIES = 10000
+    TREND_MAX_DAYS = 1096                # 趋势接口单次最长日期范围（3年）
+    
+    # 区间统计前缀和配置（每个worker在内存中按租户保存）
+    RANGE_STATS_MAX_TENANTS = 1000
+    RANGE_STATS_REFRESH_SECONDS = 5      # 增量拉取daily_order_summary变化的最短间隔
+    RANGE_STATS_REFRESH_OVERLAP_SECONDS = 60  # 增量拉取时回看的秒数
+    RANGE_STATS_FULL_RELOAD_SECONDS = 3600    # 全量重新加载间隔
+    RANGE_STATS_HORIZON_DAYS = 1830      # 保存每日值的天数（约5年），更早的日期只保存合计
+    
+    # 客户搜索索引配置（每个worker在内存中按租户保存，见search_index.py）
+    SEARCH_INDEX_MAX_TENANTS = 200
+    SEARCH_INDEX_REFRESH_OVERLAP_SECONDS = 60  # 增量同步时回看的秒数
+    SEARCH_INDEX_FULL_RELOAD_SECONDS = 3600    # 全量重建间隔
+    SEARCH_INDEX_MAX_IN_IDS = 2000       # 客户列表关键词匹配超过该数量时改用LIKE筛选
+    SUGGEST_CACHED_PREFIX_LENGTH = 2     # 客户输入联想缓存排序结果的最长前缀（字符数）
+    SUGGEST_MAX_LIMIT = 50               # 客户输入联想单次最多返回数量
+    SEARCH_INDEX_PINYIN = True           # 为客户名称生成全拼和首字母（需要安装pypinyin，见下方可选依赖）
+    ORDER_SEARCH_MAX_CUSTOMERS = 200     # 订单搜索按客户名称匹配时最多使用的客户数
+    ORDER_SEARCH_TIMEOUT_MS = 300        # 订单搜索单条SQL的执行时间上限（MAX_EXECUTION_TIME）
+    
+    # 每日指标文件目录（由metric_store.py生成，存在某公司的文件时区间统计直接读取文件）
+    METRIC_STORE_DIR = os.environ.get('METRIC_STORE_DIR') or '/var/lib/mobile-erp/metric_store'
+    METRIC_STORE_MIN_ORDERS = 50000      # build未指定公司时，为订单数达到该值的公司生成文件
+    
+    # 统计缓存预热配置（每个worker一个后台线程）
+    STATS_WARMER_ENABLED = os.environ.get('STATS_WARMER_ENABLED', '1') == '1'
+    STATS_WARMER_ACTIVE_DAYS = 7         # 最近N天登录过的公司视为活跃
+    STATS_WARMER_MAX_TENANTS = 500       # 最多预热的公司数
+    STATS_WARMER_PEAK_TIMES = ['08:30', '13:30', '18:00']  # 使用高峰开始时间
+    STATS_WARMER_LEAD_MINUTES = 10       # 提前多少分钟预热
+    STATS_WARMER_JITTER_SECONDS = 300    # 高峰预热在该时间内随机错开
+    STATS_WARMER_EVENT_JITTER_SECONDS = 30    # 订单变化后的重新预热在该时间内随机错开
+    STATS_WARMER_MIN_INTERVAL_SECONDS = 120   # 同一公司两次预热的最短间隔
+    STATS_WARMER_POLL_SECONDS = 20       # 轮询间隔
+    
+    # 并发查询线程池大小（每个worker进程一个，每个任务占用一个数据库连接）
+    PARALLEL_MAX_WORKERS = 8
+    
+    # 相同统计请求合并（同一worker内并发的相同GET请求只计算一次）
+    SINGLE_FLIGHT_ENABLED = True
+    SINGLE_FLIGHT_TIMEOUT = 30           # 等待进行中请求的最长时间（秒），超时后自行计算
+    
+    # 批量订单详情单次最多订单数
+    ORDER_BATCH_MAX_SIZE = 50
+    
+    # 可选依赖（未安装时对应功能降级）：
+    #   brotli   - 响应brotli压缩，未安装时只使用gzip
+    #   pypinyin - 客户输入联想按拼音匹配（SEARCH_INDEX_PINYIN），未安装时只按原文匹配，启动时打印警告
+    
+    # 响应压缩配置（brotli需安装brotli包，未安装时只使用gzip）
+    COMPRESS_ENABLED = True
+    COMPRESS_MIN_SIZE = 1024             # 小于1KB的响应不压缩
+    COMPRESS_LEVEL = 6                   # gzip压缩级别（1-9）
+    COMPRESS_BROTLI_QUALITY = 4          # brotli压缩质量（0-11），兼顾CPU开销
+    
+    # 监控指标配置（多worker通过METRICS_DIR下的快照文件合并）
+    METRICS_DIR = os.environ.get('METRICS_DIR') or '/tmp/mobile-erp-metrics'
+    METRICS_FLUSH_INTERVAL = 10          # worker快照写盘间隔（秒）
+    METRICS_TOKEN = os.environ.get('METRICS_TOKEN')  # /api/mobile/metrics访问令牌
+    
+    # SQL追踪与慢查询日志配置
+    SLOW_QUERY_THRESHOLD_MS = int(os.environ.get('SLOW_QUERY_THRESHOLD_MS', 200))
+    SLOW_QUERY_LOG = os.environ.get('SLOW_QUERY_LOG') or '/var/log/mobile-erp/slow_queries.jsonl'
+    SLOW_QUERY_LOG_MAX_BYTES = 50 * 1024 * 1024  # 超过50MB轮转
+    SLOW_QUERY_EXPLAIN = os.environ.get('SLOW_QUERY_EXPLAIN', '0') == '1'  # 慢查询附带EXPLAIN（额外一次查询）
+    SQL_TIMELINE_MAX_ENTRIES = 200       # 单个请求最多记录的SQL条数
+    
     # CORS配置
     CORS_ORIGINS = [
         'http://m.erp.xnamb.cn',
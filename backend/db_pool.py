@@ -0,0 +1,399 @@
+# -*- coding: utf-8 -*-
+"""
+移动端数据库连接池
+所有Blueprint共用的线程安全MySQL连接池，避免每个请求重新建立TCP连接和认证握手
+"""
+
+import os
+import time
+import threading
+from collections import deque
+
+import pymysql
+from pymysql.constants import SERVER_STATUS
+
+from config import config
+
+
+class PoolExhaustedError(Exception):
+    """连接池已满且等待超时"""
+    pass
+
+
+class _PoolEntry:
+    """连接池中的一条物理连接及其元数据"""
+
+    __slots__ = ('raw', 'created_at', 'last_used_at')
+
+    def __init__(self, raw):
+        now = time.monotonic()
+        self.raw = raw
+        self.created_at = now
+        self.last_used_at = now
+
+
+# ============================================================
+# SQL执行监听
+# ============================================================
+
+# 监听函数签名：listener(kind, statement, params, seconds, cursor)
+#   kind: execute|executemany|callproc|fetch
+_execute_listeners = []
+
+
+def add_execute_listener(listener):
+    """注册SQL执行监听函数（用于统计数据库耗时、慢查询追踪等）"""
+    if listener not in _execute_listeners:
+        _execute_listeners.append(listener)
+
+
+def _notify(kind, statement, params, seconds, cursor):
+    for listener in _execute_listeners:
+        try:
+            listener(kind, statement, params, seconds, cursor)
+        except Exception as e:
+            print(f"[DB Pool] SQL监听函数执行失败: {e}")
+
+
+class TracedCursor:
+    """
+    计时游标代理
+
+    execute/executemany/callproc/fetch*计时后通知监听函数，其余属性透传给pymysql游标
+    """
+
+    def __init__(self, cursor):
+        self._cursor = cursor
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+    def __iter__(self):
+        return iter(self._cursor)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self._cursor.close()
+
+    def _timed(self, kind, statement, params, func, *args):
+        started = time.perf_counter()
+        try:
+            return func(*args)
+        finally:
+            _notify(kind, statement, params, time.perf_counter() - started, self._cursor)
+
+    def execute(self, query, args=None):
+        return self._timed('execute', query, args, self._cursor.execute, query, args)
+
+    def executemany(self, query, args):
+        return self._timed('executemany', query, args, self._cursor.executemany, query, args)
+
+    def callproc(self, procname, args=()):
+        return self._timed('callproc', procname, args, self._cursor.callproc, procname, args)
+
+    def fetchone(self):
+        return self._timed('fetch', None, None, self._cursor.fetchone)
+
+    def fetchmany(self, size=None):
+        return self._timed('fetch', None, None, self._cursor.fetchmany, size)
+
+    def fetchall(self):
+        return self._timed('fetch', None, None, self._cursor.fetchall)
+
+
+class PooledConnection:
+    """
+    借出的连接代理
+
+    用法与pymysql连接一致，close()时归还连接池而不是真正断开，
+    未提交的事务会在归还前回滚，保证下一个使用者拿到干净的连接。
+    """
+
+    def __init__(self, pool, entry):
+        self._pool = pool
+        self._entry = entry
+
+    def __getattr__(self, name):
+        entry = self.__dict__.get('_entry')
+        if entry is None:
+            raise pymysql.err.InterfaceError(0, '连接已归还连接池')
+        return getattr(entry.raw, name)
+
+    def cursor(self, cursor=None):
+        """创建游标（参数与pymysql.Connection.cursor一致）"""
+        if self._entry is None:
+            raise pymysql.err.InterfaceError(0, '连接已归还连接池')
+        raw_cursor = self._entry.raw.cursor(cursor)
+        return TracedCursor(raw_cursor) if _execute_listeners else raw_cursor
+
+    def close(self):
+        """归还连接到连接池，可重复调用"""
+        entry, self._entry = self._entry, None
+        if entry is not None:
+            self._pool._release(entry)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+class ConnectionPool:
+    """
+    线程安全的MySQL连接池
+
+    参数：
+        db_config: pymysql.connect参数
+        min_size: 最少保留的空闲连接数（空闲回收不会低于该值）
+        max_size: 最大连接数（含已借出）
+        max_idle_seconds: 空闲超过该时长的连接被回收
+        max_lifetime_seconds: 单个连接最长存活时间，超过后在归还/借出时关闭
+        ping_after_seconds: 借出时若连接空闲超过该时长，先ping检查健康
+        timeout: 连接池耗尽时等待可用连接的最长秒数
+    """
+
+    def __init__(self, db_config, min_size=2, max_size=10, max_idle_seconds=300,
+                 max_lifetime_seconds=3600, ping_after_seconds=5, timeout=10):
+        self.db_config = db_config
+        self.min_size = min_size
+        self.max_size = max(max_size, 1)
+        self.max_idle_seconds = max_idle_seconds
+        self.max_lifetime_seconds = max_lifetime_seconds
+        self.ping_after_seconds = ping_after_seconds
+        self.timeout = timeout
+
+        self._cond = threading.Condition(threading.Lock())
+        self._reset_state()
+
+    def _reset_state(self):
+        """初始化（或fork后重置）连接池状态"""
+        self._pid = os.getpid()
+        self._idle = deque()
+        self._size = 0
+        self._stats = {
+            'created': 0,
+            'reused': 0,
+            'recycled': 0,
+            'discarded': 0,
+            'ping_failures': 0,
+            'waits': 0,
+            'timeouts': 0,
+            'wait_seconds': 0.0
+        }
+
+    def _check_pid(self):
+        """
+        检测是否在fork出的新worker进程中
+
+        gunicorn等预fork模型下，父进程的socket不能跨进程共用，
+        这里直接丢弃继承来的连接（不发送QUIT，避免影响父进程），每个worker维护自己的连接池。
+        """
+        if self._pid != os.getpid():
+            self._reset_state()
+
+    def _is_expired(self, entry, now):
+        """判断连接是否超过最长存活时间"""
+        return bool(self.max_lifetime_seconds) and now - entry.created_at > self.max_lifetime_seconds
+
+    def _connect(self):
+        """建立新的物理连接"""
+        return _PoolEntry(pymysql.connect(**self.db_config))
+
+    @staticmethod
+    def _close_raw(entry):
+        """关闭物理连接，忽略异常"""
+        try:
+            entry.raw.close()
+        except Exception:
+            pass
+
+    def connection(self):
+        """
+        从连接池借出连接
+
+        返回：
+            PooledConnection: 使用完毕后调用close()归还
+        """
+        to_close = []
+        entry = None
+        create = False
+        started = time.monotonic()
+
+        with self._cond:
+            self._check_pid()
+            while True:
+                now = time.monotonic()
+                while self._idle:
+                    candidate = self._idle.pop()  # 后进先出，让多余连接自然空闲回收
+                    idle_for = now - candidate.last_used_at
+                    if self._is_expired(candidate, now) or (
+                            self.max_idle_seconds and idle_for > self.max_idle_seconds
+                            and self._size > self.min_size):
+                        self._size -= 1
+                        self._stats['recycled'] += 1
+                        to_close.append(candidate)
+                        continue
+                    entry = candidate
+                    break
+
+                if entry is not None:
+                    self._stats['reused'] += 1
+                    break
+
+                if self._size < self.max_size:
+                    self._size += 1
+                    create = True
+                    break
+
+                remaining = self.timeout - (now - started)
+                if remaining <= 0:
+                    self._stats['timeouts'] += 1
+                    for stale in to_close:
+                        self._close_raw(stale)
+                    raise PoolExhaustedError(f'数据库连接池已满（max_size={self.max_size}），等待{self.timeout}秒超时')
+                self._stats['waits'] += 1
+                self._cond.wait(remaining)
+
+            self._stats['wait_seconds'] += time.monotonic() - started
+
+        for stale in to_close:
+            self._close_raw(stale)
+
+        if entry is not None and self.ping_after_seconds is not None \
+                and time.monotonic() - entry.last_used_at > self.ping_after_seconds:
+            try:
+                entry.raw.ping(reconnect=False)
+            except Exception:
+                # 连接已被服务端断开（wait_timeout等），换一条新连接
+                self._close_raw(entry)
+                with self._cond:
+                    self._stats['ping_failures'] += 1
+                entry = None
+                create = True
+
+        if create:
+            try:
+                entry = self._connect()
+            except Exception:
+                with self._cond:
+                    self._size -= 1
+                    self._cond.notify()
+                raise
+            with self._cond:
+                self._stats['created'] += 1
+
+        return PooledConnection(self, entry)
+
+    def _release(self, entry):
+        """归还连接（由PooledConnection.close调用）"""
+        discard = False
+        try:
+            if entry.raw.open:
+                # 结束未提交的事务，避免下一个使用者读到旧快照或持有行锁
+                if entry.raw.server_status & SERVER_STATUS.SERVER_STATUS_IN_TRANS:
+                    entry.raw.rollback()
+            else:
+                discard = True
+        except Exception:
+            discard = True
+
+        now = time.monotonic()
+        if not discard and self._is_expired(entry, now):
+            discard = True
+
+        with self._cond:
+            if self._pid != os.getpid():
+                # 跨进程归还的连接直接丢弃
+                return
+            if discard:
+                self._size -= 1
+                self._stats['discarded'] += 1
+            else:
+                entry.last_used_at = now
+                self._idle.append(entry)
+            self._cond.notify()
+
+        if discard:
+            self._close_raw(entry)
+
+    def close_all(self):
+        """关闭全部空闲连接（已借出的连接归还时正常处理）"""
+        with self._cond:
+            idle, self._idle = list(self._idle), deque()
+            self._size -= len(idle)
+            self._cond.notify_all()
+        for entry in idle:
+            self._close_raw(entry)
+
+    def stats(self):
+        """
+        获取连接池运行统计
+
+        返回：
+            dict: 连接数、空闲数、借出数及累计计数
+        """
+        with self._cond:
+            self._check_pid()
+            stats = dict(self._stats)
+            stats['wait_seconds'] = round(stats['wait_seconds'], 3)
+            stats.update({
+                'pid': self._pid,
+                'size': self._size,
+                'idle': len(self._idle),
+                'in_use': self._size - len(self._idle),
+                'min_size': self.min_size,
+                'max_size': self.max_size
+            })
+            return stats
+
+
+# ============================================================
+# 全局连接池
+# ============================================================
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def build_db_config(db_config=None):
+    """
+    根据config.DB_CONFIG生成pymysql连接参数
+
+    配置文件中cursorclass以字符串保存（如'DictCursor'），这里转换为pymysql游标类
+    """
+    params = dict(db_config or config.DB_CONFIG)
+    cursorclass = params.get('cursorclass')
+    if isinstance(cursorclass, str):
+        params['cursorclass'] = getattr(pymysql.cursors, cursorclass)
+    return params
+
+
+def get_pool():
+    """获取（必要时创建）进程内的全局连接池"""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ConnectionPool(
+                    build_db_config(),
+                    min_size=config.DB_POOL_MIN_SIZE,
+                    max_size=config.DB_POOL_MAX_SIZE,
+                    max_idle_seconds=config.DB_POOL_MAX_IDLE_SECONDS,
+                    max_lifetime_seconds=config.DB_POOL_MAX_LIFETIME_SECONDS,
+                    ping_after_seconds=config.DB_POOL_PING_AFTER_SECONDS,
+                    timeout=config.DB_POOL_TIMEOUT
+                )
+    return _pool
+
+
+def get_db_connection():
+    """获取数据库连接（从连接池借出，close()即归还）"""
+    return get_pool().connection()
+
+
+def get_pool_stats():
+    """获取连接池统计信息（用于监控）"""
+    return get_pool().stats()
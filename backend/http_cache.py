@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+"""
+移动端协商缓存（Conditional GET）
+根据数据的更新时间生成ETag/Last-Modified，客户端再次访问时携带If-None-Match/If-Modified-Since，
+数据未变化则直接返回304，既不传输响应体，也跳过后续的重查询
+"""
+
+import hashlib
+from datetime import datetime
+
+from flask import request, make_response
+
+# 响应格式版本号，接口返回字段变化时递增，使旧ETag全部失效
+ETAG_FORMAT_VERSION = 'v1'
+
+
+def make_etag(*parts):
+    """
+    根据版本信息生成ETag
+
+    参数：
+        parts: 决定响应内容的版本信息（资源ID、updated_at、汇总值等）
+
+    返回：
+        str: ETag值（不含引号）
+    """
+    raw = '|'.join([ETAG_FORMAT_VERSION] + ['' if part is None else str(part) for part in parts])
+    return hashlib.sha1(raw.encode('utf-8')).hexdigest()[:24]
+
+
+def latest_timestamp(*values):
+    """取多个更新时间中最新的一个（忽略空值）"""
+    timestamps = [value for value in values if isinstance(value, datetime)]
+    return max(timestamps) if timestamps else None
+
+
+def is_not_modified(etag, last_modified=None):
+    """
+    判断客户端缓存是否仍然有效
+
+    If-None-Match优先；没有If-None-Match时才比较If-Modified-Since（精确到秒）
+    """
+    if request.if_none_match:
+        return request.if_none_match.contains_weak(etag)
+
+    if last_modified is not None and request.if_modified_since is not None:
+        modified = last_modified.replace(microsecond=0)
+        since = request.if_modified_since
+        if modified.tzinfo is None:
+            # 数据库时间为服务器本地时间
+            modified = modified.astimezone()
+        return modified <= since
+
+    return False
+
+
+def add_validators(response, etag, last_modified=None):
+    """
+    为响应添加ETag、Last-Modified和Cache-Control
+
+    使用弱ETag：压缩前后内容语义相同，仍可复用
+    """
+    response.set_etag(etag, weak=True)
+    if last_modified is not None:
+        response.last_modified = last_modified if last_modified.tzinfo else last_modified.astimezone()
+    # 允许客户端缓存，但每次使用前必须向服务端确认
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
+
+
+def not_modified_response(etag, last_modified=None):
+    """生成304响应"""
+    return add_validators(make_response('', 304), etag, last_modified)
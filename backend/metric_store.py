@@ -0,0 +1,290 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+按租户的每日指标文件（内存映射）
+为订单量大的公司把每日订单汇总导出为定宽二进制文件，worker以只读方式mmap，
+多个gunicorn进程共享同一份页缓存，区间统计不再访问数据库（见range_stats.py）
+
+文件格式（小端）：
+    头部64字节：魔数(8s) 格式版本(I) 列数(I) 起始日期序数(q) 天数(q) 水位线时间戳(q) 保留(24x)
+    数据：天数 × 列数 个int64，第i行为起始日期后第i天，列顺序见COLUMNS，金额单位为分
+
+更新方式：
+- 增量更新只在文件末尾追加新的日期行、原位覆盖已变化的日期行，文件不会缩短或移动
+- 全量构建（首次、出现早于起始日期的数据、列变化）写入临时文件后os.replace原子替换，
+  读取方检测到inode变化后重新映射
+
+用法：
+    python metric_store.py build --company-id 1     # 为指定公司构建
+    python metric_store.py build                    # 为订单数达到METRIC_STORE_MIN_ORDERS的公司构建
+    python metric_store.py update                   # 增量更新已有文件
+    python metric_store.py sync --interval 10       # 持续增量更新
+"""
+
+import argparse
+import fcntl
+import mmap
+import os
+import struct
+import sys
+import time
+from datetime import date, datetime, timedelta
+
+from config import config
+from stats_series import AMOUNT_METRICS, METRIC_COLUMNS, to_cents
+
+MAGIC = b'MERPMS01'
+FORMAT_VERSION = 1
+HEADER = struct.Struct('<8sIIqqq24x')
+ROW_ITEM = 8
+
+COLUMNS = tuple(METRIC_COLUMNS)
+ROW = struct.Struct('<' + 'q' * len(COLUMNS))
+
+_SELECT_COLUMNS = ', '.join(f'{column} as {metric}' for metric, column in METRIC_COLUMNS.items())
+
+
+def tenant_path(tenant_id):
+    return os.path.join(config.METRIC_STORE_DIR, f'tenant_{int(tenant_id)}.bin')
+
+
+def file_signature(tenant_id):
+    """文件签名（inode、大小、修改时间），文件不存在时返回None"""
+    try:
+        st = os.stat(tenant_path(tenant_id))
+    except OSError:
+        return None
+    return st.st_ino, st.st_size, st.st_mtime_ns
+
+
+def _row_values(row):
+    return [
+        to_cents(row[metric]) if metric in AMOUNT_METRICS else int(row[metric] or 0)
+        for metric in COLUMNS
+    ]
+
+
+# ============================================================
+# 读取
+# ============================================================
+
+class MappedTenant:
+    """只读映射的租户指标文件"""
+
+    def __init__(self, tenant_id):
+        path = tenant_path(tenant_id)
+        with open(path, 'rb') as f:
+            st = os.fstat(f.fileno())
+            self.signature = st.st_ino, st.st_size, st.st_mtime_ns
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, version, n_cols, base_ordinal, days, watermark = HEADER.unpack_from(self._mmap, 0)
+        if magic != MAGIC or version != FORMAT_VERSION or n_cols != len(COLUMNS):
+            self.close()
+            raise ValueError(f'{path} 格式不匹配')
+        if HEADER.size + days * n_cols * ROW_ITEM > len(self._mmap):
+            self.close()
+            raise ValueError(f'{path} 文件不完整')
+
+        self.base_date = date.fromordinal(base_ordinal)
+        self.days = days
+        self.watermark = datetime.fromtimestamp(watermark) if watermark else None
+        self._values = memoryview(self._mmap)[HEADER.size:HEADER.size + days * n_cols * ROW_ITEM].cast('q')
+
+    def column(self, metric):
+        """某一列的全部每日值（按天顺序）"""
+        return self._values[COLUMNS.index(metric)::len(COLUMNS)]
+
+    def close(self):
+        values = self.__dict__.pop('_values', None)
+        if values is not None:
+            values.release()
+        self._mmap.close()
+
+
+def open_tenant(tenant_id):
+    """打开租户的指标文件，不存在或格式不匹配时返回None"""
+    try:
+        return MappedTenant(tenant_id)
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError, struct.error) as e:
+        print(f"[Metric Store] 租户{tenant_id}指标文件不可用: {e}")
+        return None
+
+
+# ============================================================
+# 构建与增量更新
+# ============================================================
+
+def _fetch_rows(cursor, tenant_id, since=None):
+    if since is None:
+        cursor.execute(f"""
+            SELECT order_date, {_SELECT_COLUMNS}, updated_at
+            FROM daily_order_summary
+            WHERE company_id = %s
+            ORDER BY order_date
+        """, (tenant_id,))
+    else:
+        cursor.execute(f"""
+            SELECT order_date, {_SELECT_COLUMNS}, updated_at
+            FROM daily_order_summary
+            WHERE company_id = %s AND updated_at >= %s
+            ORDER BY order_date
+        """, (tenant_id, since))
+    return cursor.fetchall()
+
+
+def _write_header(f, base_date, days, watermark):
+    f.seek(0)
+    f.write(HEADER.pack(MAGIC, FORMAT_VERSION, len(COLUMNS), base_date.toordinal(), days,
+                        int(watermark.timestamp()) if watermark else 0))
+
+
+def build_tenant(cursor, tenant_id):
+    """全量构建租户指标文件（临时文件 + 原子替换）"""
+    rows = _fetch_rows(cursor, tenant_id)
+    base_date = rows[0]['order_date'] if rows else date.today()
+    last_date = rows[-1]['order_date'] if rows else base_date
+    days = (last_date - base_date).days + 1
+    watermark = max((row['updated_at'] for row in rows), default=None)
+
+    data = bytearray(days * ROW.size)
+    for row in rows:
+        ROW.pack_into(data, (row['order_date'] - base_date).days * ROW.size, *_row_values(row))
+
+    path = tenant_path(tenant_id)
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    with open(tmp_path, 'wb') as f:
+        _write_header(f, base_date, days, watermark)
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+    return days
+
+
+def update_tenant(cursor, tenant_id):
+    """
+    增量更新租户指标文件
+
+    返回：
+        int: 写入的行数（需要全量构建时返回构建的天数）
+    """
+    mapped = open_tenant(tenant_id)
+    if mapped is None:
+        return build_tenant(cursor, tenant_id)
+    base_date, days, watermark = mapped.base_date, mapped.days, mapped.watermark
+    mapped.close()
+
+    since = watermark - timedelta(seconds=config.RANGE_STATS_REFRESH_OVERLAP_SECONDS) if watermark else None
+    rows = _fetch_rows(cursor, tenant_id, since)
+    if not rows:
+        return 0
+    if rows[0]['order_date'] < base_date:
+        return build_tenant(cursor, tenant_id)
+
+    with open(tenant_path(tenant_id), 'r+b') as f:
+        for row in rows:
+            index = (row['order_date'] - base_date).days
+            if index >= days:
+                # 在末尾追加（中间没有数据的日期补0）
+                f.seek(HEADER.size + days * ROW.size)
+                f.write(bytes((index - days) * ROW.size))
+                days = index + 1
+            f.seek(HEADER.size + index * ROW.size)
+            f.write(ROW.pack(*_row_values(row)))
+            if watermark is None or row['updated_at'] > watermark:
+                watermark = row['updated_at']
+        f.flush()
+        # 数据写完后再更新头部天数和水位线，读取方不会读到未写入的行
+        _write_header(f, base_date, days, watermark)
+        f.flush()
+    return len(rows)
+
+
+def stored_tenant_ids():
+    """已有指标文件的公司"""
+    try:
+        names = os.listdir(config.METRIC_STORE_DIR)
+    except OSError:
+        return []
+    tenant_ids = []
+    for name in names:
+        if name.startswith('tenant_') and name.endswith('.bin'):
+            try:
+                tenant_ids.append(int(name[len('tenant_'):-len('.bin')]))
+            except ValueError:
+                continue
+    return sorted(tenant_ids)
+
+
+def large_tenant_ids(cursor, min_orders):
+    """订单数达到min_orders的公司"""
+    cursor.execute("""
+        SELECT company_id
+        FROM daily_order_summary
+        GROUP BY company_id
+        HAVING SUM(order_count) >= %s
+    """, (min_orders,))
+    return [row['company_id'] for row in cursor.fetchall()]
+
+
+def main():
+    """主函数"""
+    from db_pool import get_db_connection
+
+    parser = argparse.ArgumentParser(description='按租户的每日指标文件')
+    parser.add_argument('command', choices=['build', 'update', 'sync'])
+    parser.add_argument('--company-id', type=int, action='append', help='指定公司（可多次指定）')
+    parser.add_argument('--min-orders', type=int, default=config.METRIC_STORE_MIN_ORDERS,
+                        help='build时自动选择订单数达到该值的公司')
+    parser.add_argument('--interval', type=float, default=10, help='sync的更新间隔（秒）')
+    args = parser.parse_args()
+
+    os.makedirs(config.METRIC_STORE_DIR, exist_ok=True)
+
+    # 同一时间只允许一个更新进程
+    lock_file = open(os.path.join(config.METRIC_STORE_DIR, '.lock'), 'w')
+    try:
+        fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        print("❌ 已有更新进程在运行")
+        sys.exit(1)
+
+    try:
+        while True:
+            conn = get_db_connection()
+            cursor = conn.cursor()
+            try:
+                if args.command == 'build':
+                    tenant_ids = args.company_id or large_tenant_ids(cursor, args.min_orders)
+                    for tenant_id in tenant_ids:
+                        days = build_tenant(cursor, tenant_id)
+                        print(f"  ✓ 公司{tenant_id}: {days} 天")
+                else:
+                    for tenant_id in args.company_id or stored_tenant_ids():
+                        written = update_tenant(cursor, tenant_id)
+                        if written:
+                            print(f"  [{datetime.now().strftime('%H:%M:%S')}] 公司{tenant_id}: 更新 {written} 行")
+            finally:
+                cursor.close()
+                conn.close()
+
+            if args.command != 'sync':
+                break
+            time.sleep(args.interval)
+
+        print("\n✅ 完成\n")
+
+    except KeyboardInterrupt:
+        pass
+    except Exception as e:
+        print(f"\n❌ 执行失败：{str(e)}")
+        import traceback
+        traceback.print_exc()
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,310 @@
+# -*- coding: utf-8 -*-
+"""
+移动端运行指标
+进程内线程安全的计数器和直方图，供各模块记录运行数据
+
+gunicorn多worker部署时每个worker各自累计，定期把快照写入METRICS_DIR下的
+metrics_<pid>.json，采集时合并全部worker的快照（计数器和直方图桶直接相加），
+以Prometheus文本格式输出。
+"""
+
+import fcntl
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+
+from config import config
+
+# 耗时直方图桶（秒）
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# 响应大小直方图桶（字节）
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576)
+
+
+class MetricsRegistry:
+    """
+    指标注册表
+
+    每个指标由名称和标签唯一确定，例如：
+        registry.inc('compression_responses_total', encoding='gzip')
+        registry.observe('http_request_duration_seconds', 0.12, LATENCY_BUCKETS, route='/api/mobile/orders')
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._histograms = {}
+
+    @staticmethod
+    def _key(name, labels):
+        return name, tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+    def inc(self, name, value=1, **labels):
+        """计数器累加"""
+        key = self._key(name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def get(self, name, **labels):
+        """读取计数器当前值"""
+        with self._lock:
+            return self._counters.get(self._key(name, labels), 0)
+
+    def observe(self, name, value, buckets, **labels):
+        """
+        直方图记录一次观测值
+
+        参数：
+            name: 指标名
+            value: 观测值
+            buckets: 桶上界（升序），超过最大上界的计入+Inf桶
+        """
+        key = self._key(name, labels)
+        index = bisect_left(buckets, value)
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = {
+                    'buckets': list(buckets),
+                    'counts': [0] * (len(buckets) + 1),
+                    'sum': 0.0,
+                    'count': 0
+                }
+            histogram['counts'][index] += 1
+            histogram['sum'] += value
+            histogram['count'] += 1
+
+    def snapshot(self):
+        """
+        导出全部指标（可JSON序列化，可与其它worker的快照合并）
+
+        返回：
+            dict: {'counters': [...], 'histograms': [...]}
+        """
+        with self._lock:
+            counters = [
+                {'name': name, 'labels': dict(labels), 'value': value}
+                for (name, labels), value in sorted(self._counters.items())
+            ]
+            histograms = [
+                {
+                    'name': name,
+                    'labels': dict(labels),
+                    'buckets': list(histogram['buckets']),
+                    'counts': list(histogram['counts']),
+                    'sum': histogram['sum'],
+                    'count': histogram['count']
+                }
+                for (name, labels), histogram in sorted(self._histograms.items())
+            ]
+        return {'counters': counters, 'histograms': histograms}
+
+
+# 全局指标注册表
+registry = MetricsRegistry()
+
+
+# ============================================================
+# 多worker快照合并
+# ============================================================
+
+_last_flush = 0.0
+_flush_lock = threading.Lock()
+
+
+def merge_snapshots(snapshots):
+    """合并多个快照：同名同标签的计数器相加，直方图逐桶相加"""
+    counters = {}
+    histograms = {}
+
+    for snapshot in snapshots:
+        for item in snapshot.get('counters', []):
+            key = (item['name'], tuple(sorted(item['labels'].items())))
+            counters[key] = counters.get(key, 0) + item['value']
+
+        for item in snapshot.get('histograms', []):
+            key = (item['name'], tuple(sorted(item['labels'].items())), tuple(item['buckets']))
+            merged = histograms.get(key)
+            if merged is None:
+                histograms[key] = {
+                    'name': item['name'],
+                    'labels': dict(item['labels']),
+                    'buckets': list(item['buckets']),
+                    'counts': list(item['counts']),
+                    'sum': item['sum'],
+                    'count': item['count']
+                }
+            else:
+                merged['counts'] = [a + b for a, b in zip(merged['counts'], item['counts'])]
+                merged['sum'] += item['sum']
+                merged['count'] += item['count']
+
+    return {
+        'counters': [
+            {'name': name, 'labels': dict(labels), 'value': value}
+            for (name, labels), value in sorted(counters.items())
+        ],
+        'histograms': [histograms[key] for key in sorted(histograms)]
+    }
+
+
+def _write_json_atomic(path, data):
+    """写临时文件后rename，读取方不会读到半个文件（临时文件按进程和线程区分，并发写入互不覆盖）"""
+    tmp_path = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(data, f, separators=(',', ':'))
+    os.replace(tmp_path, path)
+
+
+def _read_json(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def flush(force=False):
+    """
+    把本worker的快照写入METRICS_DIR
+
+    参数：
+        force: 忽略METRICS_FLUSH_INTERVAL立即写入
+
+    同一进程内的写入互斥：非强制写入时如果其它线程正在写入则直接跳过
+    """
+    global _last_flush
+    if not _flush_lock.acquire(blocking=force):
+        return
+    try:
+        now = time.monotonic()
+        if not force and now - _last_flush < config.METRICS_FLUSH_INTERVAL:
+            return
+        _last_flush = now
+        os.makedirs(config.METRICS_DIR, exist_ok=True)
+        _write_json_atomic(os.path.join(config.METRICS_DIR, f'metrics_{os.getpid()}.json'), registry.snapshot())
+    except OSError as e:
+        print(f"[Metrics] 指标快照写入失败: {e}")
+    finally:
+        _flush_lock.release()
+
+
+def collect_all():
+    """
+    合并全部worker的指标
+
+    已退出worker的快照并入metrics_archive.json后删除，计数器保持单调递增，
+    目录中的文件数不会随worker重启无限增长。
+    """
+    flush(force=True)
+    directory = config.METRICS_DIR
+    own_file = f'metrics_{os.getpid()}.json'
+    snapshots = [registry.snapshot()]
+
+    try:
+        names = os.listdir(directory)
+    except OSError:
+        return snapshots[0]
+
+    with open(os.path.join(directory, 'metrics.lock'), 'w') as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            archive_path = os.path.join(directory, 'metrics_archive.json')
+            archive = _read_json(archive_path)
+            dead = []
+
+            for name in names:
+                if not (name.startswith('metrics_') and name.endswith('.json')) or name == own_file:
+                    continue
+                if name == 'metrics_archive.json':
+                    continue
+                try:
+                    pid = int(name[len('metrics_'):-len('.json')])
+                except ValueError:
+                    continue
+                snapshot = _read_json(os.path.join(directory, name))
+                if snapshot is None:
+                    continue
+                if _pid_alive(pid):
+                    snapshots.append(snapshot)
+                else:
+                    dead.append((name, snapshot))
+
+            if dead:
+                archive = merge_snapshots(([archive] if archive else []) + [snapshot for _, snapshot in dead])
+                _write_json_atomic(archive_path, archive)
+                for name, _ in dead:
+                    try:
+                        os.remove(os.path.join(directory, name))
+                    except OSError:
+                        pass
+
+            if archive:
+                snapshots.append(archive)
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    return merge_snapshots(snapshots)
+
+
+# ============================================================
+# Prometheus文本格式
+# ============================================================
+
+def _format_labels(labels, extra=None):
+    items = sorted(labels.items()) + (extra or [])
+    if not items:
+        return ''
+    escaped = []
+    for key, value in items:
+        value = str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        escaped.append(f'{key}="{value}"')
+    return '{' + ','.join(escaped) + '}'
+
+
+def _format_number(value):
+    if isinstance(value, float):
+        if value == float('inf'):
+            return '+Inf'
+        return repr(value)
+    return str(value)
+
+
+def render_prometheus(snapshot):
+    """把快照渲染为Prometheus文本格式"""
+    lines = []
+    declared = set()
+
+    for item in snapshot['counters']:
+        if item['name'] not in declared:
+            declared.add(item['name'])
+            lines.append(f"# TYPE {item['name']} counter")
+        lines.append(f"{item['name']}{_format_labels(item['labels'])} {_format_number(item['value'])}")
+
+    for item in snapshot['histograms']:
+        name = item['name']
+        if name not in declared:
+            declared.add(name)
+            lines.append(f"# TYPE {name} histogram")
+        cumulative = 0
+        for bound, count in zip(list(item['buckets']) + [float('inf')], item['counts']):
+            cumulative += count
+            le = _format_number(float(bound))
+            lines.append(f"{name}_bucket{_format_labels(item['labels'], [('le', le)])} {cumulative}")
+        lines.append(f"{name}_sum{_format_labels(item['labels'])} {_format_number(float(item['sum']))}")
+        lines.append(f"{name}_count{_format_labels(item['labels'])} {item['count']}")
+
+    return '\n'.join(lines) + '\n'
@@ -5,7 +5,7 @@
 """
 
 from functools import wraps
-from flask import request, jsonify
+from flask import request, jsonify, g
 import jwt
 import datetime
 from typing import Optional, Tuple
@@ -130,6 +130,10 @@ def require_mobile_auth(f):
         kwargs['current_tenant_id'] = payload['tenant_id']
         kwargs['current_username'] = payload.get('username', '')
         
+        # 供请求级中间件（SQL追踪等）使用
+        g.current_user_id = payload['user_id']
+        g.current_tenant_id = payload['tenant_id']
+        
         return f(*args, **kwargs)
     
     return decorated_function
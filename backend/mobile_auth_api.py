@@ -9,6 +9,9 @@ import pymysql
 import hashlib
 from datetime import datetime
 
+# 导入数据库连接池
+from db_pool import get_db_connection
+
 # 导入移动端权限模块
 from mobile_auth import (
     create_mobile_token,
@@ -22,19 +25,6 @@ from mobile_auth import (
 # 创建Blueprint
 mobile_auth_bp = Blueprint('mobile_auth', __name__)
 
-# 数据库配置
-DB_CONFIG = {
-    'host': 'localhost',
-    'user': 'ajkuaiji',
-    'password': '@HNzb5z75b16',
-    'database': 'ajkuaiji',
-    'charset': 'utf8mb4'
-}
-
-def get_db_connection():
-    """获取数据库连接"""
-    return pymysql.connect(**DB_CONFIG)
-
 
 # ============================================================
 # 移动端登录API
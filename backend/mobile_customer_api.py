@@ -8,6 +8,11 @@ from flask import Blueprint, request
 import pymysql
 from datetime import datetime
 
+from config import config
+
+# 导入数据库连接池
+from db_pool import get_db_connection
+
 # 导入移动端权限模块
 from mobile_auth import (
     require_mobile_auth,
@@ -15,21 +20,30 @@ from mobile_auth import (
     response_error
 )
 
-# 创建Blueprint
-mobile_customer_bp = Blueprint('mobile_customer', __name__)
+# 导入协商缓存工具
+from http_cache import (
+    add_validators,
+    is_not_modified,
+    latest_timestamp,
+    make_etag,
+    not_modified_response
+)
+
+# 导入分页工具
+from pagination import (
+    InvalidCursorError,
+    count_total,
+    decode_cursor,
+    encode_cursor,
+    is_truthy,
+    keyset_condition
+)
 
-# 数据库配置
-DB_CONFIG = {
-    'host': 'localhost',
-    'user': 'ajkuaiji',
-    'password': '@HNzb5z75b16',
-    'database': 'ajkuaiji',
-    'charset': 'utf8mb4'
-}
+# 导入客户搜索索引
+from search_index import customer_index
 
-def get_db_connection():
-    """获取数据库连接"""
-    return pymysql.connect(**DB_CONFIG)
+# 创建Blueprint
+mobile_customer_bp = Blueprint('mobile_customer', __name__)
 
 
 # ============================================================
@@ -48,6 +62,11 @@ def mobile_get_customers(current_user_id, current_tenant_id, current_username):
     - keyword: 搜索关键词（店铺名、抖音名、公司名）
     - sort_by: 排序字段（shop_name|created_at），默认created_at
     - sort_order: 排序方向（asc|desc），默认desc
+    - cursor: 游标分页（传入即启用，首页传空字符串，后续传上一页返回的next_cursor），
+      按(sort_by, id)定位，返回next_cursor和has_more，总数只在首页统计
+    - approximate_total: 允许结果集很大时返回估算总数（1|true），此时total_is_approximate为true
+    
+    订单数、累计金额、最近下单日期读取customer_order_stats汇总表（见order_rollups.py）
     """
     try:
         # 1. 获取查询参数
@@ -56,6 +75,9 @@ def mobile_get_customers(current_user_id, current_tenant_id, current_username):
         keyword = request.args.get('keyword', '').strip()
         sort_by = request.args.get('sort_by', 'created_at')
         sort_order = request.args.get('sort_order', 'desc').upper()
+        cursor_mode = 'cursor' in request.args
+        cursor_token = request.args.get('cursor', '').strip()
+        approximate_total = is_truthy(request.args.get('approximate_total'))
         
         # 限制每页最大数量
         page_size = min(page_size, 100)
@@ -68,6 +90,14 @@ def mobile_get_customers(current_user_id, current_tenant_id, current_username):
         if sort_order not in ['ASC', 'DESC']:
             sort_order = 'DESC'
         
+        # 解析游标
+        after = None
+        if cursor_token:
+            try:
+                after = decode_cursor(cursor_token, sort_by, sort_order)
+            except InvalidCursorError as e:
+                return response_error(str(e), 'PARAM_ERROR')
+        
         # 2. 构建SQL查询
         conn = get_db_connection()
         cursor = conn.cursor(pymysql.cursors.DictCursor)
@@ -77,28 +107,49 @@ def mobile_get_customers(current_user_id, current_tenant_id, current_username):
             where_conditions = ['c.company_id = %s']
             params = [current_tenant_id]
             
-            # 搜索条件
+            # 搜索条件（由客户搜索索引得到匹配的客户ID，匹配过多时改用LIKE）
             if keyword:
-                where_conditions.append("""
-                    (c.shop_name LIKE %s OR c.douyin_name LIKE %s OR c.company_name LIKE %s)
-                """)
-                keyword_pattern = f'%{keyword}%'
-                params.extend([keyword_pattern, keyword_pattern, keyword_pattern])
+                matched_ids = customer_index.search(cursor, current_tenant_id, keyword)
+                if not matched_ids:
+                    where_conditions.append('1 = 0')
+                elif len(matched_ids) <= config.SEARCH_INDEX_MAX_IN_IDS:
+                    where_conditions.append(f"c.id IN ({', '.join(['%s'] * len(matched_ids))})")
+                    params.extend(matched_ids)
+                else:
+                    where_conditions.append("""
+                        (c.shop_name LIKE %s OR c.douyin_name LIKE %s OR c.company_name LIKE %s)
+                    """)
+                    keyword_pattern = f'%{keyword}%'
+                    params.extend([keyword_pattern, keyword_pattern, keyword_pattern])
             
             where_clause = ' AND '.join(where_conditions)
             
-            # 查询总数
-            cursor.execute(f"""
-                SELECT COUNT(*) as total
-                FROM customers c
-                WHERE {where_clause}
-            """, params)
+            # 查询总数（游标模式只在首页统计；按筛选条件缓存，客户变化后失效）
+            total = None
+            total_is_approximate = False
+            if not cursor_mode or after is None:
+                total, total_is_approximate = count_total(
+                    cursor, current_tenant_id, 'customers', {'keyword': keyword},
+                    f'FROM customers c WHERE {where_clause}', params,
+                    approximate=approximate_total
+                )
             
-            total = cursor.fetchone()['total']
-            total_pages = (total + page_size - 1) // page_size
-            
-            # 查询列表数据
-            offset = (page - 1) * page_size
+            # 查询列表数据（以客户ID作为同值时的次级排序，保证翻页稳定）
+            if cursor_mode:
+                list_where = where_clause
+                list_params = list(params)
+                if after is not None:
+                    keyset_sql, keyset_params = keyset_condition(
+                        f'c.{sort_by}', 'c.id', sort_order, after[0], after[1]
+                    )
+                    list_where = f'{where_clause} AND {keyset_sql}'
+                    list_params.extend(keyset_params)
+                limit_clause = 'LIMIT %s'
+                list_params.append(page_size + 1)
+            else:
+                list_where = where_clause
+                list_params = params + [page_size, (page - 1) * page_size]
+                limit_clause = 'LIMIT %s OFFSET %s'
             
             cursor.execute(f"""
                 SELECT 
@@ -119,17 +170,23 @@ def mobile_get_customers(current_user_id, current_tenant_id, current_username):
                     c.region,
                     c.created_at,
                     c.updated_at,
-                    (SELECT COUNT(*) FROM orders WHERE customer_id = c.id AND company_id = %s) as order_count,
-                    (SELECT MAX(order_date) FROM orders WHERE customer_id = c.id AND company_id = %s) as last_order_date,
-                    (SELECT SUM(final_amount) FROM orders WHERE customer_id = c.id AND company_id = %s AND status != '已取消') as total_amount
+                    s.order_count,
+                    s.last_order_date,
+                    s.total_amount
                 FROM customers c
-                WHERE {where_clause}
-                ORDER BY c.{sort_by} {sort_order}
-                LIMIT %s OFFSET %s
-            """, [current_tenant_id, current_tenant_id, current_tenant_id] + params + [page_size, offset])
+                LEFT JOIN customer_order_stats s ON s.company_id = c.company_id AND s.customer_id = c.id
+                WHERE {list_where}
+                ORDER BY c.{sort_by} {sort_order}, c.id {sort_order}
+                {limit_clause}
+            """, list_params)
             
             customers = cursor.fetchall()
             
+            has_more = False
+            if cursor_mode and len(customers) > page_size:
+                has_more = True
+                customers = customers[:page_size]
+            
             # 格式化返回数据
             customer_list = []
             for customer in customers:
@@ -155,13 +212,33 @@ def mobile_get_customers(current_user_id, current_tenant_id, current_username):
                     'created_at': customer['created_at'].isoformat() if customer['created_at'] else None
                 })
             
+            if cursor_mode:
+                next_cursor = None
+                if has_more:
+                    last = customers[-1]
+                    next_cursor = encode_cursor(sort_by, sort_order, last[sort_by], last['id'])
+                
+                return response_success(
+                    data={
+                        'list': customer_list,
+                        'page_size': page_size,
+                        'next_cursor': next_cursor,
+                        'has_more': has_more,
+                        'total': total,
+                        'total_is_approximate': total_is_approximate
+                    }
+                )
+            
+            total_pages = (total + page_size - 1) // page_size
+            
             return response_success(
                 data={
                     'list': customer_list,
                     'total': total,
                     'page': page,
                     'page_size': page_size,
-                    'total_pages': total_pages
+                    'total_pages': total_pages,
+                    'total_is_approximate': total_is_approximate
                 }
             )
             
@@ -187,13 +264,48 @@ def mobile_get_customers(current_user_id, current_tenant_id, current_username):
 def mobile_get_customer_detail(customer_id, current_user_id, current_tenant_id, current_username):
     """
     获取客户详情（含最近订单）
+    
+    订单数、累计金额、最近下单日期读取customer_order_stats汇总表（见order_rollups.py）
+    
+    协商缓存：响应携带ETag/Last-Modified，客户资料、订单汇总和该客户订单均未变化时返回304
     """
     try:
         conn = get_db_connection()
         cursor = conn.cursor(pymysql.cursors.DictCursor)
         
         try:
-            # 1. 查询客户基本信息
+            # 1. 轻量查询版本信息，未变化时直接返回304
+            cursor.execute("""
+                SELECT 
+                    c.updated_at,
+                    s.updated_at as stats_updated_at,
+                    s.order_count,
+                    s.total_amount,
+                    (SELECT MAX(o.updated_at) FROM orders o
+                     WHERE o.customer_id = c.id AND o.company_id = c.company_id) as orders_updated_at
+                FROM customers c
+                LEFT JOIN customer_order_stats s ON s.company_id = c.company_id AND s.customer_id = c.id
+                WHERE c.id = %s AND c.company_id = %s
+                LIMIT 1
+            """, (customer_id, current_tenant_id))
+            
+            version = cursor.fetchone()
+            
+            if not version:
+                return response_error('客户不存在', 'CUSTOMER_NOT_FOUND', 404)
+            
+            etag = make_etag(
+                'customer', customer_id, version['updated_at'], version['stats_updated_at'],
+                version['order_count'], version['total_amount'], version['orders_updated_at']
+            )
+            last_modified = latest_timestamp(
+                version['updated_at'], version['stats_updated_at'], version['orders_updated_at']
+            )
+            
+            if is_not_modified(etag, last_modified):
+                return not_modified_response(etag, last_modified)
+            
+            # 2. 查询客户基本信息
             cursor.execute("""
                 SELECT 
                     c.id,
@@ -222,20 +334,21 @@ def mobile_get_customer_detail(customer_id, current_user_id, current_tenant_id,
                     c.tags,
                     c.created_at,
                     c.updated_at,
-                    (SELECT COUNT(*) FROM orders WHERE customer_id = c.id AND company_id = %s) as order_count,
-                    (SELECT SUM(final_amount) FROM orders WHERE customer_id = c.id AND company_id = %s AND status != '已取消') as total_amount,
-                    (SELECT MAX(order_date) FROM orders WHERE customer_id = c.id AND company_id = %s) as last_order_date
+                    s.order_count,
+                    s.total_amount,
+                    s.last_order_date
                 FROM customers c
+                LEFT JOIN customer_order_stats s ON s.company_id = c.company_id AND s.customer_id = c.id
                 WHERE c.id = %s AND c.company_id = %s
                 LIMIT 1
-            """, (current_tenant_id, current_tenant_id, current_tenant_id, customer_id, current_tenant_id))
+            """, (customer_id, current_tenant_id))
             
             customer = cursor.fetchone()
             
             if not customer:
                 return response_error('客户不存在', 'CUSTOMER_NOT_FOUND', 404)
             
-            # 2. 查询最近5笔订单
+            # 3. 查询最近5笔订单
             cursor.execute("""
                 SELECT 
                     o.id,
@@ -267,7 +380,7 @@ def mobile_get_customer_detail(customer_id, current_user_id, current_tenant_id,
                 })
             
             # 返回响应
-            return response_success(
+            response = response_success(
                 data={
                     'customer': {
                         'id': customer['id'],
@@ -302,6 +415,7 @@ def mobile_get_customer_detail(customer_id, current_user_id, current_tenant_id,
                     'recent_orders': order_list
                 }
             )
+            return add_validators(response, etag, last_modified)
             
         finally:
             cursor.close()
@@ -320,16 +434,30 @@ def mobile_get_customer_detail(customer_id, current_user_id, current_tenant_id,
 # 移动端客户搜索API（快速搜索）
 # ============================================================
 
+# 联想结果中有索引尚未同步的已删除客户时，最多重新联想的次数
+SUGGEST_MAX_ATTEMPTS = 3
+
+
 @mobile_customer_bp.route('/api/mobile/customers/search', methods=['GET'])
 @require_mobile_auth
 def mobile_search_customers(current_user_id, current_tenant_id, current_username):
     """
-    快速搜索客户（用于下拉选择等场景）
+    快速搜索客户（用于下单时选择客户等输入联想场景）
+    
+    Query参数:
+    - keyword: 关键词（店铺名、抖音名、公司名，或其全拼、首字母，如ljts）
+    - limit: 返回数量，默认10，最大50
+    
+    说明:
+    - 匹配在客户搜索索引中完成（见search_index.py），数据库只按主键读取前limit个客户
+    - 读取时发现已删除而索引尚未同步的客户，从索引中移除后重新联想，仍返回limit个（客户足够时）
+    - 名称以关键词开头的客户在前，不足时补充名称包含关键词的客户，
+      两部分分别按最近下单日期、订单数倒序排列
     """
     try:
         # 1. 获取查询参数
         keyword = request.args.get('keyword', '').strip()
-        limit = min(int(request.args.get('limit', 10)), 50)
+        limit = min(int(request.args.get('limit', 10)), config.SUGGEST_MAX_LIMIT)
         
         if not keyword:
             return response_error('搜索关键词不能为空', 'PARAM_ERROR')
@@ -339,24 +467,34 @@ def mobile_search_customers(current_user_id, current_tenant_id, current_username
         cursor = conn.cursor(pymysql.cursors.DictCursor)
         
         try:
-            keyword_pattern = f'%{keyword}%'
-            
-            cursor.execute("""
-                SELECT 
-                    c.id,
-                    c.shop_name,
-                    c.douyin_name,
-                    c.company_name,
-                    c.legal_person
-                FROM customers c
-                WHERE c.company_id = %s
-                  AND (c.shop_name LIKE %s OR c.douyin_name LIKE %s OR c.company_name LIKE %s)
-                  AND c.status != '已删除'
-                ORDER BY c.shop_name ASC
-                LIMIT %s
-            """, (current_tenant_id, keyword_pattern, keyword_pattern, keyword_pattern, limit))
-            
-            customers = cursor.fetchall()
+            customers = []
+            for _ in range(SUGGEST_MAX_ATTEMPTS):
+                customer_ids = customer_index.suggest(cursor, current_tenant_id, keyword, limit)
+                if not customer_ids:
+                    break
+                
+                cursor.execute(f"""
+                    SELECT 
+                        c.id,
+                        c.shop_name,
+                        c.douyin_name,
+                        c.company_name,
+                        c.legal_person
+                    FROM customers c
+                    WHERE c.company_id = %s
+                      AND c.id IN ({', '.join(['%s'] * len(customer_ids))})
+                      AND c.status != '已删除'
+                """, [current_tenant_id] + customer_ids)
+                
+                # 保持索引中的排序（活跃度）
+                rows = {row['id']: row for row in cursor.fetchall()}
+                customers = [rows[customer_id] for customer_id in customer_ids if customer_id in rows]
+                
+                # 索引尚未同步的已删除客户：从索引中移除后重新联想，补足limit个
+                removed = [customer_id for customer_id in customer_ids if customer_id not in rows]
+                if not removed:
+                    break
+                customer_index.discard(current_tenant_id, removed)
             
             # 格式化返回数据
             result_list = []
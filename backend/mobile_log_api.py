@@ -5,29 +5,18 @@
 """
 
 from flask import Blueprint, request, jsonify
-import pymysql
 from datetime import datetime, timedelta
 import json
 
+# 导入数据库连接池
+from db_pool import get_db_connection
+
 # 导入认证模块
 from mobile_auth import require_mobile_auth
 
 # 创建Blueprint
 mobile_log_bp = Blueprint('mobile_log', __name__)
 
-# 数据库配置
-DB_CONFIG = {
-    'host': 'localhost',
-    'user': 'ajkuaiji',
-    'password': '@HNzb5z75b16',
-    'database': 'ajkuaiji',
-    'charset': 'utf8mb4',
-    'cursorclass': pymysql.cursors.DictCursor
-}
-
-def get_db_connection():
-    """获取数据库连接"""
-    return pymysql.connect(**DB_CONFIG)
 
 @mobile_log_bp.route('/api/mobile/logs/error', methods=['POST'])
 def log_error():
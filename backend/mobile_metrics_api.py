@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+"""
+移动端监控指标API
+以Prometheus文本格式输出全部worker合并后的指标
+"""
+
+import hmac
+
+from flask import Blueprint, Response, request
+
+from config import config
+from metrics import collect_all, render_prometheus
+from sql_tracer import read_slow_queries, summarize_slow_queries
+
+# 导入移动端权限模块
+from mobile_auth import response_success, response_error
+
+# 创建Blueprint
+mobile_metrics_bp = Blueprint('mobile_metrics', __name__)
+
+
+def metrics_access_allowed():
+    """
+    监控接口访问控制
+
+    配置了METRICS_TOKEN时必须携带 Authorization: Bearer <METRICS_TOKEN>；
+    未配置时只允许本机直连（经Nginx转发的请求带X-Forwarded-For，一律拒绝）
+    """
+    if config.METRICS_TOKEN:
+        auth_header = request.headers.get('Authorization', '')
+        return auth_header.startswith('Bearer ') and hmac.compare_digest(auth_header[7:], config.METRICS_TOKEN)
+
+    return request.remote_addr in ('127.0.0.1', '::1') and 'X-Forwarded-For' not in request.headers
+
+
+@mobile_metrics_bp.route('/api/mobile/metrics', methods=['GET'])
+def mobile_get_metrics():
+    """
+    获取监控指标（Prometheus文本格式）
+    
+    主要指标:
+    - http_requests_total: 请求数（blueprint/route/method/status）
+    - http_request_duration_seconds: 请求总耗时直方图
+    - http_request_db_seconds: 请求内数据库耗时直方图
+    - http_response_size_bytes: 响应大小直方图（压缩后）
+    - db_queries_total: SQL执行次数
+    - compression_*: 响应压缩字节数和CPU耗时
+    """
+    if not metrics_access_allowed():
+        return response_error('无权访问监控指标', 'FORBIDDEN', 403)
+
+    return Response(
+        render_prometheus(collect_all()),
+        content_type='text/plain; version=0.0.4; charset=utf-8'
+    )
+
+
+@mobile_metrics_bp.route('/api/mobile/metrics/slow-queries', methods=['GET'])
+def mobile_get_slow_queries():
+    """
+    查询慢查询日志
+    
+    Query参数:
+    - hours: 最近N小时（默认24）
+    - route: 按路由过滤
+    - tenant_id: 按租户过滤
+    - limit: 返回条数（默认20，最大200）
+    
+    返回:
+    - top: 按语句指纹聚合，按总耗时降序
+    - recent: 最近的慢查询明细
+    """
+    if not metrics_access_allowed():
+        return response_error('无权访问监控指标', 'FORBIDDEN', 403)
+
+    try:
+        hours = float(request.args.get('hours', 24))
+        limit = min(int(request.args.get('limit', 20)), 200)
+        tenant_id = request.args.get('tenant_id', type=int)
+        route = request.args.get('route') or None
+
+        records = read_slow_queries(hours=hours, route=route, tenant_id=tenant_id)
+
+        return response_success(data={
+            'threshold_ms': config.SLOW_QUERY_THRESHOLD_MS,
+            'total': len(records),
+            'top': summarize_slow_queries(records, limit),
+            'recent': records[-limit:][::-1]
+        })
+
+    except ValueError:
+        return response_error('参数格式错误', 'INVALID_PARAMS', 400)
@@ -6,7 +6,14 @@
 
 from flask import Blueprint, request
 import pymysql
-from datetime import datetime
+import re
+from datetime import date, datetime, timedelta
+
+# 导入配置
+from config import config
+
+# 导入数据库连接池
+from db_pool import get_db_connection
 
 # 导入移动端权限模块
 from mobile_auth import (
@@ -15,21 +22,75 @@ from mobile_auth import (
     response_error
 )
 
+# 导入协商缓存工具
+from http_cache import (
+    add_validators,
+    is_not_modified,
+    latest_timestamp,
+    make_etag,
+    not_modified_response
+)
+
+# 导入分页工具
+from pagination import (
+    InvalidCursorError,
+    count_total,
+    decode_cursor,
+    encode_cursor,
+    is_truthy,
+    keyset_condition
+)
+
+# 导入区间统计
+from range_stats import ALL_TIME, range_stats
+from stats_series import format_metric, parse_date
+
+# 导入相同请求合并
+from single_flight import coalesce_requests
+
+# 导入客户搜索索引
+from search_index import customer_index
+
 # 创建Blueprint
 mobile_order_bp = Blueprint('mobile_order', __name__)
 
-# 数据库配置
-DB_CONFIG = {
-    'host': 'localhost',
-    'user': 'ajkuaiji',
-    'password': '@HNzb5z75b16',
-    'database': 'ajkuaiji',
-    'charset': 'utf8mb4'
-}
 
-def get_db_connection():
-    """获取数据库连接"""
-    return pymysql.connect(**DB_CONFIG)
+# ============================================================
+# 订单号
+# 订单号保存在order_numbers表（触发器维护，见order_rollups.py），
+# (company_id, order_no)唯一索引；ID达到1000的订单另存截断格式的旧订单号legacy_order_no
+# ============================================================
+
+# 订单号关键词：至少包含完整的创建日期（DD + YYYYMMDD，可省略DD），之后的订单ID可以只输入前缀；
+# 更短的关键词（如DD、DD2026）会匹配大量订单，不按订单号查找
+ORDER_NO_PATTERN = re.compile(r'(?:DD)?\d{8,}', re.IGNORECASE)
+
+
+def generate_order_no(order_id, created_at):
+    """生成订单号：DD + 创建日期(YYYYMMDD) + 订单ID（不足3位补0，超过3位不截断）"""
+    return f"DD{created_at:%Y%m%d}{order_id:03d}"
+
+
+def order_no_of(order):
+    """订单行的订单号（order_numbers尚未回填时按同一规则生成）"""
+    if order['order_no']:
+        return order['order_no']
+    if order['created_at'] is None:
+        return None
+    return generate_order_no(order['id'], order['created_at'])
+
+
+def normalize_order_no(keyword):
+    """
+    规范化订单号关键词（转大写，省略DD时补上）
+
+    返回：
+        str: 订单号（或前缀），不是订单号格式时返回None
+    """
+    keyword = keyword.strip().upper()
+    if not ORDER_NO_PATTERN.fullmatch(keyword):
+        return None
+    return keyword if keyword.startswith('DD') else 'DD' + keyword
 
 
 # ============================================================
@@ -54,8 +115,11 @@ def mobile_get_orders(current_user_id, current_tenant_id, current_username):
     - date_to: 结束日期（YYYY-MM-DD）
     - sort_by: 排序字段（order_date|total_amount|created_at），默认order_date
     - sort_order: 排序方向（asc|desc），默认desc
+    - cursor: 游标分页（传入即启用，首页传空字符串，后续传上一页返回的next_cursor）
+    - include_total: 游标模式下是否同时返回总数（1|true），默认不统计
+    - approximate_total: 允许结果集很大时返回估算总数（1|true），此时total_is_approximate为true
     
-    响应:
+    响应（页码模式）:
     {
         "success": true,
         "code": "SUCCESS",
@@ -65,7 +129,20 @@ def mobile_get_orders(current_user_id, current_tenant_id, current_username):
             "total": 100,
             "page": 1,
             "page_size": 20,
-            "total_pages": 5
+            "total_pages": 5,
+            "total_is_approximate": false
+        }
+    }
+    
+    响应（游标模式）:
+    {
+        "data": {
+            "list": [...],
+            "page_size": 20,
+            "next_cursor": "eyJzIjoib3JkZXJfZGF0ZSIs...",
+            "has_more": true,
+            "total": null,
+            "total_is_approximate": false
         }
     }
     """
@@ -79,6 +156,10 @@ def mobile_get_orders(current_user_id, current_tenant_id, current_username):
         date_to = request.args.get('date_to', '').strip()
         sort_by = request.args.get('sort_by', 'order_date')
         sort_order = request.args.get('sort_order', 'desc').upper()
+        cursor_mode = 'cursor' in request.args
+        cursor_token = request.args.get('cursor', '').strip()
+        include_total = is_truthy(request.args.get('include_total'))
+        approximate_total = is_truthy(request.args.get('approximate_total'))
         
         # 限制每页最大数量
         page_size = min(page_size, 100)
@@ -91,6 +172,14 @@ def mobile_get_orders(current_user_id, current_tenant_id, current_username):
         if sort_order not in ['ASC', 'DESC']:
             sort_order = 'DESC'
         
+        # 解析游标
+        after = None
+        if cursor_token:
+            try:
+                after = decode_cursor(cursor_token, sort_by, sort_order)
+            except InvalidCursorError as e:
+                return response_error(str(e), 'PARAM_ERROR')
+        
         # 2. 构建SQL查询
         conn = get_db_connection()
         cursor = conn.cursor(pymysql.cursors.DictCursor)
@@ -103,7 +192,7 @@ def mobile_get_orders(current_user_id, current_tenant_id, current_username):
             # 搜索条件
             if keyword:
                 where_conditions.append("""
-                    (o.order_no LIKE %s OR c.name LIKE %s)
+                    (n.order_no LIKE %s OR c.name LIKE %s)
                 """)
                 keyword_pattern = f'%{keyword}%'
                 params.extend([keyword_pattern, keyword_pattern])
@@ -124,23 +213,44 @@ def mobile_get_orders(current_user_id, current_tenant_id, current_username):
             
             where_clause = ' AND '.join(where_conditions)
             
-            # 查询总数
-            cursor.execute(f"""
-                SELECT COUNT(*) as total
-                FROM orders o
-                LEFT JOIN customers c ON o.customer_id = c.id
-                WHERE {where_clause}
-            """, params)
-            
-            total = cursor.fetchone()['total']
-            total_pages = (total + page_size - 1) // page_size
+            # 查询总数（游标模式下默认跳过；按筛选条件缓存，订单/客户变化后失效）
+            total = None
+            total_is_approximate = False
+            if not cursor_mode or include_total:
+                # 没有关键词时客户表、订单号表不参与筛选，LEFT JOIN不影响行数，统计时省去JOIN
+                count_from = (
+                    'FROM orders o LEFT JOIN customers c ON o.customer_id = c.id '
+                    'LEFT JOIN order_numbers n ON n.order_id = o.id'
+                ) if keyword else 'FROM orders o'
+                total, total_is_approximate = count_total(
+                    cursor, current_tenant_id, 'orders',
+                    {'keyword': keyword, 'status': status, 'date_from': date_from, 'date_to': date_to},
+                    f'{count_from} WHERE {where_clause}', params,
+                    depends_on=('orders', 'customers') if keyword else ('orders',),
+                    approximate=approximate_total
+                )
             
-            # 查询列表数据
-            offset = (page - 1) * page_size
+            # 查询列表数据（以订单ID作为同值时的次级排序，保证翻页稳定）
+            if cursor_mode:
+                list_where = where_clause
+                list_params = list(params)
+                if after is not None:
+                    keyset_sql, keyset_params = keyset_condition(
+                        f'o.{sort_by}', 'o.id', sort_order, after[0], after[1]
+                    )
+                    list_where = f'{where_clause} AND {keyset_sql}'
+                    list_params.extend(keyset_params)
+                limit_clause = 'LIMIT %s'
+                list_params.append(page_size + 1)
+            else:
+                list_where = where_clause
+                list_params = params + [page_size, (page - 1) * page_size]
+                limit_clause = 'LIMIT %s OFFSET %s'
             
             cursor.execute(f"""
                 SELECT 
                     o.id,
+                    n.order_no,
                     o.order_date,
                     COALESCE(o.customer_name, c.name) as customer_name,
                     COALESCE(o.total_amount, 0) as total_amount,
@@ -149,25 +259,32 @@ def mobile_get_orders(current_user_id, current_tenant_id, current_username):
                     o.remarks as remark,
                     o.created_at,
                     o.updated_at,
+                    o.{sort_by} as sort_key,
                     c.id as customer_id,
                     c.name as customer_display_name,
                     c.contact_person,
                     c.phone as customer_phone
                 FROM orders o
                 LEFT JOIN customers c ON o.customer_id = c.id
-                WHERE {where_clause}
-                ORDER BY o.{sort_by} {sort_order}
-                LIMIT %s OFFSET %s
-            """, params + [page_size, offset])
+                LEFT JOIN order_numbers n ON n.order_id = o.id
+                WHERE {list_where}
+                ORDER BY o.{sort_by} {sort_order}, o.id {sort_order}
+                {limit_clause}
+            """, list_params)
             
             orders = cursor.fetchall()
             
+            has_more = False
+            if cursor_mode and len(orders) > page_size:
+                has_more = True
+                orders = orders[:page_size]
+            
             # 格式化返回数据
             order_list = []
             for order in orders:
                 order_list.append({
                     'id': order['id'],
-                    'order_no': order['order_no'],
+                    'order_no': order_no_of(order),
                     'customer_name': order['customer_name'],
                     'order_date': order['order_date'].isoformat() if order['order_date'] else None,
                     'total_amount': float(order['total_amount']),
@@ -177,13 +294,33 @@ def mobile_get_orders(current_user_id, current_tenant_id, current_username):
                     'created_at': order['created_at'].isoformat() if order['created_at'] else None
                 })
             
+            if cursor_mode:
+                next_cursor = None
+                if has_more:
+                    last = orders[-1]
+                    next_cursor = encode_cursor(sort_by, sort_order, last['sort_key'], last['id'])
+                
+                return response_success(
+                    data={
+                        'list': order_list,
+                        'page_size': page_size,
+                        'next_cursor': next_cursor,
+                        'has_more': has_more,
+                        'total': total,
+                        'total_is_approximate': total_is_approximate
+                    }
+                )
+            
+            total_pages = (total + page_size - 1) // page_size
+            
             return response_success(
                 data={
                     'list': order_list,
                     'total': total,
                     'page': page,
                     'page_size': page_size,
-                    'total_pages': total_pages
+                    'total_pages': total_pages,
+                    'total_is_approximate': total_is_approximate
                 }
             )
             
@@ -198,10 +335,264 @@ def mobile_get_orders(current_user_id, current_tenant_id, current_username):
         return response_error('获取订单列表失败', 'SERVER_ERROR', 500)
 
 
+# ============================================================
+# 移动端订单搜索API
+# ============================================================
+
+# MySQL执行超时（ER_QUERY_TIMEOUT）
+QUERY_TIMEOUT_ERROR = 3024
+
+# 订单搜索结果查询（WHERE条件由调用方拼接）
+ORDER_SEARCH_SELECT = """
+    SELECT /*+ MAX_EXECUTION_TIME({timeout}) */
+        o.id,
+        n.order_no,
+        o.order_date,
+        o.created_at,
+        COALESCE(o.customer_name, c.name) as customer_name,
+        COALESCE(o.total_amount, 0) as total_amount,
+        o.status
+    FROM orders o
+    LEFT JOIN customers c ON o.customer_id = c.id
+    LEFT JOIN order_numbers n ON n.order_id = o.id
+"""
+
+
+def search_orders_by_number(cursor, tenant_id, order_no, limit):
+    """
+    按订单号查找：在order_numbers的(company_id, order_no)索引上做前缀范围查询，
+    再在(company_id, legacy_order_no)索引上完整匹配旧订单号
+
+    返回：
+        list: 订单行（完整匹配订单号的在最前，其次为旧订单号匹配的，其余按订单号排序）
+    """
+    cursor.execute(ORDER_SEARCH_SELECT.format(timeout=config.ORDER_SEARCH_TIMEOUT_MS) + """
+        WHERE n.company_id = %s
+          AND n.order_no LIKE %s
+          AND IFNULL(o.order_type, 'normal') != 'aftersale'
+        ORDER BY n.order_no
+        LIMIT %s
+    """, (tenant_id, order_no + '%', limit))
+    rows = list(cursor.fetchall())
+
+    # 旧订单号是新订单号的前缀，通常已在上面的结果中，单独查询是为了不被LIMIT截掉
+    cursor.execute(ORDER_SEARCH_SELECT.format(timeout=config.ORDER_SEARCH_TIMEOUT_MS) + """
+        WHERE n.company_id = %s
+          AND n.legacy_order_no = %s
+          AND IFNULL(o.order_type, 'normal') != 'aftersale'
+        ORDER BY n.order_no
+        LIMIT %s
+    """, (tenant_id, order_no, limit))
+    legacy_rows = list(cursor.fetchall())
+    if not legacy_rows:
+        return rows
+
+    exact = [row for row in rows if row['order_no'] == order_no]
+    seen = {row['id'] for row in exact + legacy_rows}
+    return exact + legacy_rows + [row for row in rows if row['id'] not in seen]
+
+
+def search_orders_by_customer(cursor, tenant_id, keyword, limit):
+    """
+    按客户名称查找：客户搜索索引得到匹配的客户，再按customer_id取最近的订单
+    匹配的客户超过ORDER_SEARCH_MAX_CUSTOMERS个时只查最近下单最活跃的客户
+
+    返回：
+        tuple: (订单行（按下单日期倒序）, 是否因客户过多而省略了部分客户)
+    """
+    customer_ids, truncated = customer_index.search_names(
+        cursor, tenant_id, keyword, config.ORDER_SEARCH_MAX_CUSTOMERS
+    )
+    if not customer_ids:
+        return [], truncated
+
+    cursor.execute(ORDER_SEARCH_SELECT.format(timeout=config.ORDER_SEARCH_TIMEOUT_MS) + f"""
+        WHERE o.company_id = %s
+          AND o.customer_id IN ({', '.join(['%s'] * len(customer_ids))})
+          AND IFNULL(o.order_type, 'normal') != 'aftersale'
+        ORDER BY o.order_date DESC, o.id DESC
+        LIMIT %s
+    """, [tenant_id] + customer_ids + [limit])
+    return list(cursor.fetchall()), truncated
+
+
+def format_search_row(order):
+    """格式化订单搜索结果（轻量字段）"""
+    return {
+        'id': order['id'],
+        'order_no': order_no_of(order),
+        'customer_name': order['customer_name'],
+        'order_date': order['order_date'].isoformat() if order['order_date'] else None,
+        'total_amount': float(order['total_amount']),
+        'status': order['status']
+    }
+
+
+@mobile_order_bp.route('/api/mobile/orders/search', methods=['GET'])
+@require_mobile_auth
+def mobile_search_orders(current_user_id, current_tenant_id, current_username):
+    """
+    快速搜索订单（按订单号或客户名称）
+    
+    请求头:
+    Authorization: Bearer <token>
+    
+    Query参数:
+    - keyword: 订单号（完整或前缀，至少到创建日期，如DD20260115、DD20260115012）或客户名称
+    - limit: 返回数量，默认20，最大50
+    
+    响应:
+    {
+        "success": true,
+        "code": "SUCCESS",
+        "message": "success",
+        "data": {
+            "list": [
+                {"id": 12, "order_no": "DD20260115012", "customer_name": "...",
+                 "order_date": "2026-01-15", "total_amount": 100.0, "status": "pending"}
+            ],
+            "truncated": false
+        }
+    }
+    
+    说明:
+    - 订单号格式的关键词在order_numbers的(company_id, order_no)索引上做前缀匹配，
+      同时完整匹配旧订单号（ID达到1000的订单截断格式的订单号），其它关键词在客户搜索索引中匹配客户名称后按customer_id查询，均不执行LIKE '%kw%'
+    - 每条SQL限制执行时间ORDER_SEARCH_TIMEOUT_MS，超时时返回已得到的结果，truncated为true
+    - 匹配的客户超过ORDER_SEARCH_MAX_CUSTOMERS个时只查询最近下单最活跃的客户，truncated同样为true
+    """
+    try:
+        keyword = request.args.get('keyword', '').strip()
+        try:
+            limit = min(int(request.args.get('limit', 20)), 50)
+        except ValueError:
+            return response_error('limit格式错误', 'PARAM_ERROR')
+        
+        if not keyword:
+            return response_error('搜索关键词不能为空', 'PARAM_ERROR')
+        
+        conn = get_db_connection()
+        cursor = conn.cursor(pymysql.cursors.DictCursor)
+        
+        try:
+            rows = []
+            truncated = False
+            try:
+                order_no = normalize_order_no(keyword)
+                if order_no is not None:
+                    rows = search_orders_by_number(cursor, current_tenant_id, order_no, limit)
+                
+                if len(rows) < limit:
+                    seen = {row['id'] for row in rows}
+                    customer_rows, truncated = search_orders_by_customer(cursor, current_tenant_id, keyword, limit)
+                    rows.extend(row for row in customer_rows if row['id'] not in seen)
+            except pymysql.err.OperationalError as e:
+                if e.args[0] != QUERY_TIMEOUT_ERROR:
+                    raise
+                truncated = True
+            
+            return response_success(data={
+                'list': [format_search_row(row) for row in rows[:limit]],
+                'truncated': truncated
+            })
+            
+        finally:
+            cursor.close()
+            conn.close()
+    
+    except Exception as e:
+        print(f"[Mobile Search Orders Error] {str(e)}")
+        return response_error('搜索订单失败', 'SERVER_ERROR', 500)
+
+
 # ============================================================
 # 移动端订单详情API
 # ============================================================
 
+# 订单详情表头查询（WHERE条件由调用方拼接）
+ORDER_DETAIL_SELECT = """
+    SELECT 
+        o.id,
+        n.order_no,
+        o.order_date,
+        COALESCE(o.total_amount, 0) as total_amount,
+        o.status,
+        o.remarks as remark,
+        o.created_at,
+        o.updated_at,
+        c.id as customer_id,
+        COALESCE(o.customer_name, c.name) as customer_name,
+        c.contact_person,
+        c.phone as customer_phone,
+        c.address as customer_address
+    FROM orders o
+    LEFT JOIN customers c ON o.customer_id = c.id
+    LEFT JOIN order_numbers n ON n.order_id = o.id
+"""
+
+# 订单项查询（WHERE条件由调用方拼接）
+ORDER_ITEMS_SELECT = """
+    SELECT 
+        oi.id,
+        oi.order_id,
+        oi.service_id,
+        oi.service_name,
+        oi.quantity,
+        oi.unit_price,
+        oi.total_price,
+        oi.remark,
+        s.unit,
+        s.category
+    FROM order_items oi
+    LEFT JOIN services s ON oi.service_id = s.id
+"""
+
+
+def format_order_item(item):
+    """格式化订单项数据"""
+    return {
+        'id': item['id'],
+        'service_id': item['service_id'],
+        'service_name': item['service_name'],
+        'quantity': float(item['quantity']),
+        'unit_price': float(item['unit_price']),
+        'total_price': float(item['total_price']),
+        'unit': item['unit'],
+        'category': item['category'],
+        'remark': item['remark']
+    }
+
+
+def format_order_detail(order, item_list):
+    """格式化订单详情（订单详情和批量详情接口共用）"""
+    return {
+        'order': {
+            'id': order['id'],
+            'order_no': order_no_of(order),
+            'customer_name': order['customer_name'],
+            'order_date': order['order_date'].isoformat() if order['order_date'] else None,
+            'sales_person': '未分配',  # 可以从数据库获取
+            'service_person': '未分配',  # 可以从数据库获取
+            'operations_person': '未分配',  # 可以从数据库获取
+            'team_name': '默认团队',  # 可以从数据库获取
+            'project_name': '默认项目',  # 可以从数据库获取
+            'company_name': '默认公司',  # 可以从数据库获取
+            'original_amount': float(order['total_amount']),
+            'adjustment_amount': 0,  # 可以从数据库获取
+            'total_amount': float(order['total_amount']),
+            'received_amount': 0,  # 可以从收款记录计算
+            'status': order['status'],
+            'remark': order['remark'],
+            'created_at': order['created_at'].isoformat() if order['created_at'] else None,
+            'updated_at': order['updated_at'].isoformat() if order['updated_at'] else None
+        },
+        'payments': [],  # 可以从收款记录获取
+        'contracts': [],  # 可以从合同表获取
+        'logs': [],  # 可以从操作日志获取
+        'items': item_list
+    }
+
+
 @mobile_order_bp.route('/api/mobile/orders/<int:order_id>', methods=['GET'])
 @require_mobile_auth
 def mobile_get_order_detail(order_id, current_user_id, current_tenant_id, current_username):
@@ -214,6 +605,10 @@ def mobile_get_order_detail(order_id, current_user_id, current_tenant_id, curren
     路径参数:
     - order_id: 订单ID
     
+    协商缓存:
+    响应携带ETag/Last-Modified，请求带If-None-Match/If-Modified-Since且订单、客户、
+    订单项（含关联服务的单位、分类）均未变化时返回304（无响应体）
+    
     响应:
     {
         "success": true,
@@ -230,24 +625,55 @@ def mobile_get_order_detail(order_id, current_user_id, current_tenant_id, curren
         cursor = conn.cursor(pymysql.cursors.DictCursor)
         
         try:
-            # 1. 查询订单基本信息
+            # 1. 轻量查询版本信息（订单、客户更新时间和订单项汇总），未变化时直接返回304；
+            #    订单项显示的服务名称和关联服务的单位、分类不在上述字段中，按行求校验和
             cursor.execute("""
                 SELECT 
-                    o.id,
-                    CONCAT('DD', DATE_FORMAT(o.created_at, '%Y%m%d'), LPAD(o.id, 3, '0')) as order_no,
-                    o.order_date,
-                    COALESCE(o.total_amount, 0) as total_amount,
-                    o.status,
-                    o.remarks as remark,
-                    o.created_at,
                     o.updated_at,
-                    c.id as customer_id,
-                    COALESCE(o.customer_name, c.name) as customer_name,
-                    c.contact_person,
-                    c.phone as customer_phone,
-                    c.address as customer_address
+                    o.status,
+                    o.total_amount,
+                    c.updated_at as customer_updated_at,
+                    i.item_count,
+                    i.max_item_id,
+                    i.item_total,
+                    i.item_quantity,
+                    i.service_checksum
                 FROM orders o
                 LEFT JOIN customers c ON o.customer_id = c.id
+                LEFT JOIN (
+                    SELECT 
+                        oi.order_id,
+                        COUNT(*) as item_count,
+                        MAX(oi.id) as max_item_id,
+                        SUM(oi.total_price) as item_total,
+                        SUM(oi.quantity) as item_quantity,
+                        SUM(CRC32(CONCAT_WS('|', oi.id, QUOTE(oi.service_name), QUOTE(s.unit), QUOTE(s.category)))) as service_checksum
+                    FROM order_items oi
+                    LEFT JOIN services s ON oi.service_id = s.id
+                    WHERE oi.order_id = %s
+                    GROUP BY oi.order_id
+                ) i ON i.order_id = o.id
+                WHERE o.id = %s AND o.company_id = %s
+                LIMIT 1
+            """, (order_id, order_id, current_tenant_id))
+            
+            version = cursor.fetchone()
+            
+            if not version:
+                return response_error('订单不存在', 'ORDER_NOT_FOUND', 404)
+            
+            etag = make_etag(
+                'order', order_id, version['updated_at'], version['status'], version['total_amount'],
+                version['customer_updated_at'], version['item_count'], version['max_item_id'],
+                version['item_total'], version['item_quantity'], version['service_checksum']
+            )
+            last_modified = latest_timestamp(version['updated_at'], version['customer_updated_at'])
+            
+            if is_not_modified(etag, last_modified):
+                return not_modified_response(etag, last_modified)
+            
+            # 2. 查询订单基本信息
+            cursor.execute(ORDER_DETAIL_SELECT + """
                 WHERE o.id = %s AND o.company_id = %s
                 LIMIT 1
             """, (order_id, current_tenant_id))
@@ -257,70 +683,19 @@ def mobile_get_order_detail(order_id, current_user_id, current_tenant_id, curren
             if not order:
                 return response_error('订单不存在', 'ORDER_NOT_FOUND', 404)
             
-            # 2. 查询订单项
-            cursor.execute("""
-                SELECT 
-                    oi.id,
-                    oi.service_id,
-                    oi.service_name,
-                    oi.quantity,
-                    oi.unit_price,
-                    oi.total_price,
-                    oi.remark,
-                    s.unit,
-                    s.category
-                FROM order_items oi
-                LEFT JOIN services s ON oi.service_id = s.id
+            # 3. 查询订单项
+            cursor.execute(ORDER_ITEMS_SELECT + """
                 WHERE oi.order_id = %s
                 ORDER BY oi.id ASC
             """, (order_id,))
             
             items = cursor.fetchall()
             
-            # 格式化订单项数据
-            item_list = []
-            for item in items:
-                item_list.append({
-                    'id': item['id'],
-                    'service_id': item['service_id'],
-                    'service_name': item['service_name'],
-                    'quantity': float(item['quantity']),
-                    'unit_price': float(item['unit_price']),
-                    'total_price': float(item['total_price']),
-                    'unit': item['unit'],
-                    'category': item['category'],
-                    'remark': item['remark']
-                })
-            
             # 返回响应
-            return response_success(
-                data={
-                    'order': {
-                        'id': order['id'],
-                        'order_no': order['order_no'],
-                        'customer_name': order['customer_name'],
-                        'order_date': order['order_date'].isoformat() if order['order_date'] else None,
-                        'sales_person': '未分配',  # 可以从数据库获取
-                        'service_person': '未分配',  # 可以从数据库获取
-                        'operations_person': '未分配',  # 可以从数据库获取
-                        'team_name': '默认团队',  # 可以从数据库获取
-                        'project_name': '默认项目',  # 可以从数据库获取
-                        'company_name': '默认公司',  # 可以从数据库获取
-                        'original_amount': float(order['total_amount']),
-                        'adjustment_amount': 0,  # 可以从数据库获取
-                        'total_amount': float(order['total_amount']),
-                        'received_amount': 0,  # 可以从收款记录计算
-                        'status': order['status'],
-                        'remark': order['remark'],
-                        'created_at': order['created_at'].isoformat() if order['created_at'] else None,
-                        'updated_at': order['updated_at'].isoformat() if order['updated_at'] else None
-                    },
-                    'payments': [],  # 可以从收款记录获取
-                    'contracts': [],  # 可以从合同表获取
-                    'logs': [],  # 可以从操作日志获取
-                    'items': item_list
-                }
+            response = response_success(
+                data=format_order_detail(order, [format_order_item(item) for item in items])
             )
+            return add_validators(response, etag, last_modified)
             
         finally:
             cursor.close()
@@ -331,21 +706,93 @@ def mobile_get_order_detail(order_id, current_user_id, current_tenant_id, curren
         return response_error('获取订单详情失败', 'SERVER_ERROR', 500)
 
 
+@mobile_order_bp.route('/api/mobile/orders/by-no/<order_no>', methods=['GET'])
+@require_mobile_auth
+def mobile_get_order_by_no(order_no, current_user_id, current_tenant_id, current_username):
+    """
+    按订单号获取订单详情（扫码查看订单）
+    
+    请求头:
+    Authorization: Bearer <token>
+    
+    路径参数:
+    - order_no: 完整订单号（如DD20260115012，不区分大小写，可省略DD）
+    
+    响应:
+    同/api/mobile/orders/<order_id>
+    
+    说明:
+    - 订单号在order_numbers的(company_id, order_no)唯一索引上一次查找定位订单
+    - 找不到时按旧订单号（ID达到1000的订单截断格式的订单号）查找，
+      旧订单号对应多个订单时返回409 ORDER_NO_AMBIGUOUS，需改用订单搜索
+    """
+    try:
+        order_no = normalize_order_no(order_no)
+        if order_no is None:
+            return response_error('订单号格式错误', 'PARAM_ERROR')
+        
+        conn = get_db_connection()
+        cursor = conn.cursor(pymysql.cursors.DictCursor)
+        
+        try:
+            cursor.execute(ORDER_DETAIL_SELECT + """
+                WHERE n.company_id = %s AND n.order_no = %s
+                LIMIT 1
+            """, (current_tenant_id, order_no))
+            
+            order = cursor.fetchone()
+            
+            if not order:
+                cursor.execute(ORDER_DETAIL_SELECT + """
+                    WHERE n.company_id = %s AND n.legacy_order_no = %s
+                    LIMIT 2
+                """, (current_tenant_id, order_no))
+                
+                legacy_orders = cursor.fetchall()
+                
+                if len(legacy_orders) > 1:
+                    return response_error('订单号对应多个订单，请使用订单搜索', 'ORDER_NO_AMBIGUOUS', 409)
+                if not legacy_orders:
+                    return response_error('订单不存在', 'ORDER_NOT_FOUND', 404)
+                order = legacy_orders[0]
+            
+            cursor.execute(ORDER_ITEMS_SELECT + """
+                WHERE oi.order_id = %s
+                ORDER BY oi.id ASC
+            """, (order['id'],))
+            
+            items = cursor.fetchall()
+            
+            return response_success(
+                data=format_order_detail(order, [format_order_item(item) for item in items])
+            )
+            
+        finally:
+            cursor.close()
+            conn.close()
+    
+    except Exception as e:
+        print(f"[Mobile Get Order By No Error] {str(e)}")
+        return response_error('获取订单详情失败', 'SERVER_ERROR', 500)
+
+
 # ============================================================
-# 移动端订单统计API
+# 移动端批量订单详情API
 # ============================================================
 
-@mobile_order_bp.route('/api/mobile/orders/statistics', methods=['GET'])
+@mobile_order_bp.route('/api/mobile/orders/batch', methods=['GET'])
 @require_mobile_auth
-def mobile_get_order_statistics(current_user_id, current_tenant_id, current_username):
+def mobile_get_orders_batch(current_user_id, current_tenant_id, current_username):
     """
-    获取订单统计数据（用于首页展示）
+    批量获取订单详情（用于列表页预取下一屏详情）
+    
+    固定两次查询：一次IN查询订单表头，一次IN查询全部订单项，在内存中按订单分组
     
     请求头:
     Authorization: Bearer <token>
     
     Query参数:
-    - period: 统计周期（today|week|month|year），默认month
+    - ids: 订单ID列表，逗号分隔，最多ORDER_BATCH_MAX_SIZE个
     
     响应:
     {
@@ -353,58 +800,70 @@ def mobile_get_order_statistics(current_user_id, current_tenant_id, current_user
         "code": "SUCCESS",
         "message": "success",
         "data": {
-            "total_count": 100,
-            "total_amount": 500000.00,
-            "pending_count": 10,
-            "confirmed_count": 20,
-            "shipped_count": 30,
-            "completed_count": 40
+            "list": [{"order": {...}, "items": [...], ...}, ...],  // 按请求顺序
+            "missing_ids": [12]  // 不存在或不属于当前公司的订单
         }
     }
     """
     try:
-        period = request.args.get('period', 'month').strip()
+        # 1. 解析订单ID（去重并保持请求顺序，超过上限时立即拒绝）
+        order_ids = []
+        seen = set()
+        try:
+            for raw_id in request.args.get('ids', '').split(','):
+                raw_id = raw_id.strip()
+                if raw_id:
+                    order_id = int(raw_id)
+                    if order_id not in seen:
+                        seen.add(order_id)
+                        order_ids.append(order_id)
+                        if len(order_ids) > config.ORDER_BATCH_MAX_SIZE:
+                            return response_error(f'一次最多查询{config.ORDER_BATCH_MAX_SIZE}个订单', 'PARAM_ERROR')
+        except ValueError:
+            return response_error('订单ID格式错误', 'PARAM_ERROR')
         
-        # 确定日期范围
-        date_condition = ""
-        if period == 'today':
-            date_condition = "AND o.order_date = CURDATE()"
-        elif period == 'week':
-            date_condition = "AND o.order_date >= DATE_SUB(CURDATE(), INTERVAL 7 DAY)"
-        elif period == 'month':
-            date_condition = "AND o.order_date >= DATE_SUB(CURDATE(), INTERVAL 30 DAY)"
-        elif period == 'year':
-            date_condition = "AND o.order_date >= DATE_SUB(CURDATE(), INTERVAL 365 DAY)"
+        if not order_ids:
+            return response_error('订单ID不能为空', 'PARAM_ERROR')
         
         conn = get_db_connection()
         cursor = conn.cursor(pymysql.cursors.DictCursor)
         
         try:
-            # 查询统计数据
-            cursor.execute(f"""
-                SELECT 
-                    COUNT(*) as total_count,
-                    IFNULL(SUM(CASE WHEN o.status != 'cancelled' THEN o.total_amount ELSE 0 END), 0) as total_amount,
-                    SUM(CASE WHEN o.status = 'pending' THEN 1 ELSE 0 END) as pending_count,
-                    SUM(CASE WHEN o.status = 'confirmed' THEN 1 ELSE 0 END) as confirmed_count,
-                    SUM(CASE WHEN o.status = 'shipped' THEN 1 ELSE 0 END) as shipped_count,
-                    SUM(CASE WHEN o.status = 'completed' THEN 1 ELSE 0 END) as completed_count
-                FROM orders o
-                WHERE o.company_id = %s
-                  AND IFNULL(o.order_type, 'normal') != 'aftersale'
-                  {date_condition}
-            """, (current_tenant_id,))
+            placeholders = ', '.join(['%s'] * len(order_ids))
             
-            stats = cursor.fetchone()
+            # 2. 一次查询全部订单表头（按公司过滤）
+            cursor.execute(ORDER_DETAIL_SELECT + f"""
+                WHERE o.id IN ({placeholders}) AND o.company_id = %s
+            """, order_ids + [current_tenant_id])
+            
+            orders = {order['id']: order for order in cursor.fetchall()}
+            
+            # 3. 一次查询全部订单项（只查属于当前公司的订单）
+            items_by_order = {order_id: [] for order_id in orders}
+            if orders:
+                found_ids = list(orders.keys())
+                cursor.execute(ORDER_ITEMS_SELECT + f"""
+                    WHERE oi.order_id IN ({', '.join(['%s'] * len(found_ids))})
+                    ORDER BY oi.order_id ASC, oi.id ASC
+                """, found_ids)
+                
+                for item in cursor.fetchall():
+                    items_by_order[item['order_id']].append(format_order_item(item))
+            
+            # 4. 按请求顺序组装
+            result_list = []
+            missing_ids = []
+            for order_id in order_ids:
+                order = orders.get(order_id)
+                if order is None:
+                    missing_ids.append(order_id)
+                    continue
+                result_list.append(format_order_detail(order, items_by_order[order_id]))
             
             return response_success(
                 data={
-                    'total_count': stats['total_count'] or 0,
-                    'total_amount': float(stats['total_amount']) if stats['total_amount'] else 0.0,
-                    'pending_count': stats['pending_count'] or 0,
-                    'confirmed_count': stats['confirmed_count'] or 0,
-                    'shipped_count': stats['shipped_count'] or 0,
-                    'completed_count': stats['completed_count'] or 0
+                    'list': result_list,
+                    'missing_ids': missing_ids
                 }
             )
             
@@ -412,6 +871,112 @@ def mobile_get_order_statistics(current_user_id, current_tenant_id, current_user
             cursor.close()
             conn.close()
     
+    except Exception as e:
+        print(f"[Mobile Get Orders Batch Error] {str(e)}")
+        return response_error('批量获取订单详情失败', 'SERVER_ERROR', 500)
+
+
+# ============================================================
+# 移动端订单统计API
+# ============================================================
+
+def parse_statistics_range(args):
+    """
+    订单统计日期范围
+
+    传入date_from/date_to时使用自定义范围，否则按周期（today|week|month|year|all）；
+    周期模式不限结束日期，与原按order_date >= 起始日期的口径一致
+
+    返回：
+        tuple: (开始日期, 结束日期)
+    """
+    today = date.today()
+    date_from, date_to = ALL_TIME
+    
+    if args.get('date_from') or args.get('date_to'):
+        if args.get('date_from'):
+            date_from = parse_date(args['date_from'], 'date_from')
+        if args.get('date_to'):
+            date_to = parse_date(args['date_to'], 'date_to')
+        if date_from > date_to:
+            raise ValueError('date_from不能晚于date_to')
+        return date_from, date_to
+    
+    period = args.get('period', 'month').strip()
+    if period == 'today':
+        date_from = date_to = today
+    elif period == 'week':
+        date_from = today - timedelta(days=7)
+    elif period == 'month':
+        date_from = today - timedelta(days=30)
+    elif period == 'year':
+        date_from = today - timedelta(days=365)
+    return date_from, date_to
+
+
+def compute_order_statistics(tenant_id, date_from, date_to):
+    """
+    区间订单统计（前缀和两次查表，见range_stats.py）
+
+    不限日期的统计（period=all）与原接口一致，计入没有下单日期的订单（range_stats.ALL_TIME）
+    """
+    conn = get_db_connection()
+    cursor = conn.cursor(pymysql.cursors.DictCursor)
+    
+    try:
+        totals = range_stats.totals(cursor, tenant_id, date_from, date_to)
+    finally:
+        cursor.close()
+        conn.close()
+    
+    return {
+        'total_count': totals['order_count'],
+        'total_amount': format_metric('order_amount', totals['order_amount']),
+        'pending_count': totals['pending_count'],
+        'confirmed_count': totals['confirmed_count'],
+        'shipped_count': totals['shipped_count'],
+        'completed_count': totals['completed_count']
+    }
+
+
+@mobile_order_bp.route('/api/mobile/orders/statistics', methods=['GET'])
+@require_mobile_auth
+@coalesce_requests
+def mobile_get_order_statistics(current_user_id, current_tenant_id, current_username):
+    """
+    获取订单统计数据（用于首页展示）
+    
+    请求头:
+    Authorization: Bearer <token>
+    
+    Query参数:
+    - period: 统计周期（today|week|month|year|all），默认month
+    - date_from: 自定义开始日期（YYYY-MM-DD），传入date_from/date_to时忽略period
+    - date_to: 自定义结束日期（YYYY-MM-DD）
+    
+    响应:
+    {
+        "success": true,
+        "code": "SUCCESS",
+        "message": "success",
+        "data": {
+            "total_count": 100,
+            "total_amount": 500000.00,
+            "pending_count": 10,
+            "confirmed_count": 20,
+            "shipped_count": 30,
+            "completed_count": 40
+        }
+    }
+    """
+    try:
+        try:
+            date_from, date_to = parse_statistics_range(request.args)
+        except ValueError as e:
+            return response_error(str(e), 'PARAM_ERROR')
+        
+        return response_success(data=compute_order_statistics(current_tenant_id, date_from, date_to))
+    
     except Exception as e:
         print(f"[Mobile Get Order Statistics Error] {str(e)}")
         return response_error('获取订单统计失败', 'SERVER_ERROR', 500)
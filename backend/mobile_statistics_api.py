@@ -5,8 +5,29 @@
 """
 
 from flask import Blueprint, request
+import heapq
 import pymysql
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
+
+from config import config
+from cache import TTLCache
+from pagination import is_truthy
+from parallel import run_parallel
+from range_stats import ALL_TIME, range_stats
+from single_flight import coalesce_requests
+from mobile_order_api import compute_order_statistics, parse_statistics_range
+from stats_series import (
+    GRANULARITIES,
+    aggregate_series,
+    bucket_ranges,
+    format_metric,
+    format_totals,
+    parse_date,
+    parse_metrics
+)
+
+# 导入数据库连接池
+from db_pool import get_db_connection
 
 # 导入移动端权限模块
 from mobile_auth import (
@@ -18,26 +39,116 @@ from mobile_auth import (
 # 创建Blueprint
 mobile_statistics_bp = Blueprint('mobile_statistics', __name__)
 
-# 数据库配置
-DB_CONFIG = {
-    'host': 'localhost',
-    'user': 'ajkuaiji',
-    'password': '@HNzb5z75b16',
-    'database': 'ajkuaiji',
-    'charset': 'utf8mb4'
-}
 
-def get_db_connection():
-    """获取数据库连接"""
-    return pymysql.connect(**DB_CONFIG)
+# ============================================================
+# 统计结果缓存
+# ============================================================
+
+# 键：(租户ID, 统计项)，值：统计结果（含generated_at）
+stats_cache = TTLCache(ttl=config.STATS_CACHE_TTL, max_entries=config.STATS_CACHE_MAX_ENTRIES)
+
+
+def invalidate_stats(tenant_id, scope=None):
+    """失效租户的统计缓存（scope为统计项，默认全部）"""
+    return stats_cache.invalidate_tenant(tenant_id, scope)
+
+
+def get_cached_stats(tenant_id, scope, compute, refresh=False, params=()):
+    """
+    读取统计缓存，未命中或refresh时重新计算并写入
+
+    参数：
+        tenant_id: 租户ID
+        scope: 统计项（如overview、ranking）
+        compute: 无参函数，返回统计结果（dict结果会附加generated_at）
+        refresh: 强制重新计算（客户端下拉刷新、预热）
+        params: 影响结果的参数（同一统计项不同参数分别缓存）
+    """
+    key = (tenant_id, scope, tuple(params))
+    if not refresh:
+        cached = stats_cache.get(key)
+        if cached is not None:
+            return cached
+
+    data = compute()
+    if isinstance(data, dict):
+        data['generated_at'] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    stats_cache.set(key, data)
+    return data
 
 
 # ============================================================
 # 移动端概览统计API
 # ============================================================
 
+def query_order_overview(tenant_id):
+    """今日/本月/累计订单统计（前缀和查表，见range_stats.py；累计计入没有下单日期的订单）"""
+    conn = get_db_connection()
+    cursor = conn.cursor(pymysql.cursors.DictCursor)
+    
+    try:
+        today = date.today()
+        today_totals, month_totals, all_totals = range_stats.bucket_totals(
+            cursor, tenant_id,
+            [(today, today), (today.replace(day=1), today), ALL_TIME],
+            ('order_count', 'order_amount')
+        )
+        return {
+            'today': totals_to_overview(today_totals),
+            'month': totals_to_overview(month_totals),
+            'total': totals_to_overview(all_totals)
+        }
+    
+    finally:
+        cursor.close()
+        conn.close()
+
+
+def totals_to_overview(totals):
+    """区间内的订单数和金额"""
+    return {
+        'order_count': totals['order_count'],
+        'total_amount': format_metric('order_amount', totals['order_amount'])
+    }
+
+
+def query_customer_count(tenant_id):
+    """有效客户总数"""
+    conn = get_db_connection()
+    cursor = conn.cursor(pymysql.cursors.DictCursor)
+    
+    try:
+        cursor.execute("""
+            SELECT COUNT(*) as customer_count
+            FROM customers
+            WHERE company_id = %s AND status = 'active'
+        """, (tenant_id,))
+        return cursor.fetchone()['customer_count'] or 0
+    
+    finally:
+        cursor.close()
+        conn.close()
+
+
+def compute_overview(tenant_id):
+    """计算概览统计（订单汇总与客户数并发查询）"""
+    results = run_parallel({
+        'orders': lambda: query_order_overview(tenant_id),
+        'customer_count': lambda: query_customer_count(tenant_id)
+    })
+    orders = results['orders']
+    orders['total']['customer_count'] = results['customer_count']
+    return orders
+
+
+def get_overview(tenant_id, refresh=False):
+    """读取概览统计（按租户缓存）"""
+    return get_cached_stats(tenant_id, 'overview', lambda: compute_overview(tenant_id), refresh=refresh)
+
+
 @mobile_statistics_bp.route('/api/mobile/statistics/overview', methods=['GET'])
 @require_mobile_auth
+@coalesce_requests
 def mobile_get_overview(current_user_id, current_tenant_id, current_username):
     """
     获取概览统计数据（首页展示）
@@ -45,6 +156,9 @@ def mobile_get_overview(current_user_id, current_tenant_id, current_username):
     请求头:
     Authorization: Bearer <token>
     
+    Query参数:
+    - refresh: 是否跳过缓存重新计算（下拉刷新时传1），默认0
+    
     响应:
     {
         "success": true,
@@ -53,83 +167,18 @@ def mobile_get_overview(current_user_id, current_tenant_id, current_username):
         "data": {
             "today": {...},
             "month": {...},
-            "total": {...}
+            "total": {...},
+            "generated_at": "2026-02-01 10:00:00"
         }
     }
+    
+    说明:
+    - 结果按租户缓存STATS_CACHE_TTL秒（统计数据允许延迟5分钟），generated_at为计算时间
     """
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor(pymysql.cursors.DictCursor)
+        refresh = is_truthy(request.args.get('refresh'))
         
-        try:
-            # 1. 今日统计
-            cursor.execute("""
-                SELECT 
-                    COUNT(*) as order_count,
-                    IFNULL(SUM(CASE WHEN status != 'cancelled' THEN total_amount ELSE 0 END), 0) as total_amount
-                FROM orders
-                WHERE company_id = %s
-                  AND IFNULL(order_type, 'normal') != 'aftersale'
-                  AND order_date = CURDATE()
-            """, (current_tenant_id,))
-            
-            today = cursor.fetchone()
-            
-            # 2. 本月统计
-            cursor.execute("""
-                SELECT 
-                    COUNT(*) as order_count,
-                    IFNULL(SUM(CASE WHEN status != 'cancelled' THEN total_amount ELSE 0 END), 0) as total_amount
-                FROM orders
-                WHERE company_id = %s
-                  AND IFNULL(order_type, 'normal') != 'aftersale'
-                  AND order_date >= DATE_FORMAT(CURDATE(), '%Y-%m-01')
-            """, (current_tenant_id,))
-            
-            month = cursor.fetchone()
-            
-            # 3. 累计统计
-            cursor.execute("""
-                SELECT 
-                    COUNT(*) as order_count,
-                    IFNULL(SUM(CASE WHEN status != 'cancelled' THEN total_amount ELSE 0 END), 0) as total_amount
-                FROM orders
-                WHERE company_id = %s
-                  AND IFNULL(order_type, 'normal') != 'aftersale'
-            """, (current_tenant_id,))
-            
-            total = cursor.fetchone()
-            
-            # 4. 客户总数
-            cursor.execute("""
-                SELECT COUNT(*) as customer_count
-                FROM customers
-                WHERE company_id = %s AND status = 'active'
-            """, (current_tenant_id,))
-            
-            customer_count = cursor.fetchone()['customer_count']
-            
-            return response_success(
-                data={
-                    'today': {
-                        'order_count': today['order_count'] or 0,
-                        'total_amount': float(today['total_amount']) if today['total_amount'] else 0.0
-                    },
-                    'month': {
-                        'order_count': month['order_count'] or 0,
-                        'total_amount': float(month['total_amount']) if month['total_amount'] else 0.0
-                    },
-                    'total': {
-                        'order_count': total['order_count'] or 0,
-                        'total_amount': float(total['total_amount']) if total['total_amount'] else 0.0,
-                        'customer_count': customer_count or 0
-                    }
-                }
-            )
-            
-        finally:
-            cursor.close()
-            conn.close()
+        return response_success(data=get_overview(current_tenant_id, refresh=refresh))
     
     except Exception as e:
         print(f"[Mobile Get Overview Error] {str(e)}")
@@ -140,8 +189,60 @@ def mobile_get_overview(current_user_id, current_tenant_id, current_username):
 # 移动端趋势统计API
 # ============================================================
 
+def parse_trend_params(args):
+    """
+    解析任意范围模式的趋势参数
+
+    返回：
+        tuple: (开始日期, 结束日期, 粒度, 指标列表)
+    """
+    today = date.today()
+    date_to = parse_date(args['date_to'], 'date_to') if args.get('date_to') else today
+    date_from = (parse_date(args['date_from'], 'date_from') if args.get('date_from')
+                 else date_to - timedelta(days=29))
+    granularity = args.get('granularity', 'day').strip()
+    metrics = parse_metrics(args.get('metrics'))
+    
+    if granularity not in GRANULARITIES:
+        raise ValueError('granularity仅支持day|week|month')
+    if date_from > date_to:
+        raise ValueError('date_from不能晚于date_to')
+    if (date_to - date_from).days + 1 > config.TREND_MAX_DAYS:
+        raise ValueError(f'日期范围不能超过{config.TREND_MAX_DAYS}天')
+    return date_from, date_to, granularity, metrics
+
+
+def compute_trend(tenant_id, date_from, date_to, granularity, metrics):
+    """计算趋势数据（每个点由前缀和两次查表得到，见range_stats.py）"""
+    buckets = bucket_ranges(date_from, date_to, granularity)
+    
+    conn = get_db_connection()
+    cursor = conn.cursor(pymysql.cursors.DictCursor)
+    
+    try:
+        bucket_totals = range_stats.bucket_totals(
+            cursor, tenant_id,
+            [(start, end) for _, start, end in buckets] + [(date_from, date_to)],
+            metrics
+        )
+    finally:
+        cursor.close()
+        conn.close()
+    
+    totals = bucket_totals.pop()
+    return {
+        'date_from': date_from.strftime('%Y-%m-%d'),
+        'date_to': date_to.strftime('%Y-%m-%d'),
+        'granularity': granularity,
+        'metrics': metrics,
+        'list': aggregate_series(buckets, bucket_totals),
+        'totals': format_totals(totals)
+    }
+
+
 @mobile_statistics_bp.route('/api/mobile/statistics/trend', methods=['GET'])
 @require_mobile_auth
+@coalesce_requests
 def mobile_get_trend(current_user_id, current_tenant_id, current_username):
     """
     获取趋势统计数据（用于图表展示）
@@ -149,74 +250,73 @@ def mobile_get_trend(current_user_id, current_tenant_id, current_username):
     请求头:
     Authorization: Bearer <token>
     
-    Query参数:
+    Query参数（任意范围模式）:
+    - date_from: 开始日期（YYYY-MM-DD），默认date_to前29天
+    - date_to: 结束日期（YYYY-MM-DD），默认今天
+    - granularity: 粒度（day|week|month），默认day
+    - metrics: 指标，逗号分隔（order_count,order_amount,pending_count,confirmed_count,
+      shipped_count,completed_count,cancelled_count），默认order_count,order_amount
+    
+    Query参数（兼容旧版，未传以上任一参数时生效）:
     - period: 统计周期（week|month|year），默认month
     - type: 统计类型（order_count|order_amount），默认order_amount
     
-    响应:
+    响应（任意范围模式）:
     {
         "success": true,
         "code": "SUCCESS",
         "message": "success",
-        "data": [
-            {"date": "2026-02-01", "value": 10000},
-            {"date": "2026-02-02", "value": 15000},
-            ...
-        ]
+        "data": {
+            "date_from": "2026-02-01",
+            "date_to": "2026-02-07",
+            "granularity": "day",
+            "metrics": ["order_count", "order_amount"],
+            "list": [
+                {"date": "2026-02-01", "date_from": "2026-02-01", "date_to": "2026-02-01",
+                 "order_count": 3, "order_amount": 10000.0},
+                ...
+            ],
+            "totals": {"order_count": 30, "order_amount": 150000.0}
+        }
     }
+    
+    响应（兼容旧版）: data为 [{"date": "2026-02-01", "value": 10000}, ...]
+    
+    说明:
+    - 没有订单的日期/周/月补0，图表不会出现缺口
     """
     try:
-        period = request.args.get('period', 'month').strip()
-        stat_type = request.args.get('type', 'order_amount').strip()
+        args = request.args
+        legacy = not any(args.get(name) for name in ('date_from', 'date_to', 'granularity', 'metrics'))
+        today = date.today()
         
-        # 确定日期范围和分组格式
-        if period == 'week':
-            date_from = datetime.now() - timedelta(days=7)
-            date_format = '%Y-%m-%d'
-        elif period == 'year':
-            date_from = datetime.now() - timedelta(days=365)
-            date_format = '%Y-%m'
-        else:  # month
-            date_from = datetime.now() - timedelta(days=30)
-            date_format = '%Y-%m-%d'
+        try:
+            if legacy:
+                period = args.get('period', 'month').strip()
+                stat_type = args.get('type', 'order_amount').strip()
+                metrics = ['order_count' if stat_type == 'order_count' else 'order_amount']
+                date_to = today
+                if period == 'week':
+                    date_from, granularity = today - timedelta(days=7), 'day'
+                elif period == 'year':
+                    date_from, granularity = today - timedelta(days=365), 'month'
+                else:  # month
+                    date_from, granularity = today - timedelta(days=30), 'day'
+            else:
+                date_from, date_to, granularity, metrics = parse_trend_params(args)
+        except ValueError as e:
+            return response_error(str(e), 'PARAM_ERROR')
         
-        # 确定统计字段
-        if stat_type == 'order_count':
-            stat_field = 'COUNT(*)'
-        else:  # order_amount
-            stat_field = 'IFNULL(SUM(CASE WHEN o.status != \'cancelled\' THEN o.total_amount ELSE 0 END), 0)'
+        data = compute_trend(current_tenant_id, date_from, date_to, granularity, metrics)
         
-        conn = get_db_connection()
-        cursor = conn.cursor(pymysql.cursors.DictCursor)
+        if legacy:
+            metric = metrics[0]
+            return response_success(data=[
+                {'date': item['date'], 'value': item[metric]}
+                for item in data['list']
+            ])
         
-        try:
-            cursor.execute(f"""
-                SELECT 
-                    DATE_FORMAT(o.order_date, %s) as date,
-                    {stat_field} as value
-                FROM orders o
-                WHERE o.company_id = %s
-                  AND IFNULL(o.order_type, 'normal') != 'aftersale'
-                  AND o.order_date >= %s
-                GROUP BY DATE_FORMAT(o.order_date, %s)
-                ORDER BY date ASC
-            """, (date_format, current_tenant_id, date_from.strftime('%Y-%m-%d'), date_format))
-            
-            trend_data = cursor.fetchall()
-            
-            # 格式化返回数据
-            result_list = []
-            for item in trend_data:
-                result_list.append({
-                    'date': item['date'],
-                    'value': float(item['value']) if stat_type == 'order_amount' else item['value']
-                })
-            
-            return response_success(data=result_list)
-            
-        finally:
-            cursor.close()
-            conn.close()
+        return response_success(data=data)
     
     except Exception as e:
         print(f"[Mobile Get Trend Error] {str(e)}")
@@ -227,8 +327,183 @@ def mobile_get_trend(current_user_id, current_tenant_id, current_username):
 # 移动端排行榜API
 # ============================================================
 
+def parse_ranking_range(args):
+    """
+    排行榜日期范围
+
+    传入date_from/date_to时使用自定义范围，否则按period：
+    month为近30天、year为近365天（均不限结束日期），all为不限
+
+    返回：
+        tuple: (开始日期或None, 结束日期或None)
+    """
+    if args.get('date_from') or args.get('date_to'):
+        date_from = parse_date(args['date_from'], 'date_from') if args.get('date_from') else None
+        date_to = parse_date(args['date_to'], 'date_to') if args.get('date_to') else None
+        if date_from and date_to and date_from > date_to:
+            raise ValueError('date_from不能晚于date_to')
+        return date_from, date_to
+
+    period = args.get('period', 'month').strip()
+    if period == 'month':
+        return date.today() - timedelta(days=30), None
+    if period == 'year':
+        return date.today() - timedelta(days=365), None
+    return None, None
+
+
+def date_range_condition(column, date_from, date_to):
+    """生成日期范围条件（空的一端不限制）"""
+    conditions = []
+    params = []
+    if date_from:
+        conditions.append(f"AND {column} >= %s")
+        params.append(date_from)
+    if date_to:
+        conditions.append(f"AND {column} <= %s")
+        params.append(date_to)
+    return ' '.join(conditions), params
+
+
+def rank_top_k(rows, limit, sort_key):
+    """
+    取前limit名并编号
+
+    使用有界堆（heapq.nsmallest，O(n log k)），只保留limit行；
+    sort_key需能区分全部行（最后以名称/ID兜底），名次稳定，不依赖MySQL用户变量
+    """
+    top_rows = heapq.nsmallest(limit, rows, key=sort_key)
+    for index, row in enumerate(top_rows, 1):
+        row['rank'] = index
+    return top_rows
+
+
+def query_service_ranking(conn, tenant_id, date_from, date_to, limit):
+    """服务排行（每日服务汇总表，见order_rollups.py）"""
+    date_condition, date_params = date_range_condition('stat_date', date_from, date_to)
+    cursor = conn.cursor(pymysql.cursors.DictCursor)
+    try:
+        cursor.execute(f"""
+            SELECT 
+                service_name as name,
+                SUM(revenue) as value,
+                SUM(quantity) as count
+            FROM service_daily_stats
+            WHERE company_id = %s
+              {date_condition}
+            GROUP BY service_name
+        """, [tenant_id] + date_params)
+        
+        # 金额降序、数量降序、名称升序
+        ranking = rank_top_k(
+            cursor.fetchall(), limit,
+            lambda row: (-(row['value'] or 0), -(row['count'] or 0), row['name'])
+        )
+    finally:
+        cursor.close()
+    
+    return [
+        {
+            'rank': item['rank'],
+            'name': item['name'],
+            'value': float(item['value']) if item['value'] else 0.0,
+            'count': float(item['count'] or 0)
+        }
+        for item in ranking
+    ]
+
+
+def query_customer_ranking(conn, tenant_id, date_from, date_to, limit):
+    """
+    客户排行（每日客户金额表，见order_rollups.py）
+
+    各客户的区间合计用流式游标逐行读取，只在有界堆中保留前K名，
+    之后只查询这K个客户的名称；汇总表中的客户已被删除（或不属于本公司）时
+    扩大K重新选取，保证返回数量。
+    """
+    date_condition, date_params = date_range_condition('stat_date', date_from, date_to)
+    k = limit
+    
+    while True:
+        stream_cursor = conn.cursor(pymysql.cursors.SSDictCursor)
+        try:
+            stream_cursor.execute(f"""
+                SELECT 
+                    customer_id,
+                    SUM(revenue) as value,
+                    SUM(order_count) as count
+                FROM customer_daily_revenue
+                WHERE company_id = %s
+                  {date_condition}
+                GROUP BY customer_id
+                HAVING value > 0
+            """, [tenant_id] + date_params)
+            
+            # 金额降序、订单数降序、客户ID升序
+            candidates = rank_top_k(
+                stream_cursor, k,
+                lambda row: (-row['value'], -row['count'], row['customer_id'])
+            )
+        finally:
+            stream_cursor.close()
+        
+        names = {}
+        if candidates:
+            cursor = conn.cursor(pymysql.cursors.DictCursor)
+            try:
+                placeholders = ', '.join(['%s'] * len(candidates))
+                cursor.execute(f"""
+                    SELECT id, name
+                    FROM customers
+                    WHERE company_id = %s AND id IN ({placeholders})
+                """, [tenant_id] + [row['customer_id'] for row in candidates])
+                names = {row['id']: row['name'] for row in cursor.fetchall()}
+            finally:
+                cursor.close()
+        
+        ranking = [row for row in candidates if row['customer_id'] in names]
+        if len(ranking) >= limit or len(candidates) < k:
+            break
+        k *= 2
+    
+    return [
+        {
+            'rank': rank,
+            'name': names[item['customer_id']],
+            'value': float(item['value']),
+            'count': int(item['count'])
+        }
+        for rank, item in enumerate(ranking[:limit], 1)
+    ]
+
+
+def compute_ranking(tenant_id, ranking_type, date_from, date_to, limit):
+    """计算排行榜（service为服务排行，其余为客户排行）"""
+    conn = get_db_connection()
+    
+    try:
+        if ranking_type == 'service':
+            return query_service_ranking(conn, tenant_id, date_from, date_to, limit)
+        return query_customer_ranking(conn, tenant_id, date_from, date_to, limit)
+    
+    finally:
+        conn.close()
+
+
+def get_ranking(tenant_id, ranking_type, date_from, date_to, limit, refresh=False):
+    """读取排行榜（按类型、日期范围、数量缓存）"""
+    ranking_type = 'service' if ranking_type == 'service' else 'customer'
+    return get_cached_stats(
+        tenant_id, 'ranking',
+        lambda: compute_ranking(tenant_id, ranking_type, date_from, date_to, limit),
+        refresh=refresh,
+        params=(ranking_type, date_from, date_to, limit)
+    )
+
+
 @mobile_statistics_bp.route('/api/mobile/statistics/ranking', methods=['GET'])
 @require_mobile_auth
+@coalesce_requests
 def mobile_get_ranking(current_user_id, current_tenant_id, current_username):
     """
     获取排行榜数据（客户排名、服务排名）
@@ -239,7 +514,10 @@ def mobile_get_ranking(current_user_id, current_tenant_id, current_username):
     Query参数:
     - type: 排行类型（customer|service），默认customer
     - period: 统计周期（month|year|all），默认month
+    - date_from: 自定义开始日期（YYYY-MM-DD），传入date_from/date_to时忽略period
+    - date_to: 自定义结束日期（YYYY-MM-DD）
     - limit: 返回数量，默认10，最大50
+    - refresh: 是否跳过缓存重新计算，默认0
     
     响应:
     {
@@ -259,80 +537,126 @@ def mobile_get_ranking(current_user_id, current_tenant_id, current_username):
     """
     try:
         ranking_type = request.args.get('type', 'customer').strip()
-        period = request.args.get('period', 'month').strip()
         limit = min(int(request.args.get('limit', 10)), 50)
         
-        # 确定日期范围
-        date_condition = ""
-        if period == 'month':
-            date_condition = "AND o.order_date >= DATE_SUB(CURDATE(), INTERVAL 30 DAY)"
-        elif period == 'year':
-            date_condition = "AND o.order_date >= DATE_SUB(CURDATE(), INTERVAL 365 DAY)"
-        # all: 无日期限制
+        try:
+            date_from, date_to = parse_ranking_range(request.args)
+        except ValueError as e:
+            return response_error(str(e), 'PARAM_ERROR')
         
-        conn = get_db_connection()
-        cursor = conn.cursor(pymysql.cursors.DictCursor)
+        return response_success(
+            data=get_ranking(current_tenant_id, ranking_type, date_from, date_to, limit,
+                             refresh=is_truthy(request.args.get('refresh')))
+        )
+    
+    except Exception as e:
+        print(f"[Mobile Get Ranking Error] {str(e)}")
+        return response_error('获取排行榜失败', 'SERVER_ERROR', 500)
+
+
+# ============================================================
+# 移动端首页聚合API
+# ============================================================
+
+# 板块 -> 名称（用于错误信息）
+DASHBOARD_SECTIONS = {
+    'overview': '概览统计',
+    'trend': '趋势统计',
+    'ranking': '排行榜',
+    'order_statistics': '订单统计'
+}
+
+
+def run_dashboard_section(name, func):
+    """执行单个板块，失败时记录错误而不影响其它板块"""
+    try:
+        return func(), None
+    except Exception as e:
+        print(f"[Mobile Dashboard Section Error] {name}: {str(e)}")
+        return None, f'获取{DASHBOARD_SECTIONS[name]}失败'
+
+
+@mobile_statistics_bp.route('/api/mobile/statistics/dashboard', methods=['GET'])
+@require_mobile_auth
+@coalesce_requests
+def mobile_get_dashboard(current_user_id, current_tenant_id, current_username):
+    """
+    首页聚合数据（一次请求返回概览、趋势、排行榜和订单统计）
+    
+    请求头:
+    Authorization: Bearer <token>
+    
+    Query参数:
+    - sections: 需要的板块，逗号分隔（overview,trend,ranking,order_statistics），默认全部
+    - refresh: 概览和排行榜跳过缓存重新计算，默认0
+    - date_from/date_to/granularity/metrics: 趋势参数，同/api/mobile/statistics/trend
+    - ranking_type: 排行类型（customer|service），默认customer
+    - ranking_period: 排行周期（month|year|all），默认month
+    - ranking_limit: 排行数量，默认10，最大50
+    - statistics_period: 订单统计周期（today|week|month|year|all），默认month
+    
+    响应:
+    {
+        "success": true,
+        "code": "SUCCESS",
+        "message": "success",
+        "data": {
+            "overview": {...},
+            "trend": {...},
+            "ranking": [...],
+            "order_statistics": {...},
+            "errors": {}
+        }
+    }
+    
+    说明:
+    - 各板块并发执行，分别使用连接池中的连接
+    - 某个板块失败时该板块为null，错误信息在errors中，其它板块正常返回
+    """
+    try:
+        args = request.args
+        sections = [name.strip() for name in args.get('sections', ','.join(DASHBOARD_SECTIONS)).split(',') if name.strip()]
         
+        tasks = {}
         try:
-            if ranking_type == 'service':
-                # 服务排行榜
-                cursor.execute(f"""
-                    SELECT 
-                        @rank:=@rank+1 as rank,
-                        oi.service_name as name,
-                        SUM(oi.total_price) as value,
-                        SUM(oi.quantity) as count
-                    FROM order_items oi
-                    INNER JOIN orders o ON oi.order_id = o.id
-                    CROSS JOIN (SELECT @rank:=0) r
-                    WHERE o.company_id = %s
-                      AND IFNULL(o.order_type, 'normal') != 'aftersale'
-                      AND o.status != 'cancelled'
-                      {date_condition}
-                    GROUP BY oi.service_name
-                    ORDER BY value DESC
-                    LIMIT %s
-                """, (current_tenant_id, limit))
-            else:
-                # 客户排行榜（默认）
-                cursor.execute(f"""
-                    SELECT 
-                        @rank:=@rank+1 as rank,
-                        c.name,
-                        IFNULL(SUM(o.total_amount), 0) as value,
-                        COUNT(o.id) as count
-                    FROM customers c
-                    LEFT JOIN orders o ON c.id = o.customer_id 
-                        AND o.company_id = %s 
-                        AND IFNULL(o.order_type, 'normal') != 'aftersale'
-                        AND o.status != 'cancelled'
-                        {date_condition}
-                    CROSS JOIN (SELECT @rank:=0) r
-                    WHERE c.company_id = %s
-                    GROUP BY c.id, c.name
-                    HAVING value > 0
-                    ORDER BY value DESC
-                    LIMIT %s
-                """, (current_tenant_id, current_tenant_id, limit))
+            unknown = [name for name in sections if name not in DASHBOARD_SECTIONS]
+            if unknown or not sections:
+                raise ValueError(f'不支持的板块: {",".join(unknown)}')
             
-            ranking_data = cursor.fetchall()
+            refresh = is_truthy(args.get('refresh'))
             
-            # 格式化返回数据
-            result_list = []
-            for item in ranking_data:
-                result_list.append({
-                    'rank': item['rank'],
-                    'name': item['name'],
-                    'value': float(item['value']) if item['value'] else 0.0,
-                    'count': float(item['count']) if ranking_type == 'service' else item['count']
-                })
+            if 'overview' in sections:
+                tasks['overview'] = lambda: get_overview(current_tenant_id, refresh=refresh)
             
-            return response_success(data=result_list)
+            if 'trend' in sections:
+                trend_params = parse_trend_params(args)
+                tasks['trend'] = lambda: compute_trend(current_tenant_id, *trend_params)
             
-        finally:
-            cursor.close()
-            conn.close()
+            if 'ranking' in sections:
+                ranking_type = args.get('ranking_type', 'customer').strip()
+                ranking_limit = min(int(args.get('ranking_limit', 10)), 50)
+                ranking_range = parse_ranking_range({'period': args.get('ranking_period', 'month')})
+                tasks['ranking'] = lambda: get_ranking(
+                    current_tenant_id, ranking_type, *ranking_range, ranking_limit, refresh=refresh
+                )
+            
+            if 'order_statistics' in sections:
+                statistics_range = parse_statistics_range({'period': args.get('statistics_period', 'month')})
+                tasks['order_statistics'] = lambda: compute_order_statistics(current_tenant_id, *statistics_range)
+        
+        except ValueError as e:
+            return response_error(str(e), 'PARAM_ERROR')
+        
+        results = run_parallel({
+            name: (lambda name=name, func=func: run_dashboard_section(name, func))
+            for name, func in tasks.items()
+        })
+        
+        data = {name: result for name, (result, _) in results.items()}
+        data['errors'] = {name: error for name, (_, error) in results.items() if error}
+        
+        return response_success(data=data)
     
     except Exception as e:
-        print(f"[Mobile Get Ranking Error] {str(e)}")
-        return response_error('获取排行榜失败', 'SERVER_ERROR', 500)
+        print(f"[Mobile Get Dashboard Error] {str(e)}")
+        return response_error('获取首页数据失败', 'SERVER_ERROR', 500)
@@ -0,0 +1,859 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+订单汇总表维护
+负责汇总表（及订单号、租户数据版本号）的建表、增量维护触发器和全量重建
+
+订单由PC端和移动端共同写入，因此汇总表通过MySQL触发器在orders/order_items增删改时增量维护，
+不依赖某一端的写入代码；全量重建用于首次上线和数据修复。
+
+用法：
+    python order_rollups.py install                    # 建表、创建存储过程和触发器（可重复执行）
+    python order_rollups.py rebuild                    # 重建全部汇总表
+    python order_rollups.py rebuild --company-id 1     # 只重建指定公司
+    python order_rollups.py rebuild --table customer_order_stats
+    python order_rollups.py rebuild --table daily_order_summary
+    python order_rollups.py rebuild --table service_daily_stats
+    python order_rollups.py rebuild --table customer_daily_revenue
+    python order_rollups.py rebuild --table order_numbers   # 回填订单号
+"""
+
+import argparse
+import sys
+from datetime import datetime
+
+from db_pool import get_db_connection
+
+
+# ============================================================
+# 客户订单汇总（customer_order_stats）
+# 每个客户一行：订单数、最近下单日期、累计金额（不含已取消）
+# ============================================================
+
+CUSTOMER_ORDER_STATS_TABLE = """
+    CREATE TABLE IF NOT EXISTS customer_order_stats (
+        company_id INT NOT NULL,
+        customer_id INT NOT NULL,
+        order_count INT NOT NULL DEFAULT 0,
+        total_amount DECIMAL(15, 2) NOT NULL DEFAULT 0,
+        last_order_date DATE NULL,
+        updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+        PRIMARY KEY (company_id, customer_id)
+    ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COMMENT='客户订单汇总（触发器维护）'
+"""
+
+# 统计口径与原客户接口的子查询一致：订单数和最近下单日期含全部订单，金额排除已取消
+CUSTOMER_ORDER_STATS_PROCEDURE = """
+    CREATE PROCEDURE refresh_customer_order_stats(IN p_company_id INT, IN p_customer_id INT)
+    BEGIN
+        IF p_company_id IS NOT NULL AND p_customer_id IS NOT NULL THEN
+            INSERT INTO customer_order_stats
+                (company_id, customer_id, order_count, total_amount, last_order_date)
+            SELECT
+                p_company_id,
+                p_customer_id,
+                COUNT(*),
+                IFNULL(SUM(CASE WHEN status != '已取消' THEN final_amount ELSE 0 END), 0),
+                MAX(order_date)
+            FROM orders
+            WHERE company_id = p_company_id AND customer_id = p_customer_id
+            ON DUPLICATE KEY UPDATE
+                order_count = VALUES(order_count),
+                total_amount = VALUES(total_amount),
+                last_order_date = VALUES(last_order_date);
+        END IF;
+    END
+"""
+
+CUSTOMER_ORDER_STATS_TRIGGERS = [
+    ('trg_orders_ai_customer_stats', """
+        CREATE TRIGGER trg_orders_ai_customer_stats AFTER INSERT ON orders
+        FOR EACH ROW
+            CALL refresh_customer_order_stats(NEW.company_id, NEW.customer_id)
+    """),
+    ('trg_orders_au_customer_stats', """
+        CREATE TRIGGER trg_orders_au_customer_stats AFTER UPDATE ON orders
+        FOR EACH ROW
+        BEGIN
+            IF NOT (OLD.company_id <=> NEW.company_id
+                    AND OLD.customer_id <=> NEW.customer_id
+                    AND OLD.status <=> NEW.status
+                    AND OLD.final_amount <=> NEW.final_amount
+                    AND OLD.order_date <=> NEW.order_date) THEN
+                CALL refresh_customer_order_stats(NEW.company_id, NEW.customer_id);
+                IF NOT (OLD.company_id <=> NEW.company_id AND OLD.customer_id <=> NEW.customer_id) THEN
+                    CALL refresh_customer_order_stats(OLD.company_id, OLD.customer_id);
+                END IF;
+            END IF;
+        END
+    """),
+    ('trg_orders_ad_customer_stats', """
+        CREATE TRIGGER trg_orders_ad_customer_stats AFTER DELETE ON orders
+        FOR EACH ROW
+            CALL refresh_customer_order_stats(OLD.company_id, OLD.customer_id)
+    """)
+]
+
+
+def rebuild_customer_order_stats(cursor, company_id):
+    """全量重建指定公司的客户订单汇总"""
+    cursor.execute("DELETE FROM customer_order_stats WHERE company_id = %s", (company_id,))
+    cursor.execute("""
+        INSERT INTO customer_order_stats
+            (company_id, customer_id, order_count, total_amount, last_order_date)
+        SELECT
+            company_id,
+            customer_id,
+            COUNT(*),
+            IFNULL(SUM(CASE WHEN status != '已取消' THEN final_amount ELSE 0 END), 0),
+            MAX(order_date)
+        FROM orders
+        WHERE company_id = %s AND customer_id IS NOT NULL
+        GROUP BY company_id, customer_id
+    """, (company_id,))
+    return cursor.rowcount
+
+
+# ============================================================
+# 每日订单汇总（daily_order_summary）
+# 每个公司每天一行：各状态订单数、金额（不含已取消），统计接口按天聚合，
+# 查询成本与天数相关而与订单数无关。口径与原统计接口一致：不含售后单
+# ============================================================
+
+DAILY_ORDER_SUMMARY_TABLE = """
+    CREATE TABLE IF NOT EXISTS daily_order_summary (
+        company_id INT NOT NULL,
+        order_date DATE NOT NULL,
+        order_count INT NOT NULL DEFAULT 0,
+        pending_count INT NOT NULL DEFAULT 0,
+        confirmed_count INT NOT NULL DEFAULT 0,
+        shipped_count INT NOT NULL DEFAULT 0,
+        completed_count INT NOT NULL DEFAULT 0,
+        cancelled_count INT NOT NULL DEFAULT 0,
+        total_amount DECIMAL(15, 2) NOT NULL DEFAULT 0,
+        updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+        PRIMARY KEY (company_id, order_date),
+        KEY idx_company_updated (company_id, updated_at)
+    ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COMMENT='每日订单汇总（触发器维护）'
+"""
+
+DAILY_ORDER_SUMMARY_COLUMNS = """
+    COUNT(*),
+    IFNULL(SUM(status = 'pending'), 0),
+    IFNULL(SUM(status = 'confirmed'), 0),
+    IFNULL(SUM(status = 'shipped'), 0),
+    IFNULL(SUM(status = 'completed'), 0),
+    IFNULL(SUM(status = 'cancelled'), 0),
+    IFNULL(SUM(CASE WHEN status != 'cancelled' THEN total_amount ELSE 0 END), 0)
+"""
+
+# 重新计算某公司某一天的汇总（该天没有订单时保留全0行，updated_at仍会更新，便于增量同步）
+DAILY_ORDER_SUMMARY_PROCEDURE = f"""
+    CREATE PROCEDURE refresh_daily_order_summary(IN p_company_id INT, IN p_order_date DATE)
+    BEGIN
+        IF p_company_id IS NOT NULL AND p_order_date IS NOT NULL THEN
+            INSERT INTO daily_order_summary
+                (company_id, order_date, order_count, pending_count, confirmed_count,
+                 shipped_count, completed_count, cancelled_count, total_amount)
+            SELECT
+                p_company_id,
+                p_order_date,
+                {DAILY_ORDER_SUMMARY_COLUMNS}
+            FROM orders
+            WHERE company_id = p_company_id
+              AND order_date = p_order_date
+              AND IFNULL(order_type, 'normal') != 'aftersale'
+            ON DUPLICATE KEY UPDATE
+                order_count = VALUES(order_count),
+                pending_count = VALUES(pending_count),
+                confirmed_count = VALUES(confirmed_count),
+                shipped_count = VALUES(shipped_count),
+                completed_count = VALUES(completed_count),
+                cancelled_count = VALUES(cancelled_count),
+                total_amount = VALUES(total_amount),
+                updated_at = CURRENT_TIMESTAMP;
+        END IF;
+    END
+"""
+
+DAILY_ORDER_SUMMARY_TRIGGERS = [
+    ('trg_orders_ai_daily_summary', """
+        CREATE TRIGGER trg_orders_ai_daily_summary AFTER INSERT ON orders
+        FOR EACH ROW
+            CALL refresh_daily_order_summary(NEW.company_id, NEW.order_date)
+    """),
+    ('trg_orders_au_daily_summary', """
+        CREATE TRIGGER trg_orders_au_daily_summary AFTER UPDATE ON orders
+        FOR EACH ROW
+        BEGIN
+            IF NOT (OLD.company_id <=> NEW.company_id
+                    AND OLD.order_date <=> NEW.order_date
+                    AND OLD.status <=> NEW.status
+                    AND OLD.total_amount <=> NEW.total_amount
+                    AND OLD.order_type <=> NEW.order_type) THEN
+                CALL refresh_daily_order_summary(NEW.company_id, NEW.order_date);
+                IF NOT (OLD.company_id <=> NEW.company_id AND OLD.order_date <=> NEW.order_date) THEN
+                    CALL refresh_daily_order_summary(OLD.company_id, OLD.order_date);
+                END IF;
+            END IF;
+        END
+    """),
+    ('trg_orders_ad_daily_summary', """
+        CREATE TRIGGER trg_orders_ad_daily_summary AFTER DELETE ON orders
+        FOR EACH ROW
+            CALL refresh_daily_order_summary(OLD.company_id, OLD.order_date)
+    """)
+]
+
+
+def rebuild_daily_order_summary(cursor, company_id):
+    """全量重建指定公司的每日订单汇总"""
+    cursor.execute("DELETE FROM daily_order_summary WHERE company_id = %s", (company_id,))
+    cursor.execute(f"""
+        INSERT INTO daily_order_summary
+            (company_id, order_date, order_count, pending_count, confirmed_count,
+             shipped_count, completed_count, cancelled_count, total_amount)
+        SELECT
+            company_id,
+            order_date,
+            {DAILY_ORDER_SUMMARY_COLUMNS}
+        FROM orders
+        WHERE company_id = %s
+          AND order_date IS NOT NULL
+          AND IFNULL(order_type, 'normal') != 'aftersale'
+        GROUP BY company_id, order_date
+    """, (company_id,))
+    return cursor.rowcount
+
+
+# ============================================================
+# 每日服务汇总（service_daily_stats）
+# 每个公司每天每个服务一行：数量、金额，服务排行按天累加，不再关联order_items。
+# 口径与原服务排行一致：不含售后单和已取消订单
+# ============================================================
+
+SERVICE_DAILY_STATS_TABLE = """
+    CREATE TABLE IF NOT EXISTS service_daily_stats (
+        company_id INT NOT NULL,
+        stat_date DATE NOT NULL,
+        service_name VARCHAR(255) NOT NULL,
+        quantity DECIMAL(15, 2) NOT NULL DEFAULT 0,
+        revenue DECIMAL(15, 2) NOT NULL DEFAULT 0,
+        updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+        PRIMARY KEY (company_id, stat_date, service_name)
+    ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COMMENT='每日服务汇总（触发器维护）'
+"""
+
+SERVICE_DAILY_STATS_SELECT = """
+    SELECT
+        o.company_id,
+        o.order_date,
+        IFNULL(oi.service_name, ''),
+        IFNULL(SUM(oi.quantity), 0),
+        IFNULL(SUM(oi.total_price), 0)
+    FROM order_items oi
+    INNER JOIN orders o ON oi.order_id = o.id
+"""
+
+SERVICE_DAILY_STATS_FILTER = """
+    IFNULL(o.order_type, 'normal') != 'aftersale'
+    AND o.status != 'cancelled'
+"""
+
+# 订单（触发器中的OLD/NEW）是否计入服务汇总，与SERVICE_DAILY_STATS_FILTER一致
+SERVICE_DAILY_STATS_COUNTED = "IFNULL({row}.order_type, 'normal') != 'aftersale' AND {row}.status != 'cancelled'"
+
+# 触发器只按变化量累加（INSERT ... ON DUPLICATE KEY UPDATE），不重新计算整天，
+# 同一公司同一天的并发写入只在各自服务的行上加锁；整天重新计算只在全量重建中进行。
+# 累加到数量和金额都为0的行随即删除（该服务当天已没有计入的明细），与全量重建的结果一致
+
+# 某公司某天某服务累加数量和金额（负数为减去）
+SERVICE_DAILY_STATS_DELTA_PROCEDURE = """
+    CREATE PROCEDURE apply_service_daily_stats_delta(
+        IN p_company_id INT, IN p_stat_date DATE, IN p_service_name VARCHAR(255),
+        IN p_quantity DECIMAL(15, 2), IN p_revenue DECIMAL(15, 2))
+    BEGIN
+        IF p_company_id IS NOT NULL AND p_stat_date IS NOT NULL THEN
+            INSERT INTO service_daily_stats
+                (company_id, stat_date, service_name, quantity, revenue)
+            VALUES (p_company_id, p_stat_date, IFNULL(p_service_name, ''), IFNULL(p_quantity, 0), IFNULL(p_revenue, 0))
+            ON DUPLICATE KEY UPDATE
+                quantity = quantity + VALUES(quantity),
+                revenue = revenue + VALUES(revenue);
+
+            DELETE FROM service_daily_stats
+            WHERE company_id = p_company_id
+              AND stat_date = p_stat_date
+              AND service_name = IFNULL(p_service_name, '')
+              AND quantity = 0
+              AND revenue = 0;
+        END IF;
+    END
+"""
+
+# 订单明细变化：按所属订单定位公司和日期（订单不计入时不累加）
+SERVICE_DAILY_STATS_ITEM_PROCEDURE = f"""
+    CREATE PROCEDURE apply_service_daily_stats_item(
+        IN p_order_id INT, IN p_service_name VARCHAR(255),
+        IN p_quantity DECIMAL(15, 2), IN p_revenue DECIMAL(15, 2))
+    BEGIN
+        DECLARE v_company_id INT DEFAULT NULL;
+        DECLARE v_order_date DATE DEFAULT NULL;
+
+        SELECT company_id, order_date INTO v_company_id, v_order_date
+        FROM orders o
+        WHERE o.id = p_order_id
+          AND {SERVICE_DAILY_STATS_FILTER};
+
+        CALL apply_service_daily_stats_delta(v_company_id, v_order_date, p_service_name, p_quantity, p_revenue);
+    END
+"""
+
+# 订单整体计入/移出某公司某天（p_sign为1或-1）：按服务累加该订单全部明细
+SERVICE_DAILY_STATS_ORDER_PROCEDURE = """
+    CREATE PROCEDURE apply_service_daily_stats_order(
+        IN p_order_id INT, IN p_company_id INT, IN p_order_date DATE, IN p_sign INT)
+    BEGIN
+        IF p_company_id IS NOT NULL AND p_order_date IS NOT NULL THEN
+            INSERT INTO service_daily_stats
+                (company_id, stat_date, service_name, quantity, revenue)
+            SELECT
+                p_company_id,
+                p_order_date,
+                IFNULL(service_name, ''),
+                p_sign * IFNULL(SUM(quantity), 0),
+                p_sign * IFNULL(SUM(total_price), 0)
+            FROM order_items
+            WHERE order_id = p_order_id
+            GROUP BY IFNULL(service_name, '')
+            ON DUPLICATE KEY UPDATE
+                quantity = quantity + VALUES(quantity),
+                revenue = revenue + VALUES(revenue);
+
+            IF p_sign < 0 THEN
+                DELETE s FROM service_daily_stats s
+                INNER JOIN (
+                    SELECT DISTINCT IFNULL(service_name, '') as service_name
+                    FROM order_items
+                    WHERE order_id = p_order_id
+                ) i ON s.service_name = i.service_name
+                WHERE s.company_id = p_company_id
+                  AND s.stat_date = p_order_date
+                  AND s.quantity = 0
+                  AND s.revenue = 0;
+            END IF;
+        END IF;
+    END
+"""
+
+SERVICE_DAILY_STATS_TRIGGERS = [
+    ('trg_order_items_ai_service_stats', """
+        CREATE TRIGGER trg_order_items_ai_service_stats AFTER INSERT ON order_items
+        FOR EACH ROW
+            CALL apply_service_daily_stats_item(NEW.order_id, NEW.service_name, NEW.quantity, NEW.total_price)
+    """),
+    ('trg_order_items_au_service_stats', """
+        CREATE TRIGGER trg_order_items_au_service_stats AFTER UPDATE ON order_items
+        FOR EACH ROW
+        BEGIN
+            IF NOT (OLD.order_id <=> NEW.order_id
+                    AND OLD.service_name <=> NEW.service_name
+                    AND OLD.quantity <=> NEW.quantity
+                    AND OLD.total_price <=> NEW.total_price) THEN
+                CALL apply_service_daily_stats_item(OLD.order_id, OLD.service_name, -OLD.quantity, -OLD.total_price);
+                CALL apply_service_daily_stats_item(NEW.order_id, NEW.service_name, NEW.quantity, NEW.total_price);
+            END IF;
+        END
+    """),
+    ('trg_order_items_ad_service_stats', """
+        CREATE TRIGGER trg_order_items_ad_service_stats AFTER DELETE ON order_items
+        FOR EACH ROW
+            CALL apply_service_daily_stats_item(OLD.order_id, OLD.service_name, -OLD.quantity, -OLD.total_price)
+    """),
+    # 订单状态、日期、类型变化会改变其明细是否计入及计入哪一天：先按旧值减去，再按新值加上
+    # （计入与否和计入的公司、日期都不变时不处理）
+    ('trg_orders_au_service_stats', f"""
+        CREATE TRIGGER trg_orders_au_service_stats AFTER UPDATE ON orders
+        FOR EACH ROW
+        BEGIN
+            IF NOT (OLD.company_id <=> NEW.company_id
+                    AND OLD.order_date <=> NEW.order_date
+                    AND ({SERVICE_DAILY_STATS_COUNTED.format(row='OLD')})
+                        <=> ({SERVICE_DAILY_STATS_COUNTED.format(row='NEW')})) THEN
+                IF {SERVICE_DAILY_STATS_COUNTED.format(row='OLD')} THEN
+                    CALL apply_service_daily_stats_order(OLD.id, OLD.company_id, OLD.order_date, -1);
+                END IF;
+                IF {SERVICE_DAILY_STATS_COUNTED.format(row='NEW')} THEN
+                    CALL apply_service_daily_stats_order(NEW.id, NEW.company_id, NEW.order_date, 1);
+                END IF;
+            END IF;
+        END
+    """),
+    # 删除订单时在删除前减去其明细：级联删除的明细不会触发order_items的触发器，
+    # 之后单独删除明细时订单已不存在，apply_service_daily_stats_item不会重复减去
+    ('trg_orders_bd_service_stats', f"""
+        CREATE TRIGGER trg_orders_bd_service_stats BEFORE DELETE ON orders
+        FOR EACH ROW
+        BEGIN
+            IF {SERVICE_DAILY_STATS_COUNTED.format(row='OLD')} THEN
+                CALL apply_service_daily_stats_order(OLD.id, OLD.company_id, OLD.order_date, -1);
+            END IF;
+        END
+    """)
+]
+
+
+def rebuild_service_daily_stats(cursor, company_id):
+    """全量重建指定公司的每日服务汇总（按天重新计算，修复累加误差）"""
+    cursor.execute("DELETE FROM service_daily_stats WHERE company_id = %s", (company_id,))
+    cursor.execute(f"""
+        INSERT INTO service_daily_stats
+            (company_id, stat_date, service_name, quantity, revenue)
+        {SERVICE_DAILY_STATS_SELECT}
+        WHERE o.company_id = %s
+          AND o.order_date IS NOT NULL
+          AND {SERVICE_DAILY_STATS_FILTER}
+        GROUP BY o.company_id, o.order_date, IFNULL(oi.service_name, '')
+    """, (company_id,))
+    return cursor.rowcount
+
+
+# ============================================================
+# 每日客户金额（customer_daily_revenue）
+# 每个公司每天每个客户一行：订单数、金额，客户排行按天累加，不再关联全部客户。
+# 口径与原客户排行一致：不含售后单和已取消订单
+# ============================================================
+
+CUSTOMER_DAILY_REVENUE_TABLE = """
+    CREATE TABLE IF NOT EXISTS customer_daily_revenue (
+        company_id INT NOT NULL,
+        stat_date DATE NOT NULL,
+        customer_id INT NOT NULL,
+        order_count INT NOT NULL DEFAULT 0,
+        revenue DECIMAL(15, 2) NOT NULL DEFAULT 0,
+        updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+        PRIMARY KEY (company_id, stat_date, customer_id),
+        KEY idx_company_customer (company_id, customer_id)
+    ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COMMENT='每日客户金额（触发器维护）'
+"""
+
+CUSTOMER_DAILY_REVENUE_FILTER = """
+    IFNULL(order_type, 'normal') != 'aftersale'
+    AND status != 'cancelled'
+"""
+
+# 订单（触发器中的OLD/NEW）是否计入客户金额，与CUSTOMER_DAILY_REVENUE_FILTER一致
+CUSTOMER_DAILY_REVENUE_COUNTED = SERVICE_DAILY_STATS_COUNTED
+
+# 触发器只按变化量累加，同一公司同一天的并发写入只在各自客户的行上加锁；
+# 订单数累加到0的行随即删除（该客户当天已没有计入的订单），与全量重建的结果一致
+CUSTOMER_DAILY_REVENUE_DELTA_PROCEDURE = """
+    CREATE PROCEDURE apply_customer_daily_revenue_delta(
+        IN p_company_id INT, IN p_customer_id INT, IN p_stat_date DATE,
+        IN p_order_count INT, IN p_revenue DECIMAL(15, 2))
+    BEGIN
+        IF p_company_id IS NOT NULL AND p_customer_id IS NOT NULL AND p_stat_date IS NOT NULL THEN
+            INSERT INTO customer_daily_revenue
+                (company_id, stat_date, customer_id, order_count, revenue)
+            VALUES (p_company_id, p_stat_date, p_customer_id, p_order_count, IFNULL(p_revenue, 0))
+            ON DUPLICATE KEY UPDATE
+                order_count = order_count + VALUES(order_count),
+                revenue = revenue + VALUES(revenue);
+
+            DELETE FROM customer_daily_revenue
+            WHERE company_id = p_company_id
+              AND stat_date = p_stat_date
+              AND customer_id = p_customer_id
+              AND order_count = 0;
+        END IF;
+    END
+"""
+
+CUSTOMER_DAILY_REVENUE_TRIGGERS = [
+    ('trg_orders_ai_customer_revenue', f"""
+        CREATE TRIGGER trg_orders_ai_customer_revenue AFTER INSERT ON orders
+        FOR EACH ROW
+        BEGIN
+            IF {CUSTOMER_DAILY_REVENUE_COUNTED.format(row='NEW')} THEN
+                CALL apply_customer_daily_revenue_delta(NEW.company_id, NEW.customer_id, NEW.order_date, 1, NEW.total_amount);
+            END IF;
+        END
+    """),
+    # 先按旧值减去，再按新值加上
+    ('trg_orders_au_customer_revenue', f"""
+        CREATE TRIGGER trg_orders_au_customer_revenue AFTER UPDATE ON orders
+        FOR EACH ROW
+        BEGIN
+            IF NOT (OLD.company_id <=> NEW.company_id
+                    AND OLD.customer_id <=> NEW.customer_id
+                    AND OLD.order_date <=> NEW.order_date
+                    AND OLD.total_amount <=> NEW.total_amount
+                    AND ({CUSTOMER_DAILY_REVENUE_COUNTED.format(row='OLD')})
+                        <=> ({CUSTOMER_DAILY_REVENUE_COUNTED.format(row='NEW')})) THEN
+                IF {CUSTOMER_DAILY_REVENUE_COUNTED.format(row='OLD')} THEN
+                    CALL apply_customer_daily_revenue_delta(OLD.company_id, OLD.customer_id, OLD.order_date, -1, -OLD.total_amount);
+                END IF;
+                IF {CUSTOMER_DAILY_REVENUE_COUNTED.format(row='NEW')} THEN
+                    CALL apply_customer_daily_revenue_delta(NEW.company_id, NEW.customer_id, NEW.order_date, 1, NEW.total_amount);
+                END IF;
+            END IF;
+        END
+    """),
+    ('trg_orders_ad_customer_revenue', f"""
+        CREATE TRIGGER trg_orders_ad_customer_revenue AFTER DELETE ON orders
+        FOR EACH ROW
+        BEGIN
+            IF {CUSTOMER_DAILY_REVENUE_COUNTED.format(row='OLD')} THEN
+                CALL apply_customer_daily_revenue_delta(OLD.company_id, OLD.customer_id, OLD.order_date, -1, -OLD.total_amount);
+            END IF;
+        END
+    """)
+]
+
+
+def rebuild_customer_daily_revenue(cursor, company_id):
+    """全量重建指定公司的每日客户金额（按天重新计算，修复累加误差）"""
+    cursor.execute("DELETE FROM customer_daily_revenue WHERE company_id = %s", (company_id,))
+    cursor.execute(f"""
+        INSERT INTO customer_daily_revenue
+            (company_id, stat_date, customer_id, order_count, revenue)
+        SELECT company_id, order_date, customer_id, COUNT(*), IFNULL(SUM(total_amount), 0)
+        FROM orders
+        WHERE company_id = %s
+          AND customer_id IS NOT NULL
+          AND order_date IS NOT NULL
+          AND {CUSTOMER_DAILY_REVENUE_FILTER}
+        GROUP BY company_id, order_date, customer_id
+    """, (company_id,))
+    return cursor.rowcount
+
+
+# ============================================================
+# 订单号（order_numbers）
+# 每个订单一行：DD + 创建日期(YYYYMMDD) + 订单ID（不足3位补0，超过3位不截断），
+# (company_id, order_no)唯一索引，按订单号查订单只需一次索引查找。
+# orders的AFTER INSERT触发器不能更新orders本身（此时才有自增ID），因此订单号保存在独立的表中
+#
+# 早期订单号用LPAD(id, 3, '0')生成，ID达到1000后被截断为前3位（ID 1234 -> DD20260115123），
+# 这类订单同时保存旧订单号legacy_order_no（非唯一：同一天的1230~1239等会得到相同的旧订单号），
+# 已经打印或发给客户的旧订单号仍能查到订单
+# ============================================================
+
+# 订单号（新、旧）的SQL表达式，{fmt}为DATE_FORMAT格式（带参数执行时需写成%%Y%%m%%d）
+ORDER_NO_EXPRESSION = "CONCAT('DD', DATE_FORMAT(created_at, '{fmt}'), LPAD(id, GREATEST(3, CHAR_LENGTH(id)), '0'))"
+LEGACY_ORDER_NO_EXPRESSION = "IF(id >= 1000, CONCAT('DD', DATE_FORMAT(created_at, '{fmt}'), LPAD(id, 3, '0')), NULL)"
+
+ORDER_NUMBERS_TABLE = """
+    CREATE TABLE IF NOT EXISTS order_numbers (
+        order_id INT NOT NULL,
+        company_id INT NOT NULL,
+        order_no VARCHAR(32) NOT NULL,
+        legacy_order_no VARCHAR(32) NULL,
+        PRIMARY KEY (order_id),
+        UNIQUE KEY uk_company_order_no (company_id, order_no),
+        KEY idx_company_legacy_order_no (company_id, legacy_order_no)
+    ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COMMENT='订单号（触发器维护）'
+"""
+
+# 已建表的环境补充旧订单号列
+ORDER_NUMBERS_LEGACY_COLUMN = (
+    'order_numbers', 'legacy_order_no', """
+        ALTER TABLE order_numbers
+            ADD COLUMN legacy_order_no VARCHAR(32) NULL,
+            ADD KEY idx_company_legacy_order_no (company_id, legacy_order_no)
+    """
+)
+
+# 重新生成某订单的订单号（订单已删除或缺少创建时间时只删除）
+ORDER_NUMBERS_PROCEDURE = f"""
+    CREATE PROCEDURE refresh_order_number(IN p_order_id INT)
+    BEGIN
+        DELETE FROM order_numbers WHERE order_id = p_order_id;
+
+        INSERT INTO order_numbers (order_id, company_id, order_no, legacy_order_no)
+        SELECT id, company_id, {ORDER_NO_EXPRESSION.format(fmt='%Y%m%d')}, {LEGACY_ORDER_NO_EXPRESSION.format(fmt='%Y%m%d')}
+        FROM orders
+        WHERE id = p_order_id
+          AND company_id IS NOT NULL
+          AND created_at IS NOT NULL;
+    END
+"""
+
+ORDER_NUMBERS_TRIGGERS = [
+    ('trg_orders_ai_order_number', """
+        CREATE TRIGGER trg_orders_ai_order_number AFTER INSERT ON orders
+        FOR EACH ROW
+            CALL refresh_order_number(NEW.id)
+    """),
+    ('trg_orders_au_order_number', """
+        CREATE TRIGGER trg_orders_au_order_number AFTER UPDATE ON orders
+        FOR EACH ROW
+        BEGIN
+            IF NOT (OLD.id <=> NEW.id
+                    AND OLD.company_id <=> NEW.company_id
+                    AND OLD.created_at <=> NEW.created_at) THEN
+                CALL refresh_order_number(NEW.id);
+                IF NOT (OLD.id <=> NEW.id) THEN
+                    CALL refresh_order_number(OLD.id);
+                END IF;
+            END IF;
+        END
+    """),
+    ('trg_orders_ad_order_number', """
+        CREATE TRIGGER trg_orders_ad_order_number AFTER DELETE ON orders
+        FOR EACH ROW
+            DELETE FROM order_numbers WHERE order_id = OLD.id
+    """)
+]
+
+
+def rebuild_order_numbers(cursor, company_id):
+    """回填指定公司的订单号"""
+    cursor.execute("DELETE FROM order_numbers WHERE company_id = %s", (company_id,))
+    cursor.execute(f"""
+        INSERT INTO order_numbers (order_id, company_id, order_no, legacy_order_no)
+        SELECT id, company_id, {ORDER_NO_EXPRESSION.format(fmt='%%Y%%m%%d')}, {LEGACY_ORDER_NO_EXPRESSION.format(fmt='%%Y%%m%%d')}
+        FROM orders
+        WHERE company_id = %s
+          AND created_at IS NOT NULL
+    """, (company_id,))
+    return cursor.rowcount
+
+
+# ============================================================
+# 租户数据版本号（tenant_data_versions）
+# orders/customers每次变化时递增，供进程内缓存判断是否失效（见cache.py）
+#
+# 递增在写入事务内执行，版本号行的行锁一直持有到事务提交。每个(company_id, scope)只有一行时，
+# 同一租户的全部写事务都在这一行上排队（压测中同一租户并发写入的吞吐受限于单行锁）。
+# 因此每个(company_id, scope)拆成DATA_VERSION_BUCKETS行，按连接ID选行递增，
+# 不同连接上的事务基本不会争用同一行；读取时按scope求和（各行只增不减，和同样单调递增）
+# ============================================================
+
+DATA_VERSION_BUCKETS = 16
+
+TENANT_DATA_VERSIONS_TABLE = """
+    CREATE TABLE IF NOT EXISTS tenant_data_versions (
+        company_id INT NOT NULL,
+        scope VARCHAR(32) NOT NULL,
+        bucket TINYINT UNSIGNED NOT NULL DEFAULT 0,
+        version BIGINT NOT NULL DEFAULT 0,
+        updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+        PRIMARY KEY (company_id, scope, bucket)
+    ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COMMENT='租户数据版本号（触发器维护）'
+"""
+
+# 已建表的环境补充分桶列（原有的行归入0号桶，版本号之和不变）
+TENANT_DATA_VERSIONS_BUCKET_COLUMN = (
+    'tenant_data_versions', 'bucket', """
+        ALTER TABLE tenant_data_versions
+            ADD COLUMN bucket TINYINT UNSIGNED NOT NULL DEFAULT 0 AFTER scope,
+            DROP PRIMARY KEY,
+            ADD PRIMARY KEY (company_id, scope, bucket)
+    """
+)
+
+BUMP_DATA_VERSION_PROCEDURE = f"""
+    CREATE PROCEDURE bump_data_version(IN p_company_id INT, IN p_scope VARCHAR(32))
+    BEGIN
+        IF p_company_id IS NOT NULL THEN
+            INSERT INTO tenant_data_versions (company_id, scope, bucket, version)
+            VALUES (p_company_id, p_scope, CONNECTION_ID() % {DATA_VERSION_BUCKETS}, 1)
+            ON DUPLICATE KEY UPDATE version = version + 1;
+        END IF;
+    END
+"""
+
+
+def _data_version_triggers(table, scope):
+    """生成指定表的数据版本号触发器"""
+    return [
+        (f'trg_{table}_ai_data_version', f"""
+            CREATE TRIGGER trg_{table}_ai_data_version AFTER INSERT ON {table}
+            FOR EACH ROW
+                CALL bump_data_version(NEW.company_id, '{scope}')
+        """),
+        (f'trg_{table}_au_data_version', f"""
+            CREATE TRIGGER trg_{table}_au_data_version AFTER UPDATE ON {table}
+            FOR EACH ROW
+            BEGIN
+                CALL bump_data_version(NEW.company_id, '{scope}');
+                IF NOT (OLD.company_id <=> NEW.company_id) THEN
+                    CALL bump_data_version(OLD.company_id, '{scope}');
+                END IF;
+            END
+        """),
+        (f'trg_{table}_ad_data_version', f"""
+            CREATE TRIGGER trg_{table}_ad_data_version AFTER DELETE ON {table}
+            FOR EACH ROW
+                CALL bump_data_version(OLD.company_id, '{scope}')
+        """)
+    ]
+
+
+DATA_VERSION_TRIGGERS = _data_version_triggers('orders', 'orders') + _data_version_triggers('customers', 'customers')
+
+
+# ============================================================
+# 汇总表注册
+# ============================================================
+
+TABLES = [
+    CUSTOMER_ORDER_STATS_TABLE,
+    DAILY_ORDER_SUMMARY_TABLE,
+    SERVICE_DAILY_STATS_TABLE,
+    CUSTOMER_DAILY_REVENUE_TABLE,
+    ORDER_NUMBERS_TABLE,
+    TENANT_DATA_VERSIONS_TABLE
+]
+
+PROCEDURES = [
+    ('refresh_customer_order_stats', CUSTOMER_ORDER_STATS_PROCEDURE),
+    ('refresh_daily_order_summary', DAILY_ORDER_SUMMARY_PROCEDURE),
+    ('apply_service_daily_stats_delta', SERVICE_DAILY_STATS_DELTA_PROCEDURE),
+    ('apply_service_daily_stats_item', SERVICE_DAILY_STATS_ITEM_PROCEDURE),
+    ('apply_service_daily_stats_order', SERVICE_DAILY_STATS_ORDER_PROCEDURE),
+    ('apply_customer_daily_revenue_delta', CUSTOMER_DAILY_REVENUE_DELTA_PROCEDURE),
+    ('refresh_order_number', ORDER_NUMBERS_PROCEDURE),
+    ('bump_data_version', BUMP_DATA_VERSION_PROCEDURE)
+]
+
+TRIGGERS = (
+    CUSTOMER_ORDER_STATS_TRIGGERS
+    + DAILY_ORDER_SUMMARY_TRIGGERS
+    + SERVICE_DAILY_STATS_TRIGGERS
+    + CUSTOMER_DAILY_REVENUE_TRIGGERS
+    + ORDER_NUMBERS_TRIGGERS
+    + DATA_VERSION_TRIGGERS
+)
+
+# 已不再使用的存储过程和触发器（install时删除）
+OBSOLETE_PROCEDURES = [
+    'refresh_service_daily_stats',
+    'refresh_service_daily_stats_for_order',
+    'refresh_customer_daily_revenue'
+]
+
+OBSOLETE_TRIGGERS = [
+    'trg_orders_ad_service_stats'
+]
+
+# 已建表后新增的列：(表名, 列名, ALTER语句)
+COLUMNS = [
+    ORDER_NUMBERS_LEGACY_COLUMN,
+    TENANT_DATA_VERSIONS_BUCKET_COLUMN
+]
+
+REBUILDERS = {
+    'customer_order_stats': rebuild_customer_order_stats,
+    'daily_order_summary': rebuild_daily_order_summary,
+    'service_daily_stats': rebuild_service_daily_stats,
+    'customer_daily_revenue': rebuild_customer_daily_revenue,
+    'order_numbers': rebuild_order_numbers
+}
+
+
+def install():
+    """建表并（重新）创建存储过程和触发器，可重复执行"""
+    conn = get_db_connection()
+    cursor = conn.cursor()
+
+    try:
+        for ddl in TABLES:
+            cursor.execute(ddl)
+
+        for table, column, ddl in COLUMNS:
+            cursor.execute("""
+                SELECT COUNT(*) as total
+                FROM information_schema.COLUMNS
+                WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND COLUMN_NAME = %s
+            """, (table, column))
+            if not cursor.fetchone()['total']:
+                cursor.execute(ddl)
+                print(f"  ✓ 新增列 {table}.{column}")
+
+        # 先删除旧触发器，再删除它们调用的存储过程
+        for name in OBSOLETE_TRIGGERS:
+            cursor.execute(f"DROP TRIGGER IF EXISTS {name}")
+
+        for name in OBSOLETE_PROCEDURES:
+            cursor.execute(f"DROP PROCEDURE IF EXISTS {name}")
+
+        for name, ddl in PROCEDURES:
+            cursor.execute(f"DROP PROCEDURE IF EXISTS {name}")
+            cursor.execute(ddl)
+            print(f"  ✓ 存储过程 {name}")
+
+        for name, ddl in TRIGGERS:
+            cursor.execute(f"DROP TRIGGER IF EXISTS {name}")
+            cursor.execute(ddl)
+            print(f"  ✓ 触发器 {name}")
+
+        conn.commit()
+
+    finally:
+        cursor.close()
+        conn.close()
+
+
+def rebuild(company_id=None, tables=None):
+    """
+    全量重建汇总表
+
+    参数：
+        company_id: 只重建指定公司，默认全部公司
+        tables: 只重建指定汇总表，默认全部
+    """
+    names = tables or list(REBUILDERS.keys())
+    conn = get_db_connection()
+    cursor = conn.cursor()
+
+    try:
+        if company_id:
+            company_ids = [company_id]
+        else:
+            cursor.execute("SELECT DISTINCT company_id FROM orders WHERE company_id IS NOT NULL")
+            company_ids = [row['company_id'] for row in cursor.fetchall()]
+
+        for name in names:
+            rebuild_func = REBUILDERS[name]
+            total = 0
+            # 按公司分批提交，缩短锁持有时间
+            for cid in company_ids:
+                total += rebuild_func(cursor, cid)
+                conn.commit()
+            print(f"  ✓ {name}: {len(company_ids)} 个公司，{total} 行")
+
+    finally:
+        cursor.close()
+        conn.close()
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description='订单汇总表维护')
+    parser.add_argument('command', choices=['install', 'rebuild'])
+    parser.add_argument('--company-id', type=int, help='只重建指定公司')
+    parser.add_argument('--table', action='append', choices=sorted(REBUILDERS.keys()),
+                        help='只重建指定汇总表（可多次指定）')
+    args = parser.parse_args()
+
+    print(f"\n[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] 订单汇总表 {args.command}")
+
+    try:
+        if args.command == 'install':
+            install()
+        else:
+            rebuild(company_id=args.company_id, tables=args.table)
+
+        print("\n✅ 完成\n")
+
+    except Exception as e:
+        print(f"\n❌ 执行失败：{str(e)}")
+        import traceback
+        traceback.print_exc()
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
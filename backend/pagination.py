@@ -0,0 +1,180 @@
+# -*- coding: utf-8 -*-
+"""
+移动端列表分页工具
+提供游标（keyset）分页的游标编解码和SQL条件生成，深度翻页不再依赖OFFSET；
+以及按租户和筛选条件缓存的列表总数
+"""
+
+import base64
+import json
+
+from config import config
+from cache import TTLCache, get_data_versions
+
+
+class InvalidCursorError(ValueError):
+    """游标格式错误或与当前排序条件不匹配"""
+    pass
+
+
+def is_truthy(value):
+    """解析布尔型Query参数（1/true/yes）"""
+    return str(value or '').strip().lower() in ('1', 'true', 'yes')
+
+
+def encode_cursor(sort_by, sort_order, value, row_id):
+    """
+    生成不透明游标
+
+    参数：
+        sort_by: 排序字段
+        sort_order: 排序方向（ASC|DESC）
+        value: 当前页最后一行的排序字段值
+        row_id: 当前页最后一行的ID（同值时的次级排序）
+
+    返回：
+        str: URL安全的base64字符串
+    """
+    payload = {
+        's': sort_by,
+        'o': sort_order,
+        'v': None if value is None else str(value),
+        'id': row_id
+    }
+    raw = json.dumps(payload, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor, sort_by, sort_order):
+    """
+    解析游标
+
+    参数：
+        cursor: encode_cursor生成的字符串
+        sort_by: 当前请求的排序字段
+        sort_order: 当前请求的排序方向
+
+    返回：
+        tuple: (排序字段值, 行ID)
+
+    异常：
+        InvalidCursorError: 游标无法解析，或排序条件与生成游标时不一致
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        payload = json.loads(raw.decode('utf-8'))
+        value = payload['v']
+        row_id = int(payload['id'])
+    except Exception:
+        raise InvalidCursorError('无效的分页游标')
+
+    if payload.get('s') != sort_by or payload.get('o') != sort_order:
+        raise InvalidCursorError('分页游标与排序条件不匹配')
+
+    return value, row_id
+
+
+def keyset_condition(column, id_column, sort_order, value, row_id):
+    """
+    生成"位于游标之后"的WHERE条件
+
+    排序为 ORDER BY column {sort_order}, id_column {sort_order}，
+    按MySQL的NULL排序规则处理空值（ASC时NULL在前，DESC时NULL在后）。
+
+    返回：
+        tuple: (SQL片段, 参数列表)
+    """
+    if sort_order == 'DESC':
+        if value is None:
+            return f'({column} IS NULL AND {id_column} < %s)', [row_id]
+        return (
+            f'({column} < %s OR {column} IS NULL OR ({column} = %s AND {id_column} < %s))',
+            [value, value, row_id]
+        )
+
+    if value is None:
+        return f'({column} IS NOT NULL OR ({column} IS NULL AND {id_column} > %s))', [row_id]
+    return f'({column} > %s OR ({column} = %s AND {id_column} > %s))', [value, value, row_id]
+
+
+# ============================================================
+# 列表总数缓存
+# ============================================================
+
+# 键：(租户ID, 范围, 规范化后的筛选条件)，值：(数据版本, 总数, 是否为估算值)
+count_cache = TTLCache(ttl=config.COUNT_CACHE_TTL, max_entries=config.COUNT_CACHE_MAX_ENTRIES)
+
+
+def normalize_filters(filters):
+    """
+    规范化筛选条件，使等价的筛选命中同一缓存项
+
+    去掉空值，字符串去空白并转小写（LIKE匹配不区分大小写），按键排序
+    """
+    items = []
+    for key, value in filters.items():
+        if value is None or value == '':
+            continue
+        if isinstance(value, str):
+            value = value.strip().lower()
+        items.append((key, value))
+    return tuple(sorted(items))
+
+
+def estimate_count(cursor, from_where_sql, params):
+    """
+    通过EXPLAIN的行数估算结果集大小（不扫描数据）
+
+    参数：
+        from_where_sql: "FROM ... WHERE ..." 片段
+        params: SQL参数
+    """
+    cursor.execute(f"EXPLAIN SELECT 1 {from_where_sql}", params)
+    estimate = 1.0
+    for row in cursor.fetchall():
+        rows = row.get('rows') or 0
+        filtered = row.get('filtered')
+        estimate *= float(rows) * (float(filtered) if filtered is not None else 100.0) / 100.0
+    return int(estimate)
+
+
+def count_total(cursor, tenant_id, scope, filters, from_where_sql, params,
+                depends_on=None, approximate=False):
+    """
+    获取列表总数（带缓存）
+
+    缓存项记录写入时租户的数据版本号，orders/customers发生变化后自动失效；
+    approximate为True且估算值超过APPROXIMATE_COUNT_THRESHOLD时返回估算值，不执行COUNT(*)。
+
+    参数：
+        cursor: DictCursor游标
+        tenant_id: 租户ID
+        scope: 列表范围（orders|customers）
+        filters: 筛选条件dict（用于生成缓存键）
+        from_where_sql: "FROM ... WHERE ..." 片段
+        params: SQL参数
+        depends_on: 总数依赖的数据范围，默认只依赖scope本身
+        approximate: 是否允许返回估算值
+
+    返回：
+        tuple: (总数, 是否为估算值)
+    """
+    versions = get_data_versions(cursor, tenant_id)
+    version_key = tuple(versions.get(name, 0) for name in (depends_on or (scope,)))
+    key = (tenant_id, scope, normalize_filters(filters))
+
+    cached = count_cache.get(key)
+    if cached is not None and cached[0] == version_key and (approximate or not cached[2]):
+        return cached[1], cached[2]
+
+    if approximate:
+        estimate = estimate_count(cursor, from_where_sql, params)
+        if estimate >= config.APPROXIMATE_COUNT_THRESHOLD:
+            count_cache.set(key, (version_key, estimate, True))
+            return estimate, True
+
+    cursor.execute(f"SELECT COUNT(*) as total {from_where_sql}", params)
+    total = cursor.fetchone()['total']
+    count_cache.set(key, (version_key, total, False))
+    return total, False
+
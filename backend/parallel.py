@@ -0,0 +1,64 @@
+# -*- coding: utf-8 -*-
+"""
+移动端并发查询工具
+在有界线程池中并发执行互不依赖的查询，每个任务使用各自的连接池连接
+
+任务在调用方的contextvars上下文副本中执行，能访问当前请求的g/request，
+请求指标和SQL追踪仍归属于发起请求。
+"""
+
+import contextvars
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from config import config
+
+_executor = None
+_executor_pid = None
+_executor_lock = threading.Lock()
+_local = threading.local()
+
+
+def _get_executor():
+    """获取线程池（fork后的子进程重新创建）"""
+    global _executor, _executor_pid
+    pid = os.getpid()
+    if _executor is None or _executor_pid != pid:
+        with _executor_lock:
+            if _executor is None or _executor_pid != pid:
+                _executor = ThreadPoolExecutor(
+                    max_workers=config.PARALLEL_MAX_WORKERS,
+                    thread_name_prefix='mobile-parallel',
+                    initializer=_mark_worker_thread
+                )
+                _executor_pid = pid
+    return _executor
+
+
+def _mark_worker_thread():
+    _local.in_worker = True
+
+
+def run_parallel(tasks, timeout=None):
+    """
+    并发执行多个任务
+
+    已在线程池中执行的任务再次调用时改为顺序执行，避免线程池占满后互相等待。
+
+    参数：
+        tasks: dict，任务名 -> 无参可调用对象
+        timeout: 等待全部任务的最长秒数
+
+    返回：
+        dict: 任务名 -> 返回值（任一任务抛出异常时原样抛出）
+    """
+    if len(tasks) <= 1 or getattr(_local, 'in_worker', False):
+        return {name: func() for name, func in tasks.items()}
+
+    executor = _get_executor()
+    futures = {
+        name: executor.submit(contextvars.copy_context().run, func)
+        for name, func in tasks.items()
+    }
+    return {name: future.result(timeout=timeout) for name, future in futures.items()}
@@ -0,0 +1,339 @@
+# -*- coding: utf-8 -*-
+"""
+按租户的前缀和区间统计
+每个worker在内存中为每个租户保存每日订单汇总的前缀和数组，
+任意[date_from, date_to]的合计只需两次数组下标访问：prefix[to + 1] - prefix[from]
+
+数据来源为daily_order_summary（触发器维护，见order_rollups.py）：
+- 首次访问租户时全量加载
+- 之后每隔RANGE_STATS_REFRESH_SECONDS按updated_at增量拉取变化的日期，
+  行内是当天的完整汇总值，重复拉取不会重复累加
+- 每隔RANGE_STATS_FULL_RELOAD_SECONDS全量重新加载一次（覆盖汇总表全量重建等删除行的情况）
+- 只为最近RANGE_STATS_HORIZON_DAYS天保存每日值，更早的日期合并为一个“早期”合计，
+  内存与订单历史长短无关；覆盖全部早期数据的区间（如“累计”）仍只查表，
+  只覆盖部分早期日期的区间，早期部分改为在daily_order_summary上按主键范围求和
+
+公司在METRIC_STORE_DIR下有指标文件时（见metric_store.py）不访问数据库：
+每日值直接引用只读映射的文件（各worker共享页缓存），只在本进程保存前缀和，
+文件签名（inode、大小、修改时间）变化后重新计算
+
+没有下单日期的订单不在daily_order_summary中：不限日期的区间（ALL_TIME，如“累计”、period=all）
+另外查询orders补上这部分订单，其它区间不计入
+"""
+
+import threading
+import time
+from array import array
+from collections import OrderedDict
+from datetime import date, timedelta
+from itertools import accumulate
+
+import metric_store
+from config import config
+from stats_series import AMOUNT_METRICS, METRIC_COLUMNS, to_cents
+
+METRICS = tuple(METRIC_COLUMNS)
+
+_SELECT_COLUMNS = ', '.join(f'{column} as {metric}' for metric, column in METRIC_COLUMNS.items())
+_SUM_COLUMNS = ', '.join(f'IFNULL(SUM({column}), 0) as {metric}' for metric, column in METRIC_COLUMNS.items())
+
+# 不限日期的区间
+ALL_TIME = (date.min, date.max - timedelta(days=1))
+
+# 没有下单日期的订单汇总（口径与daily_order_summary一致：不含售后单，金额不含已取消订单）
+UNDATED_ORDER_SQL = """
+    SELECT
+        COUNT(*) as order_count,
+        IFNULL(SUM(CASE WHEN status != 'cancelled' THEN total_amount ELSE 0 END), 0) as order_amount,
+        IFNULL(SUM(status = 'pending'), 0) as pending_count,
+        IFNULL(SUM(status = 'confirmed'), 0) as confirmed_count,
+        IFNULL(SUM(status = 'shipped'), 0) as shipped_count,
+        IFNULL(SUM(status = 'completed'), 0) as completed_count,
+        IFNULL(SUM(status = 'cancelled'), 0) as cancelled_count
+    FROM orders
+    WHERE company_id = %s
+      AND order_date IS NULL
+      AND IFNULL(order_type, 'normal') != 'aftersale'
+"""
+
+
+def _row_values(row):
+    return {
+        metric: to_cents(row[metric]) if metric in AMOUNT_METRICS else int(row[metric] or 0)
+        for metric in METRICS
+    }
+
+
+class TenantPrefixSums:
+    """
+    单个租户的每日值和前缀和
+
+    daily[metric][i]为base_date之后第i天的值，prefix[metric][i]为早于base_date的合计加上前i天之和
+    （长度比daily多1）；before_from为早期合计中最早的日期，没有早期数据时为None
+    """
+
+    def __init__(self, base_date, days):
+        self.base_date = base_date
+        self.daily = {metric: array('q', bytes(8 * days)) for metric in METRICS}
+        self.prefix = {metric: array('q', bytes(8 * (days + 1))) for metric in METRICS}
+        self.before_from = None
+        self.watermark = None
+        self.signature = None
+        self.loaded_at = time.monotonic()
+        self.checked_at = self.loaded_at
+        self.lock = threading.Lock()
+
+    @classmethod
+    def from_mapped(cls, mapped):
+        """从内存映射的指标文件构建（每日值直接引用映射，不复制）"""
+        sums = cls(mapped.base_date, 0)
+        for metric in METRICS:
+            column = mapped.column(metric)
+            sums.daily[metric] = column
+            sums.prefix[metric].extend(accumulate(column))
+        sums.watermark = mapped.watermark
+        sums.signature = mapped.signature
+        return sums
+
+    def set_before(self, before_from, values):
+        """设置早于base_date的合计（在apply_rows之前调用）"""
+        self.before_from = before_from
+        for metric, value in values.items():
+            self.prefix[metric] = array('q', [value]) * len(self.prefix[metric])
+
+    @property
+    def days(self):
+        return len(self.daily[METRICS[0]])
+
+    def _extend_to(self, day):
+        """向后扩展数组以覆盖day"""
+        missing = (day - self.base_date).days + 1 - self.days
+        if missing <= 0:
+            return
+        for metric in METRICS:
+            total = self.prefix[metric][-1]
+            self.daily[metric].extend(array('q', bytes(8 * missing)))
+            self.prefix[metric].extend(array('q', [total]) * missing)
+
+    def apply_rows(self, rows):
+        """
+        写入若干天的汇总值并重算受影响的前缀和
+
+        返回：
+            bool: False表示有早于base_date的日期，需要全量重新加载
+        """
+        changed_from = None
+        for row in rows:
+            day = row['order_date']
+            if day < self.base_date:
+                return False
+            self._extend_to(day)
+            index = (day - self.base_date).days
+            for metric, value in _row_values(row).items():
+                if self.daily[metric][index] != value:
+                    self.daily[metric][index] = value
+                    changed_from = index if changed_from is None else min(changed_from, index)
+            if self.watermark is None or row['updated_at'] > self.watermark:
+                self.watermark = row['updated_at']
+
+        if changed_from is not None:
+            for metric in METRICS:
+                daily = self.daily[metric]
+                prefix = self.prefix[metric]
+                running = prefix[changed_from]
+                for i in range(changed_from, len(daily)):
+                    running += daily[i]
+                    prefix[i + 1] = running
+        return True
+
+    def _position(self, day):
+        """日期对应的前缀和下标（超出范围时截断）"""
+        return min(max((day - self.base_date).days, 0), self.days)
+
+    def covers(self, date_from, date_to):
+        """[date_from, date_to]能否只用内存中的数据得到（不涉及早期日期，或覆盖全部早期日期）"""
+        return (
+            self.before_from is None
+            or date_from >= self.base_date
+            or (date_from <= self.before_from and date_to >= self.base_date - timedelta(days=1))
+        )
+
+    def total(self, metric, date_from, date_to):
+        """[date_from, date_to]合计（金额为分，早于base_date的部分按全部早期合计计入，见covers）"""
+        prefix = self.prefix[metric]
+        start = prefix[self._position(date_from)] if date_from >= self.base_date else 0
+        return prefix[self._position(date_to + timedelta(days=1))] - start
+
+
+class RangeStatsStore:
+    """
+    前缀和缓存（按租户，超出RANGE_STATS_MAX_TENANTS时淘汰最久未使用的租户）
+    """
+
+    def __init__(self, max_tenants=1000):
+        self.max_tenants = max_tenants
+        self._lock = threading.Lock()
+        self._tenants = OrderedDict()
+
+    def _load(self, cursor, tenant_id):
+        """全量加载租户的每日汇总（早于RANGE_STATS_HORIZON_DAYS的日期只加载合计）"""
+        today = date.today()
+        horizon_from = today - timedelta(days=config.RANGE_STATS_HORIZON_DAYS - 1)
+        cursor.execute(f"""
+            SELECT MIN(order_date) as first_date, MAX(updated_at) as updated_at, {_SUM_COLUMNS}
+            FROM daily_order_summary
+            WHERE company_id = %s AND order_date < %s
+        """, (tenant_id, horizon_from))
+        before = cursor.fetchone()
+
+        cursor.execute(f"""
+            SELECT order_date, {_SELECT_COLUMNS}, updated_at
+            FROM daily_order_summary
+            WHERE company_id = %s AND order_date >= %s
+            ORDER BY order_date
+        """, (tenant_id, horizon_from))
+        rows = cursor.fetchall()
+
+        if before and before['first_date'] is not None:
+            base_date = horizon_from
+        else:
+            before = None
+            base_date = min(rows[0]['order_date'], today) if rows else today
+        days = (today - base_date).days + 1
+        sums = TenantPrefixSums(base_date, days)
+        if before:
+            sums.set_before(before['first_date'], _row_values(before))
+            sums.watermark = before['updated_at']
+        sums.apply_rows(rows)
+        return sums
+
+    def _older_totals(self, cursor, tenant_id, date_from, date_to, metrics):
+        """早期日期的区间合计（daily_order_summary主键范围求和，金额为分）"""
+        cursor.execute(f"""
+            SELECT {_SUM_COLUMNS}
+            FROM daily_order_summary
+            WHERE company_id = %s AND order_date BETWEEN %s AND %s
+        """, (tenant_id, date_from, date_to))
+        values = _row_values(cursor.fetchone())
+        return {metric: values[metric] for metric in metrics}
+
+    def _undated_totals(self, cursor, tenant_id, metrics):
+        """没有下单日期的订单合计（金额为分）"""
+        cursor.execute(UNDATED_ORDER_SQL, (tenant_id,))
+        values = _row_values(cursor.fetchone())
+        return {metric: values[metric] for metric in metrics}
+
+    def _refresh(self, cursor, tenant_id, sums):
+        """增量拉取变化的日期（调用方持有sums.lock）"""
+        if sums.watermark is None:
+            cursor.execute(f"""
+                SELECT order_date, {_SELECT_COLUMNS}, updated_at
+                FROM daily_order_summary
+                WHERE company_id = %s
+            """, (tenant_id,))
+        else:
+            # 回看一段时间：事务提交晚于updated_at时，行可能在水位线之后才可见
+            cursor.execute(f"""
+                SELECT order_date, {_SELECT_COLUMNS}, updated_at
+                FROM daily_order_summary
+                WHERE company_id = %s AND updated_at >= %s
+            """, (tenant_id, sums.watermark - timedelta(seconds=config.RANGE_STATS_REFRESH_OVERLAP_SECONDS)))
+        rows = cursor.fetchall()
+        sums._extend_to(date.today())
+        return sums.apply_rows(rows)
+
+    def get(self, cursor, tenant_id):
+        """
+        获取租户的前缀和（按需加载/增量刷新）
+
+        参数：
+            cursor: DictCursor游标（加载和刷新时使用）
+            tenant_id: 租户ID
+        """
+        with self._lock:
+            sums = self._tenants.get(tenant_id)
+            if sums is not None:
+                self._tenants.move_to_end(tenant_id)
+
+        signature = metric_store.file_signature(tenant_id)
+        if signature is not None:
+            if sums is not None and sums.signature == signature:
+                return sums
+            mapped = metric_store.open_tenant(tenant_id)
+            if mapped is not None:
+                return self._store(tenant_id, TenantPrefixSums.from_mapped(mapped))
+        if sums is not None and sums.signature is not None:
+            # 指标文件已删除，改为从数据库加载
+            sums = None
+
+        now = time.monotonic()
+        if sums is not None and now - sums.loaded_at < config.RANGE_STATS_FULL_RELOAD_SECONDS:
+            if now - sums.checked_at < config.RANGE_STATS_REFRESH_SECONDS:
+                return sums
+            with sums.lock:
+                if now - sums.checked_at >= config.RANGE_STATS_REFRESH_SECONDS:
+                    if self._refresh(cursor, tenant_id, sums):
+                        sums.checked_at = time.monotonic()
+                        return sums
+                else:
+                    return sums
+
+        return self._store(tenant_id, self._load(cursor, tenant_id))
+
+    def _store(self, tenant_id, sums):
+        with self._lock:
+            self._tenants[tenant_id] = sums
+            self._tenants.move_to_end(tenant_id)
+            while len(self._tenants) > self.max_tenants:
+                self._tenants.popitem(last=False)
+        return sums
+
+    def totals(self, cursor, tenant_id, date_from, date_to, metrics=METRICS):
+        """
+        区间合计
+
+        返回：
+            dict: 指标 -> 合计值（金额为分）
+        """
+        return self.bucket_totals(cursor, tenant_id, [(date_from, date_to)], metrics)[0]
+
+    def bucket_totals(self, cursor, tenant_id, buckets, metrics):
+        """
+        多个区间的合计（趋势图每个点两次查表）
+
+        参数：
+            buckets: [(开始日期, 结束日期), ...]，ALL_TIME区间计入没有下单日期的订单
+
+        返回：
+            list: 与buckets对应的 {指标: 合计值（金额为分）}
+        """
+        sums = self.get(cursor, tenant_id)
+        older = []
+        with sums.lock:
+            results = []
+            for start, end in buckets:
+                if sums.covers(start, end):
+                    results.append({metric: sums.total(metric, start, end) for metric in metrics})
+                    continue
+                # 只覆盖部分早期日期：内存中取base_date之后的部分，早期部分稍后查库
+                recent_from = max(start, sums.base_date)
+                results.append({
+                    metric: sums.total(metric, recent_from, end) if end >= recent_from else 0
+                    for metric in metrics
+                })
+                older.append((len(results) - 1, start, min(end, sums.base_date - timedelta(days=1))))
+
+        for index, start, end in older:
+            for metric, value in self._older_totals(cursor, tenant_id, start, end, metrics).items():
+                results[index][metric] += value
+        all_time = [index for index, bucket in enumerate(buckets) if tuple(bucket) == ALL_TIME]
+        if all_time:
+            undated = self._undated_totals(cursor, tenant_id, metrics)
+            for index in all_time:
+                for metric, value in undated.items():
+                    results[index][metric] += value
+        return results
+
+
+# 全局前缀和缓存（每个worker进程一份）
+range_stats = RangeStatsStore(max_tenants=config.RANGE_STATS_MAX_TENANTS)
@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+"""
+移动端请求指标中间件
+记录每个请求的总耗时、数据库耗时、SQL条数和响应大小，按Blueprint、路由、方法、状态码聚合为直方图
+"""
+
+import threading
+import time
+
+from flask import g, has_request_context, request
+
+from db_pool import add_execute_listener
+from metrics import LATENCY_BUCKETS, SIZE_BUCKETS, flush, registry
+
+# 同一请求的SQL可能在run_parallel的多个线程中执行（共享同一个g），累加时加锁
+_db_lock = threading.Lock()
+
+
+def _on_sql_executed(kind, statement, params, seconds, cursor):
+    """SQL执行监听：累计当前请求的数据库耗时"""
+    if not has_request_context():
+        return
+    with _db_lock:
+        g.db_seconds = g.get('db_seconds', 0.0) + seconds
+        if kind != 'fetch':
+            g.db_queries = g.get('db_queries', 0) + 1
+
+
+def _start_timer():
+    g.request_started = time.perf_counter()
+    g.db_seconds = 0.0
+    g.db_queries = 0
+
+
+def _record_request(response):
+    started = g.pop('request_started', None)
+    if started is None:
+        return response
+
+    elapsed = time.perf_counter() - started
+    db_seconds = g.get('db_seconds', 0.0)
+    labels = {
+        'blueprint': request.blueprint or 'app',
+        'route': request.url_rule.rule if request.url_rule else 'unmatched',
+        'method': request.method,
+        'status': response.status_code
+    }
+
+    registry.inc('http_requests_total', **labels)
+    registry.inc('db_queries_total', g.get('db_queries', 0), **labels)
+    registry.observe('http_request_duration_seconds', elapsed, LATENCY_BUCKETS, **labels)
+    registry.observe('http_request_db_seconds', db_seconds, LATENCY_BUCKETS, **labels)
+
+    # 流式响应无法提前得知大小，不计入
+    size = response.calculate_content_length()
+    if size is not None:
+        registry.observe('http_response_size_bytes', size, SIZE_BUCKETS, **labels)
+
+    # 浏览器开发者工具可直接看到服务端耗时拆分
+    response.headers['Server-Timing'] = f'app;dur={elapsed * 1000:.1f}, db;dur={db_seconds * 1000:.1f}'
+
+    flush()
+    return response
+
+
+def init_request_metrics(app):
+    """
+    注册请求指标中间件
+
+    需在其它after_request之前调用：Flask按注册的逆序执行after_request，
+    先注册可保证最后执行，统计到的是压缩后的响应大小和包含压缩在内的耗时。
+    """
+    add_execute_listener(_on_sql_executed)
+    app.before_request(_start_timer)
+    app.after_request(_record_request)
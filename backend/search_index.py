@@ -0,0 +1,625 @@
+# -*- coding: utf-8 -*-
+"""
+移动端客户搜索索引
+每个worker在内存中为每个租户保存客户名称的字符n-gram倒排索引（一元 + 二元）和前缀索引，
+关键词搜索不再对customers执行LIKE '%kw%'全表扫描
+
+- 按字符切分：中文不需要分词，一个汉字就是一个字符；英文、数字同样按字符处理
+- 文本统一做NFKC规范化并转小写（全角/半角、大小写不敏感，与MySQL默认排序规则一致）
+- 倒排表为按客户ID升序的array('q')，搜索时从最短的倒排表开始求交集，
+  再逐个核对规范化后的字段确实包含关键词（二元组都命中不代表连续出现）
+- 输入联想使用排序数组上的二分查找定位前缀区间，按客户最近的下单活跃度排序，
+  短前缀的排序结果缓存在索引中
+- 构建索引时为含汉字的名称生成全拼和首字母（如"刘记桃酥" -> liujitaosu、ljts），
+  输入联想可以按拼音匹配（需要安装pypinyin，未安装时只按原文匹配）
+
+同步方式：
+- 索引不落盘，进程启动后首次访问租户时全量构建（统计预热线程也会提前构建）
+- 每次搜索读取tenant_data_versions中的版本号（主键查询），customers版本变化后
+  按updated_at增量拉取变化的客户，orders版本变化后增量拉取customer_order_stats
+- customers版本变化时比较客户数，数据库中的客户比索引少时（有物理删除）拉取客户ID，移除已不存在的客户
+- 接口按主键读取客户时发现已删除（索引尚未同步）的客户，通过discard立即从索引中移除
+- 每隔SEARCH_INDEX_FULL_RELOAD_SECONDS全量重建一次
+"""
+
+import heapq
+import re
+import threading
+import time
+import unicodedata
+from array import array
+from bisect import bisect_left, insort
+from collections import OrderedDict
+from datetime import timedelta
+from functools import lru_cache
+
+from config import config
+from cache import get_data_versions
+
+# pypinyin为可选依赖，未安装时不生成拼音
+try:
+    from pypinyin import Style, lazy_pinyin
+except ImportError:
+    lazy_pinyin = None
+
+
+def warn_missing_pinyin():
+    """SEARCH_INDEX_PINYIN开启但未安装pypinyin时打印警告（导入时执行，避免拼音联想静默失效）"""
+    if config.SEARCH_INDEX_PINYIN and lazy_pinyin is None:
+        print("[Search Index] 警告: SEARCH_INDEX_PINYIN已开启但未安装pypinyin，"
+              "客户输入联想只按原文匹配（pip install pypinyin）")
+        return True
+    return False
+
+
+warn_missing_pinyin()
+
+# 参与搜索的客户字段
+CUSTOMER_SEARCH_FIELDS = ('shop_name', 'douyin_name', 'company_name')
+
+# 订单中显示的客户名称字段（订单搜索按客户名称匹配时使用）
+CUSTOMER_NAME_FIELD = 'name'
+
+# 已删除客户的状态值（快速搜索不返回）
+DELETED_STATUS = '已删除'
+
+# 连续的汉字
+HAN_PATTERN = re.compile(r'[\u3400-\u4dbf\u4e00-\u9fff]+')
+
+
+def normalize_text(text):
+    """规范化文本（NFKC + 小写）"""
+    if not text:
+        return ''
+    return unicodedata.normalize('NFKC', str(text)).casefold()
+
+
+@lru_cache(maxsize=100000)
+def pinyin_forms(text):
+    """
+    文本的全拼和首字母（如"刘记桃酥" -> ("liujitaosu", "ljts")）
+
+    非汉字部分原样保留（去掉空白），不含汉字或未安装pypinyin时返回空元组
+    """
+    if lazy_pinyin is None or not text:
+        return ()
+    text = normalize_text(text)
+    if not HAN_PATTERN.search(text):
+        return ()
+
+    full = []
+    initials = []
+    position = 0
+    for match in HAN_PATTERN.finditer(text):
+        other = ''.join(text[position:match.start()].split())
+        full.append(other)
+        initials.append(other)
+        syllables = lazy_pinyin(match.group(), style=Style.NORMAL)
+        full.extend(syllables)
+        initials.extend(syllable[0] for syllable in syllables if syllable)
+        position = match.end()
+    other = ''.join(text[position:].split())
+    full.append(other)
+    initials.append(other)
+    return ''.join(full), ''.join(initials)
+
+
+def customer_pinyin_texts(row):
+    """客户搜索字段的拼音形式（SEARCH_INDEX_PINYIN关闭时为空）"""
+    if not config.SEARCH_INDEX_PINYIN:
+        return []
+    texts = []
+    for field in CUSTOMER_SEARCH_FIELDS:
+        texts.extend(pinyin_forms(row[field]))
+    return texts
+
+
+def text_grams(text):
+    """文本的全部一元和二元字符组"""
+    grams = set(text)
+    grams.update(text[i:i + 2] for i in range(len(text) - 1))
+    return grams
+
+
+def query_grams(query):
+    """查询使用的字符组：单字查一元组，否则查全部二元组"""
+    if len(query) == 1:
+        return {query}
+    return {query[i:i + 2] for i in range(len(query) - 1)}
+
+
+def intersect_postings(postings):
+    """
+    多个升序倒排表求交集
+
+    从最短的开始；另一个表长很多时逐个二分查找，否则顺序归并
+
+    返回：
+        list: 升序的文档ID
+    """
+    postings = sorted(postings, key=len)
+    result = list(postings[0])
+    for other in postings[1:]:
+        if not result:
+            break
+        matched = []
+        if len(other) > 8 * len(result):
+            position = 0
+            for doc_id in result:
+                position = bisect_left(other, doc_id, position)
+                if position == len(other):
+                    break
+                if other[position] == doc_id:
+                    matched.append(doc_id)
+        else:
+            i = j = 0
+            while i < len(result) and j < len(other):
+                if result[i] == other[j]:
+                    matched.append(result[i])
+                    i += 1
+                    j += 1
+                elif result[i] < other[j]:
+                    i += 1
+                else:
+                    j += 1
+        result = matched
+    return result
+
+
+class NgramIndex:
+    """
+    字符n-gram倒排索引
+
+    texts[doc_id]为文档的规范化文本元组，postings[字符组]为包含该字符组的文档ID（升序）
+    """
+
+    def __init__(self):
+        self.texts = {}
+        self.postings = {}
+
+    def __len__(self):
+        return len(self.texts)
+
+    @classmethod
+    def build(cls, documents):
+        """
+        批量构建
+
+        参数：
+            documents: [(文档ID, [文本, ...]), ...]
+        """
+        index = cls()
+        lists = {}
+        for doc_id, texts in documents:
+            normalized = tuple(filter(None, (normalize_text(text) for text in texts)))
+            index.texts[doc_id] = normalized
+            for gram in set().union(*map(text_grams, normalized)):
+                lists.setdefault(gram, []).append(doc_id)
+        index.postings = {gram: array('q', sorted(ids)) for gram, ids in lists.items()}
+        return index
+
+    def add(self, doc_id, texts):
+        """新增或替换文档"""
+        self.remove(doc_id)
+        normalized = tuple(filter(None, (normalize_text(text) for text in texts)))
+        self.texts[doc_id] = normalized
+        for gram in set().union(*map(text_grams, normalized)):
+            posting = self.postings.get(gram)
+            if posting is None:
+                self.postings[gram] = array('q', [doc_id])
+            else:
+                insort(posting, doc_id)
+
+    def remove(self, doc_id):
+        """删除文档"""
+        normalized = self.texts.pop(doc_id, None)
+        if not normalized:
+            return
+        for gram in set().union(*map(text_grams, normalized)):
+            posting = self.postings.get(gram)
+            if posting is None:
+                continue
+            position = bisect_left(posting, doc_id)
+            if position < len(posting) and posting[position] == doc_id:
+                del posting[position]
+            if not posting:
+                del self.postings[gram]
+
+    def search(self, keyword):
+        """
+        子串搜索（与LIKE '%keyword%'等价）
+
+        返回：
+            list: 升序的文档ID；关键词为空时返回None
+        """
+        query = normalize_text(keyword)
+        if not query:
+            return None
+
+        postings = []
+        for gram in query_grams(query):
+            posting = self.postings.get(gram)
+            if posting is None:
+                return []
+            postings.append(posting)
+
+        return [
+            doc_id for doc_id in intersect_postings(postings)
+            if any(query in text for text in self.texts[doc_id])
+        ]
+
+
+class PrefixIndex:
+    """
+    前缀索引（排序数组 + 二分查找）
+
+    keys为升序的(规范化文本, 文档ID)，一个文档的每个字段各占一项，
+    前缀prefix的匹配项是keys中[bisect_left((prefix,)), bisect_left((prefix + 最大字符,)))这一段
+    """
+
+    def __init__(self):
+        self.keys = []
+        self.doc_keys = {}
+
+    @classmethod
+    def build(cls, documents):
+        """
+        批量构建
+
+        参数：
+            documents: [(文档ID, [文本, ...]), ...]
+        """
+        index = cls()
+        for doc_id, texts in documents:
+            index.doc_keys[doc_id] = index._keys_of(doc_id, texts)
+            index.keys.extend(index.doc_keys[doc_id])
+        index.keys.sort()
+        return index
+
+    @staticmethod
+    def _keys_of(doc_id, texts):
+        return tuple({(text, doc_id) for text in (normalize_text(text).strip() for text in texts) if text})
+
+    def texts_of(self, doc_id):
+        """文档的规范化文本"""
+        return [text for text, _ in self.doc_keys.get(doc_id, ())]
+
+    def add(self, doc_id, texts):
+        """新增或替换文档"""
+        self.remove(doc_id)
+        keys = self.doc_keys[doc_id] = self._keys_of(doc_id, texts)
+        for key in keys:
+            insort(self.keys, key)
+
+    def remove(self, doc_id):
+        """删除文档"""
+        for key in self.doc_keys.pop(doc_id, ()):
+            position = bisect_left(self.keys, key)
+            if position < len(self.keys) and self.keys[position] == key:
+                del self.keys[position]
+
+    def match(self, prefix):
+        """
+        前缀匹配
+
+        返回：
+            set: 有字段以prefix开头的文档ID
+        """
+        low = bisect_left(self.keys, (prefix,))
+        high = bisect_left(self.keys, (prefix + '\U0010ffff',), low)
+        return {doc_id for _, doc_id in self.keys[low:high]}
+
+
+# ============================================================
+# 按租户的客户索引
+# ============================================================
+
+class TenantCustomerIndex:
+    """
+    单个租户的客户索引
+
+    - index: CUSTOMER_SEARCH_FIELDS的n-gram索引（客户搜索、客户列表关键词筛选）
+    - prefix_index: CUSTOMER_SEARCH_FIELDS及其拼音形式的前缀索引（下单时选择客户的输入联想）
+    - pinyin_index: 拼音形式的n-gram索引（输入联想按拼音补充包含关键词的客户）
+    - name_index: 客户名称的n-gram索引（订单搜索）
+    - activity: 客户的(最近下单日期序数, 订单数)，来自customer_order_stats，联想结果按它排序
+    - top_suggestions: 短前缀（不超过SUGGEST_CACHED_PREFIX_LENGTH个字符）的排序结果，
+      首次查询时计算，前缀下的客户或其活跃度变化时丢弃
+    """
+
+    def __init__(self, rows, activity_rows, versions):
+        self.index = NgramIndex.build(
+            (row['id'], [row[field] for field in CUSTOMER_SEARCH_FIELDS]) for row in rows
+        )
+        pinyin_texts = {row['id']: customer_pinyin_texts(row) for row in rows}
+        self.prefix_index = PrefixIndex.build(
+            (row['id'], [row[field] for field in CUSTOMER_SEARCH_FIELDS] + pinyin_texts[row['id']]) for row in rows
+        )
+        self.pinyin_index = NgramIndex.build(pinyin_texts.items())
+        self.name_index = NgramIndex.build((row['id'], [row[CUSTOMER_NAME_FIELD]]) for row in rows)
+        self.deleted = set()
+        self.watermark = None
+        for row in rows:
+            self._set_meta(row)
+        self.activity = {}
+        self.activity_watermark = None
+        self.top_suggestions = {}
+        self.apply_activity(activity_rows)
+        self.versions = versions
+        self.loaded_at = time.monotonic()
+        self.lock = threading.Lock()
+
+    def _set_meta(self, row):
+        if row['status'] == DELETED_STATUS:
+            self.deleted.add(row['id'])
+        else:
+            self.deleted.discard(row['id'])
+        if row['updated_at'] is not None and (self.watermark is None or row['updated_at'] > self.watermark):
+            self.watermark = row['updated_at']
+
+    def _discard_suggestions(self, customer_id):
+        """丢弃包含该客户的短前缀排序结果"""
+        if not self.top_suggestions:
+            return
+        for text in self.prefix_index.texts_of(customer_id):
+            for length in range(1, min(len(text), config.SUGGEST_CACHED_PREFIX_LENGTH) + 1):
+                self.top_suggestions.pop(text[:length], None)
+
+    def apply_rows(self, rows):
+        """写入变化的客户（调用方持有lock）"""
+        for row in rows:
+            texts = [row[field] for field in CUSTOMER_SEARCH_FIELDS]
+            pinyin_texts = customer_pinyin_texts(row)
+            self._discard_suggestions(row['id'])
+            self.index.add(row['id'], texts)
+            self.prefix_index.add(row['id'], texts + pinyin_texts)
+            self.pinyin_index.add(row['id'], pinyin_texts)
+            self.name_index.add(row['id'], [row[CUSTOMER_NAME_FIELD]])
+            self._set_meta(row)
+            self._discard_suggestions(row['id'])
+
+    def remove_customers(self, customer_ids):
+        """移除客户（调用方持有lock）"""
+        for customer_id in customer_ids:
+            self._discard_suggestions(customer_id)
+            self.index.remove(customer_id)
+            self.prefix_index.remove(customer_id)
+            self.pinyin_index.remove(customer_id)
+            self.name_index.remove(customer_id)
+            self.deleted.discard(customer_id)
+            self.activity.pop(customer_id, None)
+
+    def apply_activity(self, rows):
+        """写入变化的客户活跃度（调用方持有lock）"""
+        for row in rows:
+            last_order_date = row['last_order_date']
+            activity = (last_order_date.toordinal() if last_order_date else 0, row['order_count'] or 0)
+            if self.activity.get(row['customer_id']) != activity:
+                self.activity[row['customer_id']] = activity
+                self._discard_suggestions(row['customer_id'])
+            if self.activity_watermark is None or row['updated_at'] > self.activity_watermark:
+                self.activity_watermark = row['updated_at']
+
+    def _activity_key(self, customer_id):
+        """活跃度排序键（最近下单日期、订单数倒序，同值时ID小的在前）"""
+        return tuple(-value for value in self.activity.get(customer_id, (0, 0))) + (customer_id,)
+
+    def _rank(self, customer_ids, limit):
+        """按活跃度取前limit个（不含已删除的客户）"""
+        return heapq.nsmallest(
+            limit,
+            (customer_id for customer_id in customer_ids if customer_id not in self.deleted),
+            key=self._activity_key
+        )
+
+    def search(self, keyword, active_only=False):
+        """
+        搜索客户（调用方持有lock）
+
+        参数：
+            active_only: 排除已删除的客户
+
+        返回：
+            list: 客户ID（升序）
+        """
+        ids = self.index.search(keyword) or []
+        if active_only:
+            ids = [customer_id for customer_id in ids if customer_id not in self.deleted]
+        return ids
+
+    def search_names(self, keyword, limit):
+        """
+        按客户名称搜索（调用方持有lock）
+
+        返回：
+            tuple: (按活跃度排序的前limit个客户ID, 是否还有更多匹配的客户)
+        """
+        ids = self.name_index.search(keyword) or []
+        return heapq.nsmallest(limit, ids, key=self._activity_key), len(ids) > limit
+
+    def suggest(self, keyword, limit):
+        """
+        输入联想（调用方持有lock）
+
+        先取字段（或其拼音）以关键词开头的客户，不足limit个时依次补充字段包含关键词、
+        拼音包含关键词的客户，各部分分别按活跃度排序，不含已删除的客户
+
+        返回：
+            list: 客户ID
+        """
+        prefix = normalize_text(keyword).strip()
+        if not prefix:
+            return []
+
+        if len(prefix) <= config.SUGGEST_CACHED_PREFIX_LENGTH and limit <= config.SUGGEST_MAX_LIMIT:
+            top = self.top_suggestions.get(prefix)
+            if top is None:
+                top = self.top_suggestions[prefix] = self._rank(self.prefix_index.match(prefix), config.SUGGEST_MAX_LIMIT)
+            ids = top[:limit]
+        else:
+            ids = self._rank(self.prefix_index.match(prefix), limit)
+
+        for index in (self.index, self.pinyin_index):
+            if len(ids) >= limit:
+                break
+            seen = set(ids)
+            ids += self._rank(
+                (customer_id for customer_id in index.search(prefix) or [] if customer_id not in seen),
+                limit - len(ids)
+            )
+        return ids
+
+
+class CustomerSearchIndex:
+    """
+    客户搜索索引（按租户，超出SEARCH_INDEX_MAX_TENANTS时淘汰最久未使用的租户）
+    """
+
+    def __init__(self, max_tenants=200):
+        self.max_tenants = max_tenants
+        self._lock = threading.Lock()
+        self._tenants = OrderedDict()
+
+    @staticmethod
+    def _fetch(cursor, tenant_id, since=None):
+        columns = ', '.join(('id', 'status', 'updated_at', CUSTOMER_NAME_FIELD) + CUSTOMER_SEARCH_FIELDS)
+        if since is None:
+            cursor.execute(f"""
+                SELECT {columns}
+                FROM customers
+                WHERE company_id = %s
+            """, (tenant_id,))
+        else:
+            cursor.execute(f"""
+                SELECT {columns}
+                FROM customers
+                WHERE company_id = %s AND updated_at >= %s
+            """, (tenant_id, since))
+        return cursor.fetchall()
+
+    @staticmethod
+    def _fetch_activity(cursor, tenant_id, since=None):
+        if since is None:
+            cursor.execute("""
+                SELECT customer_id, order_count, last_order_date, updated_at
+                FROM customer_order_stats
+                WHERE company_id = %s
+            """, (tenant_id,))
+        else:
+            cursor.execute("""
+                SELECT customer_id, order_count, last_order_date, updated_at
+                FROM customer_order_stats
+                WHERE company_id = %s AND updated_at >= %s
+            """, (tenant_id, since))
+        return cursor.fetchall()
+
+    @staticmethod
+    def _sync_removed(cursor, tenant_id, entry):
+        """移除已物理删除的客户（客户数与索引一致时只有一次COUNT查询，调用方持有entry.lock）"""
+        cursor.execute("""
+            SELECT COUNT(*) as total
+            FROM customers
+            WHERE company_id = %s
+        """, (tenant_id,))
+        if cursor.fetchone()['total'] >= len(entry.index):
+            return
+        cursor.execute("""
+            SELECT id
+            FROM customers
+            WHERE company_id = %s
+        """, (tenant_id,))
+        existing = {row['id'] for row in cursor.fetchall()}
+        entry.remove_customers([customer_id for customer_id in list(entry.index.texts) if customer_id not in existing])
+
+    @staticmethod
+    def _since(watermark):
+        # 回看一段时间：事务提交晚于updated_at时，行可能在水位线之后才可见
+        if watermark is None:
+            return None
+        return watermark - timedelta(seconds=config.SEARCH_INDEX_REFRESH_OVERLAP_SECONDS)
+
+    def get(self, cursor, tenant_id):
+        """
+        获取租户的客户索引（按需构建/增量同步）
+
+        customers版本变化时同步客户，orders版本变化时同步客户活跃度
+
+        参数：
+            cursor: DictCursor游标
+            tenant_id: 租户ID
+        """
+        versions = get_data_versions(cursor, tenant_id)
+
+        with self._lock:
+            entry = self._tenants.get(tenant_id)
+            if entry is not None:
+                self._tenants.move_to_end(tenant_id)
+
+        if entry is not None and time.monotonic() - entry.loaded_at < config.SEARCH_INDEX_FULL_RELOAD_SECONDS:
+            if entry.versions == versions:
+                return entry
+            with entry.lock:
+                if entry.versions['customers'] != versions['customers']:
+                    entry.apply_rows(self._fetch(cursor, tenant_id, self._since(entry.watermark)))
+                    self._sync_removed(cursor, tenant_id, entry)
+                if entry.versions['orders'] != versions['orders']:
+                    entry.apply_activity(self._fetch_activity(cursor, tenant_id, self._since(entry.activity_watermark)))
+                entry.versions = versions
+            return entry
+
+        entry = TenantCustomerIndex(self._fetch(cursor, tenant_id), self._fetch_activity(cursor, tenant_id), versions)
+        with self._lock:
+            self._tenants[tenant_id] = entry
+            self._tenants.move_to_end(tenant_id)
+            while len(self._tenants) > self.max_tenants:
+                self._tenants.popitem(last=False)
+        return entry
+
+    def search(self, cursor, tenant_id, keyword, active_only=False):
+        """
+        搜索租户的客户
+
+        返回：
+            list: 客户ID（升序）
+        """
+        entry = self.get(cursor, tenant_id)
+        with entry.lock:
+            return entry.search(keyword, active_only=active_only)
+
+    def suggest(self, cursor, tenant_id, keyword, limit):
+        """
+        客户输入联想（前缀匹配优先，按最近下单活跃度排序）
+
+        返回：
+            list: 客户ID
+        """
+        entry = self.get(cursor, tenant_id)
+        with entry.lock:
+            return entry.suggest(keyword, limit)
+
+    def search_names(self, cursor, tenant_id, keyword, limit):
+        """
+        按客户名称搜索租户的客户（订单搜索使用），匹配过多时取最近下单最活跃的limit个
+
+        返回：
+            tuple: (客户ID列表（按活跃度排序）, 是否还有更多匹配的客户)
+        """
+        entry = self.get(cursor, tenant_id)
+        with entry.lock:
+            return entry.search_names(keyword, limit)
+
+    def discard(self, tenant_id, customer_ids):
+        """
+        从租户的索引中移除客户（调用方按主键读取时发现已删除、索引尚未同步的客户）
+
+        客户之后恢复时updated_at会变化，下次增量同步重新加入
+        """
+        with self._lock:
+            entry = self._tenants.get(tenant_id)
+        if entry is not None:
+            with entry.lock:
+                entry.remove_customers(customer_ids)
+
+
+# 全局客户搜索索引（每个worker进程一份）
+customer_index = CustomerSearchIndex(max_tenants=config.SEARCH_INDEX_MAX_TENANTS)
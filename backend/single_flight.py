@@ -0,0 +1,124 @@
+# -*- coding: utf-8 -*-
+"""
+移动端相同请求合并（single-flight）
+同一worker内，路由、租户和规范化后的Query参数都相同的并发GET请求只执行一次视图函数，
+其余请求等待第一个请求完成后复用它的响应内容
+
+适用于租户级、与具体用户无关的只读统计接口（分享首页链接后同一租户的大量手机同时打开）。
+合并情况记录在指标中：
+- singleflight_leaders_total: 实际执行的请求数
+- singleflight_coalesced_total: 复用其它请求结果的请求数
+"""
+
+import threading
+from functools import wraps
+
+from flask import Response, make_response, request
+
+from config import config
+from metrics import registry
+
+# 不参与合并键的Query参数（认证信息、前端防缓存时间戳）
+IGNORED_PARAMS = {'token', '_'}
+
+
+class _Call:
+    """进行中的一次执行"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    按键合并并发调用
+
+    示例：
+        result, shared = group.do(key, compute)
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def do(self, key, func, timeout=None):
+        """
+        执行func；同一键已有调用在执行时等待其结果
+
+        参数：
+            key: 合并键
+            func: 无参函数
+            timeout: 等待超时（秒），超时后自行执行
+
+        返回：
+            tuple: (结果, 是否复用了其它调用的结果)
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+
+        if not leader:
+            if call.done.wait(timeout):
+                if call.error is not None:
+                    raise call.error
+                return call.result, True
+            return func(), False
+
+        try:
+            call.result = func()
+            return call.result, False
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.done.set()
+
+
+# 全局合并组（每个worker进程一份）
+flight_group = SingleFlight()
+
+
+def request_key(tenant_id):
+    """合并键：路由 + 租户 + 排序后的Query参数"""
+    params = tuple(sorted(
+        (key, value) for key, value in request.args.items(multi=True)
+        if key not in IGNORED_PARAMS
+    ))
+    return request.path, tenant_id, params
+
+
+def coalesce_requests(f):
+    """
+    相同请求合并装饰器（放在require_mobile_auth之后，依赖注入的current_tenant_id）
+
+    第一个请求的响应在视图返回时固化为(响应体, 状态码, 响应头)，
+    其余请求各自生成新的Response，after_request钩子（压缩、指标等）按请求分别执行
+    """
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        if not config.SINGLE_FLIGHT_ENABLED or request.method != 'GET':
+            return f(*args, **kwargs)
+
+        route = request.url_rule.rule if request.url_rule else request.path
+
+        def compute():
+            response = make_response(f(*args, **kwargs))
+            return response, (response.get_data(), response.status_code, list(response.headers.items()))
+
+        (response, (body, status, headers)), shared = flight_group.do(
+            request_key(kwargs.get('current_tenant_id')), compute, timeout=config.SINGLE_FLIGHT_TIMEOUT
+        )
+        if not shared:
+            registry.inc('singleflight_leaders_total', route=route)
+            return response
+
+        registry.inc('singleflight_coalesced_total', route=route)
+        return Response(body, status=status, headers=headers)
+
+    return decorated_function
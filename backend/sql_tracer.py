@@ -0,0 +1,318 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+SQL执行追踪与慢查询日志
+通过连接池的SQL监听记录每条语句的耗时，按路由和租户打标签：
+- 每个请求保留一份SQL时间线（g.sql_timeline）
+- 超过SLOW_QUERY_THRESHOLD_MS的语句写入本地慢查询日志（JSON Lines），参数脱敏，可选附带EXPLAIN
+
+用法：
+    python sql_tracer.py top                           # 按语句聚合，耗时最多的前20条
+    python sql_tracer.py top --hours 1 --route /api/mobile/orders
+    python sql_tracer.py tail --limit 50 --tenant 1    # 最近的慢查询明细
+"""
+
+import argparse
+import json
+import os
+import re
+import threading
+import uuid
+from datetime import datetime, timedelta
+
+import pymysql
+from flask import g, has_request_context, request
+
+from config import config
+from db_pool import add_execute_listener
+
+_log_lock = threading.Lock()
+_local = threading.local()
+
+_WHITESPACE_RE = re.compile(r'\s+')
+_STRING_LITERAL_RE = re.compile(r"'(?:[^'\\]|\\.|'')*'")
+_PLACEHOLDER_LIST_RE = re.compile(r'\(\s*%s(?:\s*,\s*%s)+\s*\)')
+
+
+# ============================================================
+# 语句规范化与参数脱敏
+# ============================================================
+
+def normalize_sql(statement):
+    """压缩空白，便于日志阅读"""
+    return _WHITESPACE_RE.sub(' ', statement or '').strip()
+
+
+def fingerprint_sql(statement):
+    """
+    语句指纹：字符串常量替换为?，IN (%s, %s, ...)折叠为IN (...)，
+    同一条语句不同参数、不同IN长度归为一类
+    """
+    sql = _STRING_LITERAL_RE.sub('?', normalize_sql(statement))
+    return _PLACEHOLDER_LIST_RE.sub('(...)', sql)
+
+
+def redact_params(params):
+    """参数脱敏：只保留类型和长度，不记录具体值"""
+    if params is None:
+        return None
+    if isinstance(params, dict):
+        return {key: redact_params(value) for key, value in params.items()}
+    if isinstance(params, (list, tuple)):
+        if params and isinstance(params[0], (list, tuple, dict)):
+            # executemany：只记录批量条数
+            return f'<{len(params)} rows>'
+        return [_redact_value(value) for value in params]
+    return _redact_value(params)
+
+
+def _redact_value(value):
+    if value is None:
+        return None
+    if isinstance(value, (str, bytes)):
+        return f'<{type(value).__name__}:{len(value)}>'
+    return f'<{type(value).__name__}>'
+
+
+# ============================================================
+# 追踪
+# ============================================================
+
+def _request_tags():
+    """当前请求的路由和租户（非请求上下文中执行时为空）"""
+    if not has_request_context():
+        return {'route': None, 'method': None, 'tenant_id': None, 'request_id': None}
+
+    if 'sql_request_id' not in g:
+        g.sql_request_id = uuid.uuid4().hex[:16]
+    return {
+        'route': request.url_rule.rule if request.url_rule else request.path,
+        'method': request.method,
+        'tenant_id': g.get('current_tenant_id'),
+        'request_id': g.sql_request_id
+    }
+
+
+def _explain(cursor, statement, params):
+    """
+    在同一连接上执行EXPLAIN（只针对SELECT，失败时返回错误信息）
+
+    流式游标（SSCursor/SSDictCursor）的结果在读完之前占用连接，
+    此时在同一连接上执行EXPLAIN会打乱协议（Commands out of sync），因此跳过
+    """
+    if not statement.lstrip().upper().startswith('SELECT'):
+        return None
+    if isinstance(cursor, pymysql.cursors.SSCursor):
+        return {'skipped': 'unbuffered cursor'}
+    explain_cursor = cursor.connection.cursor()
+    try:
+        explain_cursor.execute(f"EXPLAIN {statement}", params)
+        return [dict(row) if isinstance(row, dict) else list(row) for row in explain_cursor.fetchall()]
+    except Exception as e:
+        return {'error': str(e)}
+    finally:
+        explain_cursor.close()
+
+
+def _write_slow_log(record):
+    """追加一行到慢查询日志，超过SLOW_QUERY_LOG_MAX_BYTES时轮转为.1"""
+    path = config.SLOW_QUERY_LOG
+    line = (json.dumps(record, ensure_ascii=False, default=str) + '\n').encode('utf-8')
+    with _log_lock:
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            if os.path.exists(path) and os.path.getsize(path) > config.SLOW_QUERY_LOG_MAX_BYTES:
+                os.replace(path, path + '.1')
+            # O_APPEND + 单次write，多个worker同时写入不会交错
+            fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+            try:
+                os.write(fd, line)
+            finally:
+                os.close(fd)
+        except OSError as e:
+            print(f"[SQL Tracer] 慢查询日志写入失败: {e}")
+
+
+def _on_sql_executed(kind, statement, params, seconds, cursor):
+    """SQL监听：记录时间线，超过阈值的语句写入慢查询日志"""
+    # EXPLAIN自身执行时不再追踪
+    if getattr(_local, 'explaining', False):
+        return
+
+    elapsed_ms = round(seconds * 1000, 2)
+
+    if has_request_context():
+        timeline = g.setdefault('sql_timeline', [])
+        if kind == 'fetch':
+            # 取结果的耗时计入上一条语句
+            if timeline:
+                timeline[-1]['fetch_ms'] = round(timeline[-1]['fetch_ms'] + elapsed_ms, 2)
+            return
+        if len(timeline) < config.SQL_TIMELINE_MAX_ENTRIES:
+            timeline.append({
+                'seq': len(timeline) + 1,
+                'kind': kind,
+                'sql': normalize_sql(statement)[:500],
+                'ms': elapsed_ms,
+                'fetch_ms': 0.0,
+                'rows': cursor.rowcount
+            })
+    elif kind == 'fetch':
+        return
+
+    if elapsed_ms < config.SLOW_QUERY_THRESHOLD_MS:
+        return
+
+    record = {
+        'time': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        'kind': kind,
+        'ms': elapsed_ms,
+        'rows': cursor.rowcount,
+        'sql': normalize_sql(statement),
+        'fingerprint': fingerprint_sql(statement),
+        'params': redact_params(params),
+        **_request_tags()
+    }
+    if has_request_context():
+        record['seq'] = len(g.get('sql_timeline', []))
+
+    if config.SLOW_QUERY_EXPLAIN and kind == 'execute':
+        _local.explaining = True
+        try:
+            record['explain'] = _explain(cursor, statement, params)
+        finally:
+            _local.explaining = False
+
+    _write_slow_log(record)
+
+
+def get_sql_timeline():
+    """当前请求已执行的SQL时间线"""
+    return list(g.get('sql_timeline', [])) if has_request_context() else []
+
+
+def _attach_timeline(response):
+    """在响应头中附带SQL条数和总耗时（DEBUG模式下附带完整时间线）"""
+    timeline = g.get('sql_timeline')
+    if not timeline:
+        return response
+    total_ms = sum(item['ms'] + item['fetch_ms'] for item in timeline)
+    response.headers['X-SQL-Count'] = str(len(timeline))
+    response.headers['X-SQL-Time-Ms'] = f'{total_ms:.1f}'
+    if config.DEBUG:
+        response.headers['X-SQL-Timeline'] = json.dumps(
+            [[item['seq'], item['ms'], item['sql'][:80]] for item in timeline], ensure_ascii=True
+        )
+    return response
+
+
+def init_sql_tracer(app):
+    """注册SQL追踪"""
+    add_execute_listener(_on_sql_executed)
+    app.after_request(_attach_timeline)
+
+
+# ============================================================
+# 慢查询日志查询
+# ============================================================
+
+def read_slow_queries(hours=None, route=None, tenant_id=None, fingerprint=None):
+    """
+    读取慢查询日志（含轮转的.1文件）
+
+    参数：
+        hours: 只返回最近N小时
+        route: 按路由过滤
+        tenant_id: 按租户过滤
+        fingerprint: 按语句指纹过滤
+
+    返回：
+        list: 慢查询记录（按时间升序）
+    """
+    since = None
+    if hours:
+        since = (datetime.now() - timedelta(hours=hours)).strftime('%Y-%m-%d %H:%M:%S')
+
+    records = []
+    for path in (config.SLOW_QUERY_LOG + '.1', config.SLOW_QUERY_LOG):
+        try:
+            f = open(path, encoding='utf-8')
+        except OSError:
+            continue
+        with f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                if since and record.get('time', '') < since:
+                    continue
+                if route and record.get('route') != route:
+                    continue
+                if tenant_id is not None and record.get('tenant_id') != tenant_id:
+                    continue
+                if fingerprint and record.get('fingerprint') != fingerprint:
+                    continue
+                records.append(record)
+    return records
+
+
+def summarize_slow_queries(records, limit=20):
+    """按语句指纹聚合：次数、总耗时、最大耗时、涉及路由"""
+    groups = {}
+    for record in records:
+        item = groups.get(record['fingerprint'])
+        if item is None:
+            item = groups[record['fingerprint']] = {
+                'fingerprint': record['fingerprint'],
+                'count': 0,
+                'total_ms': 0.0,
+                'max_ms': 0.0,
+                'routes': set(),
+                'last_time': None
+            }
+        item['count'] += 1
+        item['total_ms'] += record['ms']
+        item['max_ms'] = max(item['max_ms'], record['ms'])
+        if record.get('route'):
+            item['routes'].add(record['route'])
+        item['last_time'] = record.get('time')
+
+    result = sorted(groups.values(), key=lambda item: item['total_ms'], reverse=True)[:limit]
+    for item in result:
+        item['total_ms'] = round(item['total_ms'], 2)
+        item['avg_ms'] = round(item['total_ms'] / item['count'], 2)
+        item['routes'] = sorted(item['routes'])
+    return result
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description='慢查询日志查询')
+    parser.add_argument('command', choices=['top', 'tail'])
+    parser.add_argument('--hours', type=float, help='只统计最近N小时')
+    parser.add_argument('--route', help='按路由过滤，如 /api/mobile/orders')
+    parser.add_argument('--tenant', type=int, help='按租户ID过滤')
+    parser.add_argument('--limit', type=int, default=20)
+    args = parser.parse_args()
+
+    records = read_slow_queries(hours=args.hours, route=args.route, tenant_id=args.tenant)
+    print(f"\n慢查询日志: {config.SLOW_QUERY_LOG}（阈值 {config.SLOW_QUERY_THRESHOLD_MS}ms，共 {len(records)} 条）\n")
+
+    if args.command == 'top':
+        print(f"{'次数':<8} {'总耗时ms':<12} {'平均ms':<10} {'最大ms':<10} 语句")
+        print("-" * 80)
+        for item in summarize_slow_queries(records, args.limit):
+            print(f"{item['count']:<8} {item['total_ms']:<12} {item['avg_ms']:<10} {item['max_ms']:<10} {item['fingerprint'][:120]}")
+            print(f"{'':<42}路由: {', '.join(item['routes']) or '-'}")
+    else:
+        for record in records[-args.limit:]:
+            print(f"[{record['time']}] {record['ms']}ms {record.get('method') or ''} {record.get('route') or '-'} "
+                  f"tenant={record.get('tenant_id')} rows={record.get('rows')}")
+            print(f"    {record['sql'][:200]}")
+            if record.get('params'):
+                print(f"    params: {record['params']}")
+
+
+if __name__ == "__main__":
+    main()
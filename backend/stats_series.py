@@ -0,0 +1,116 @@
+# -*- coding: utf-8 -*-
+"""
+统计时间序列工具
+趋势/统计接口的参数解析、按日/周/月切分日期范围，以及输出格式化；
+各区间的合计由range_stats的前缀和计算，没有订单的日期自然为0，不会出现缺口
+
+金额在内部以分为单位的整数累加，不会产生浮点误差，输出时再换算为元。
+"""
+
+from datetime import date, datetime, timedelta
+
+# 趋势指标 -> daily_order_summary字段
+METRIC_COLUMNS = {
+    'order_count': 'order_count',
+    'order_amount': 'total_amount',
+    'pending_count': 'pending_count',
+    'confirmed_count': 'confirmed_count',
+    'shipped_count': 'shipped_count',
+    'completed_count': 'completed_count',
+    'cancelled_count': 'cancelled_count'
+}
+
+# 以分存储的金额类指标
+AMOUNT_METRICS = {'order_amount'}
+
+GRANULARITIES = ('day', 'week', 'month')
+
+
+def parse_date(value, name):
+    """解析YYYY-MM-DD日期参数"""
+    try:
+        return datetime.strptime(value.strip(), '%Y-%m-%d').date()
+    except (AttributeError, ValueError):
+        raise ValueError(f'{name}格式错误，应为YYYY-MM-DD')
+
+
+def parse_metrics(value, default=('order_count', 'order_amount')):
+    """解析逗号分隔的指标列表（去重并保持顺序）"""
+    if not value:
+        return list(default)
+    metrics = []
+    for name in value.split(','):
+        name = name.strip()
+        if not name:
+            continue
+        if name not in METRIC_COLUMNS:
+            raise ValueError(f'不支持的统计指标: {name}')
+        if name not in metrics:
+            metrics.append(name)
+    return metrics or list(default)
+
+
+def to_cents(value):
+    """金额（Decimal/float/None）转为分"""
+    return int(round((value or 0) * 100))
+
+
+def bucket_ranges(date_from, date_to, granularity):
+    """
+    按粒度切分日期范围
+
+    周从周一开始、月从1日开始，首尾两段按实际范围截断。
+
+    返回：
+        list: [(标签, 开始日期, 结束日期), ...]
+    """
+    buckets = []
+    start = date_from
+    while start <= date_to:
+        if granularity == 'week':
+            end = start + timedelta(days=6 - start.weekday())
+            label = start.strftime('%Y-%m-%d')
+        elif granularity == 'month':
+            next_month = date(start.year + start.month // 12, start.month % 12 + 1, 1)
+            end = next_month - timedelta(days=1)
+            label = start.strftime('%Y-%m')
+        else:
+            end = start
+            label = start.strftime('%Y-%m-%d')
+        end = min(end, date_to)
+        buckets.append((label, start, end))
+        start = end + timedelta(days=1)
+    return buckets
+
+
+def format_metric(metric, value):
+    """输出值：金额换算为元，其余为整数"""
+    return value / 100.0 if metric in AMOUNT_METRICS else value
+
+
+def format_totals(totals):
+    """区间合计输出：金额换算为元"""
+    return {metric: format_metric(metric, value) for metric, value in totals.items()}
+
+
+def aggregate_series(buckets, bucket_totals):
+    """
+    组装趋势数据
+
+    参数：
+        buckets: bucket_ranges的返回值
+        bucket_totals: 与buckets对应的 {指标: 合计值}
+
+    返回：
+        list: [{'date': 标签, 'date_from': ..., 'date_to': ..., 指标: 值, ...}, ...]
+    """
+    result = []
+    for (label, start, end), totals in zip(buckets, bucket_totals):
+        item = {
+            'date': label,
+            'date_from': start.strftime('%Y-%m-%d'),
+            'date_to': end.strftime('%Y-%m-%d')
+        }
+        item.update(format_totals(totals))
+        result.append(item)
+    return result
@@ -0,0 +1,200 @@
+# -*- coding: utf-8 -*-
+"""
+统计缓存预热
+每个worker进程内的后台线程，在早高峰等固定时段之前、以及订单数据变化后，
+为近期活跃的租户预先计算概览、排行榜并加载区间统计前缀和，写入本进程的统计缓存
+
+- 缓存在各worker进程内，因此每个worker各自预热；各worker独立地在抖动时间内随机选取预热时刻，
+  N个worker的预热查询分散在整个抖动窗口内，而不是同时到达数据库
+
+- 活跃租户：login_logs中最近STATS_WARMER_ACTIVE_DAYS天登录过的公司
+- 高峰预热：STATS_WARMER_PEAK_TIMES中每个时间点提前STATS_WARMER_LEAD_MINUTES分钟开始，
+  每个租户在STATS_WARMER_JITTER_SECONDS内随机错开，避免同一时刻集中访问数据库
+- 数据变化：轮询tenant_data_versions（orders触发器维护），活跃租户的订单版本变化后重新预热
+"""
+
+import heapq
+import os
+import random
+import threading
+import time
+from datetime import datetime, timedelta
+
+from config import config
+
+# 统计计算函数
+from mobile_statistics_api import get_overview, get_ranking, invalidate_stats, parse_ranking_range
+from range_stats import range_stats
+from search_index import customer_index
+
+from db_pool import get_db_connection
+
+
+class StatsWarmer:
+    """统计缓存预热线程"""
+
+    def __init__(self):
+        self._stop = threading.Event()
+        self._thread = None
+        self._queue = []          # [(到期时间, 租户ID)]
+        self._queued = set()
+        self._active_tenants = set()
+        self._versions = {}
+        self._last_tick = None
+        self._last_warmed = {}
+
+    # ---------- 数据库查询 ----------
+
+    def load_active_tenants(self):
+        """近期登录过的公司（按最近登录时间倒序）"""
+        conn = get_db_connection()
+        cursor = conn.cursor()
+        try:
+            cursor.execute("""
+                SELECT company_id, MAX(login_time) as last_login
+                FROM login_logs
+                WHERE login_time >= DATE_SUB(NOW(), INTERVAL %s DAY)
+                  AND company_id IS NOT NULL
+                GROUP BY company_id
+                ORDER BY last_login DESC
+                LIMIT %s
+            """, (config.STATS_WARMER_ACTIVE_DAYS, config.STATS_WARMER_MAX_TENANTS))
+            return [row['company_id'] for row in cursor.fetchall()]
+        finally:
+            cursor.close()
+            conn.close()
+
+    def load_order_versions(self):
+        """各公司的订单数据版本号"""
+        conn = get_db_connection()
+        cursor = conn.cursor()
+        try:
+            cursor.execute("""
+                SELECT company_id, SUM(version) as version
+                FROM tenant_data_versions
+                WHERE scope = 'orders'
+                GROUP BY company_id
+            """)
+            return {row['company_id']: int(row['version']) for row in cursor.fetchall()}
+        finally:
+            cursor.close()
+            conn.close()
+
+    # ---------- 调度 ----------
+
+    def schedule(self, tenant_id, jitter_seconds):
+        """在jitter_seconds内的随机时刻预热租户（已排队的不重复排队）"""
+        if tenant_id in self._queued:
+            return
+        self._queued.add(tenant_id)
+        heapq.heappush(self._queue, (time.monotonic() + random.uniform(0, jitter_seconds), tenant_id))
+
+    def _peak_due(self, previous, now):
+        """(previous, now]之间是否经过了某个高峰预热时间点"""
+        for peak in config.STATS_WARMER_PEAK_TIMES:
+            hour, minute = (int(part) for part in peak.split(':'))
+            warm_at = datetime.combine(now.date(), datetime.min.time()).replace(hour=hour, minute=minute)
+            warm_at -= timedelta(minutes=config.STATS_WARMER_LEAD_MINUTES)
+            if previous < warm_at <= now:
+                return True
+        return False
+
+    def tick(self):
+        """一次轮询：高峰预热、数据变化检测、执行到期的预热任务"""
+        now = datetime.now()
+        first_tick = self._last_tick is None
+        # worker启动时、高峰前、跨天时刷新活跃租户并预热
+        if first_tick or self._peak_due(self._last_tick, now) or now.date() != self._last_tick.date():
+            self._active_tenants = set(self.load_active_tenants())
+            for tenant_id in self._active_tenants:
+                self.schedule(tenant_id, config.STATS_WARMER_JITTER_SECONDS)
+        self._last_tick = now
+
+        versions = self.load_order_versions()
+        for tenant_id, version in versions.items():
+            previous = self._versions.get(tenant_id)
+            if previous is not None and previous != version:
+                # 订单变化：旧结果失效，活跃租户在短时间内随机错开重新预热
+                invalidate_stats(tenant_id)
+                if tenant_id in self._active_tenants:
+                    self.schedule(tenant_id, config.STATS_WARMER_EVENT_JITTER_SECONDS)
+        self._versions = versions
+
+        while self._queue and self._queue[0][0] <= time.monotonic() and not self._stop.is_set():
+            _, tenant_id = heapq.heappop(self._queue)
+            self._queued.discard(tenant_id)
+            last = self._last_warmed.get(tenant_id)
+            if last is not None and time.monotonic() - last < config.STATS_WARMER_MIN_INTERVAL_SECONDS:
+                # 频繁写入的租户限制预热频率
+                self.schedule(tenant_id, config.STATS_WARMER_MIN_INTERVAL_SECONDS)
+                continue
+            self.warm_tenant(tenant_id)
+
+    def warm_tenant(self, tenant_id):
+        """预热单个租户：区间统计前缀和、客户搜索索引、概览、首页默认排行榜"""
+        started = time.perf_counter()
+        try:
+            conn = get_db_connection()
+            cursor = conn.cursor()
+            try:
+                range_stats.get(cursor, tenant_id)
+                customer_index.get(cursor, tenant_id)
+            finally:
+                cursor.close()
+                conn.close()
+
+            get_overview(tenant_id, refresh=True)
+            date_from, date_to = parse_ranking_range({'period': 'month'})
+            for ranking_type in ('customer', 'service'):
+                get_ranking(tenant_id, ranking_type, date_from, date_to, 10, refresh=True)
+
+            self._last_warmed[tenant_id] = time.monotonic()
+            print(f"[Stats Warmer] 租户{tenant_id}预热完成，耗时{(time.perf_counter() - started) * 1000:.0f}ms")
+        except Exception as e:
+            print(f"[Stats Warmer] 租户{tenant_id}预热失败: {e}")
+
+    # ---------- 线程 ----------
+
+    def run(self):
+        while not self._stop.is_set():
+            try:
+                self.tick()
+            except Exception as e:
+                print(f"[Stats Warmer] 轮询失败: {e}")
+            self._stop.wait(config.STATS_WARMER_POLL_SECONDS)
+
+    def start(self):
+        self._thread = threading.Thread(target=self.run, name='stats-warmer', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+
+_warmer = None
+_warmer_pid = None
+_warmer_lock = threading.Lock()
+
+
+def ensure_stats_warmer():
+    """在当前进程启动预热线程（fork后的worker各自启动一次）"""
+    global _warmer, _warmer_pid
+    if not config.STATS_WARMER_ENABLED or _warmer_pid == os.getpid():
+        return
+    with _warmer_lock:
+        if _warmer_pid != os.getpid():
+            _warmer = StatsWarmer()
+            _warmer.start()
+            _warmer_pid = os.getpid()
+
+
+def init_stats_warmer(app):
+    """
+    注册预热线程
+
+    在第一个请求时启动，而不是导入时：gunicorn preload模式下导入发生在master进程，
+    线程不会被fork到worker中
+    """
+    app.before_request(ensure_stats_warmer)
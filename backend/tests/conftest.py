@@ -0,0 +1,140 @@
+# -*- coding: utf-8 -*-
+"""
+pytest公共配置
+不连接数据库：接口测试用FakeConnection替换模块中的get_db_connection，
+由测试提供的handler(sql, params)按SQL返回结果行
+"""
+
+import os
+import sys
+from datetime import datetime
+
+os.environ.setdefault('STATS_WARMER_ENABLED', '0')
+os.environ.setdefault('METRICS_DIR', os.path.join('/tmp', f'mobile-erp-test-metrics-{os.getpid()}'))
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+
+ORDER_CREATED_AT = datetime(2026, 1, 15, 9, 30)
+
+
+class FakeCursor:
+    """记录执行的SQL，结果行由handler返回"""
+
+    def __init__(self, handler):
+        self.handler = handler
+        self.executed = []
+        self.rows = []
+        self.rowcount = 0
+
+    def execute(self, sql, params=None):
+        self.executed.append((sql, params))
+        self.rows = list(self.handler(sql, params) or [])
+        self.rowcount = len(self.rows)
+
+    def fetchall(self):
+        return self.rows
+
+    def fetchone(self):
+        return self.rows[0] if self.rows else None
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class FakeConnection:
+    def __init__(self, handler):
+        self.handler = handler
+        self.cursors = []
+
+    def cursor(self, cursor_class=None):
+        cursor = FakeCursor(self.handler)
+        self.cursors.append(cursor)
+        return cursor
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def app():
+    import app as app_module
+    app_module.app.config['TESTING'] = True
+    return app_module.app
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def auth_headers():
+    from mobile_auth import create_mobile_token
+    return {'Authorization': 'Bearer ' + create_mobile_token(1, 7, 'tester')}
+
+
+@pytest.fixture
+def fake_db(monkeypatch):
+    """
+    替换模块的数据库连接
+
+    用法：fake_db(handler, mobile_order_api, ...)，返回创建的FakeConnection列表
+    """
+    def install(handler, *modules):
+        connections = []
+
+        def get_db_connection():
+            connection = FakeConnection(handler)
+            connections.append(connection)
+            return connection
+
+        for module in modules:
+            monkeypatch.setattr(module, 'get_db_connection', get_db_connection)
+        return connections
+
+    return install
+
+
+@pytest.fixture
+def order_row():
+    """
+    订单行（订单详情、订单搜索查询的字段）
+
+    用法：order_row(订单ID)，订单均创建于ORDER_CREATED_AT
+    """
+    import mobile_order_api
+
+    def build(order_id):
+        return {
+            'id': order_id,
+            'order_no': mobile_order_api.generate_order_no(order_id, ORDER_CREATED_AT),
+            # 与order_rollups.LEGACY_ORDER_NO_EXPRESSION一致：ID达到1000时截断为前3位
+            'legacy_order_no': f"DD{ORDER_CREATED_AT:%Y%m%d}{str(order_id)[:3]}" if order_id >= 1000 else None,
+            'order_date': ORDER_CREATED_AT.date(),
+            'created_at': ORDER_CREATED_AT,
+            'updated_at': ORDER_CREATED_AT,
+            'total_amount': 100,
+            'status': 'pending',
+            'remark': None,
+            'customer_id': 3,
+            'customer_name': '测试客户',
+            'contact_person': None,
+            'customer_phone': None,
+            'customer_address': None
+        }
+
+    return build
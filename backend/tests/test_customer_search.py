@@ -0,0 +1,105 @@
+# -*- coding: utf-8 -*-
+"""
+客户快速搜索：索引尚未同步的已删除客户不减少返回数量，物理删除的客户在版本变化时移除；
+订单搜索按名称匹配的客户过多时取最近下单最活跃的客户
+"""
+
+import re
+from datetime import date, datetime
+
+import pytest
+
+import mobile_customer_api
+from search_index import CustomerSearchIndex, TenantCustomerIndex, customer_index
+
+TENANT_ID = 7
+UPDATED_AT = datetime(2026, 1, 1)
+
+
+def customer(customer_id, shop_name, status='正常'):
+    return {
+        'id': customer_id,
+        'status': status,
+        'updated_at': UPDATED_AT,
+        'name': shop_name,
+        'shop_name': shop_name,
+        'douyin_name': None,
+        'company_name': None,
+        'legal_person': None
+    }
+
+
+class CustomerTable:
+    """内存中的customers表和数据版本号"""
+
+    def __init__(self, rows):
+        self.rows = {row['id']: row for row in rows}
+        self.versions = [{'scope': 'customers', 'version': 1}, {'scope': 'orders', 'version': 1}]
+
+    def handler(self, sql, params):
+        if 'FROM tenant_data_versions' in sql:
+            return self.versions
+        if 'FROM customer_order_stats' in sql:
+            return []
+        if 'COUNT(*)' in sql:
+            return [{'total': len(self.rows)}]
+        if re.search(r'SELECT\s+id\s+FROM customers', sql):
+            return [{'id': customer_id} for customer_id in self.rows]
+        if 'IN (' in sql:
+            ids = params[1:]
+            return [self.rows[i] for i in ids if i in self.rows and self.rows[i]['status'] != '已删除']
+        if 'FROM customers' in sql:
+            return list(self.rows.values())
+        return []
+
+    def bump_customers(self):
+        self.versions[0] = {'scope': 'customers', 'version': self.versions[0]['version'] + 1}
+
+
+@pytest.fixture(autouse=True)
+def clear_index():
+    customer_index._tenants.clear()
+    yield
+    customer_index._tenants.clear()
+
+
+def test_search_fills_limit_when_index_is_stale(client, auth_headers, fake_db):
+    table = CustomerTable([customer(i, f'桃酥{i}') for i in range(1, 6)])
+    fake_db(table.handler, mobile_customer_api)
+
+    response = client.get('/api/mobile/customers/search?keyword=桃酥&limit=3', headers=auth_headers)
+    assert [row['id'] for row in response.get_json()['data']] == [1, 2, 3]
+
+    # 客户被删除，版本号尚未变化（索引未同步）
+    table.rows[2]['status'] = '已删除'
+    del table.rows[3]
+    response = client.get('/api/mobile/customers/search?keyword=桃酥&limit=3', headers=auth_headers)
+    assert [row['id'] for row in response.get_json()['data']] == [1, 4, 5]
+
+
+def test_physical_delete_removed_on_version_change(fake_db):
+    from conftest import FakeConnection
+
+    table = CustomerTable([customer(i, f'桃酥{i}') for i in range(1, 4)])
+    index = CustomerSearchIndex()
+    cursor = FakeConnection(table.handler).cursor()
+
+    assert index.search(cursor, TENANT_ID, '桃酥') == [1, 2, 3]
+
+    del table.rows[2]
+    table.bump_customers()
+    assert index.search(cursor, TENANT_ID, '桃酥') == [1, 3]
+
+
+def test_search_names_keeps_most_active_customers():
+    rows = [customer(customer_id, f'刘记{customer_id}') for customer_id in range(1, 6)]
+    activity = [
+        {'customer_id': 4, 'last_order_date': date(2026, 3, 1), 'order_count': 2, 'updated_at': UPDATED_AT},
+        {'customer_id': 5, 'last_order_date': date(2026, 3, 1), 'order_count': 9, 'updated_at': UPDATED_AT},
+        {'customer_id': 2, 'last_order_date': date(2026, 1, 1), 'order_count': 30, 'updated_at': UPDATED_AT}
+    ]
+    entry = TenantCustomerIndex(rows, activity, versions={})
+
+    assert entry.search_names('刘记', 3) == ([5, 4, 2], True)
+    assert entry.search_names('刘记', 5) == ([5, 4, 2, 1, 3], False)
+    assert entry.search_names('刘记3', 3) == ([3], False)
@@ -0,0 +1,162 @@
+# -*- coding: utf-8 -*-
+"""
+每日指标文件：64字节头部、原位覆盖与末尾追加、全量构建原子替换，
+映射文件得到的区间合计与从数据库加载的前缀和一致
+"""
+
+import os
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+
+import pytest
+
+import metric_store
+from config import config
+from range_stats import METRICS, RangeStatsStore, TenantPrefixSums
+
+TENANT_ID = 7
+TODAY = date.today()
+UPDATED_AT = datetime(2026, 1, 1, 8, 0)
+
+
+def summary_row(day, order_count, amount, updated_at=UPDATED_AT):
+    row = {metric: 0 for metric in METRICS}
+    row.update(order_date=day, order_count=order_count, pending_count=order_count,
+               order_amount=Decimal(amount), updated_at=updated_at)
+    return row
+
+
+class SummaryCursor:
+    """按SQL条件在内存中的daily_order_summary上查询"""
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.result = []
+
+    def execute(self, sql, params):
+        rows = sorted(self.rows, key=lambda row: row['order_date'])
+        if 'MIN(order_date)' in sql:
+            matched = [row for row in rows if row['order_date'] < params[1]]
+            total = {metric: sum(row[metric] for row in matched) for metric in METRICS}
+            total.update(first_date=matched[0]['order_date'] if matched else None,
+                         updated_at=max((row['updated_at'] for row in matched), default=None))
+            self.result = [total]
+        elif 'updated_at >=' in sql:
+            self.result = [row for row in rows if row['updated_at'] >= params[1]]
+        elif 'order_date >=' in sql:
+            self.result = [row for row in rows if row['order_date'] >= params[1]]
+        else:
+            self.result = rows
+
+    def fetchone(self):
+        return self.result[0] if self.result else None
+
+    def fetchall(self):
+        return self.result
+
+
+@pytest.fixture(autouse=True)
+def store_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, 'METRIC_STORE_DIR', str(tmp_path))
+    return tmp_path
+
+
+@pytest.fixture
+def rows():
+    return [
+        summary_row(TODAY - timedelta(days=40), 3, '30.50', UPDATED_AT - timedelta(days=2)),
+        summary_row(TODAY - timedelta(days=38), 1, '12.00', UPDATED_AT - timedelta(days=2)),
+        summary_row(TODAY - timedelta(days=20), 5, '99.99')
+    ]
+
+
+def test_build_writes_header_and_fixed_width_rows(rows):
+    days = metric_store.build_tenant(SummaryCursor(rows), TENANT_ID)
+    assert days == 21
+    assert metric_store.HEADER.size == 64
+
+    with open(metric_store.tenant_path(TENANT_ID), 'rb') as f:
+        data = f.read()
+    magic, version, n_cols, base_ordinal, stored_days, watermark = metric_store.HEADER.unpack_from(data, 0)
+    assert (magic, version, n_cols) == (metric_store.MAGIC, metric_store.FORMAT_VERSION, len(metric_store.COLUMNS))
+    assert date.fromordinal(base_ordinal) == TODAY - timedelta(days=40)
+    assert stored_days == 21
+    assert datetime.fromtimestamp(watermark) == UPDATED_AT
+    assert len(data) == 64 + 21 * metric_store.ROW.size
+
+    mapped = metric_store.open_tenant(TENANT_ID)
+    assert list(mapped.column('order_count')) == [3, 0, 1] + [0] * 17 + [5]
+    assert list(mapped.column('order_amount'))[:3] == [3050, 0, 1200]
+    mapped.close()
+
+
+def test_update_overwrites_rows_in_place_and_appends_days(rows):
+    cursor = SummaryCursor(rows)
+    metric_store.build_tenant(cursor, TENANT_ID)
+    inode = os.stat(metric_store.tenant_path(TENANT_ID)).st_ino
+
+    later = UPDATED_AT + timedelta(days=1)
+    rows[1] = summary_row(TODAY - timedelta(days=38), 4, '48.00', later)
+    rows.append(summary_row(TODAY - timedelta(days=17), 2, '20.00', later))
+    # 从水位线前RANGE_STATS_REFRESH_OVERLAP_SECONDS开始拉取：水位线当时的行重复写入，结果不变
+    assert metric_store.update_tenant(cursor, TENANT_ID) == 3
+
+    # 原位更新：同一个文件，没有重新构建
+    assert os.stat(metric_store.tenant_path(TENANT_ID)).st_ino == inode
+    mapped = metric_store.open_tenant(TENANT_ID)
+    assert mapped.days == 24
+    assert mapped.watermark == later
+    assert list(mapped.column('order_count')) == [3, 0, 4] + [0] * 17 + [5, 0, 0, 2]
+    mapped.close()
+
+    # 之后只拉取新水位线附近的行，更早更新的日期不再读取
+    assert metric_store.update_tenant(cursor, TENANT_ID) == 2
+    assert os.stat(metric_store.tenant_path(TENANT_ID)).st_ino == inode
+
+
+def test_earlier_day_rebuilds_file_atomically(rows, store_dir):
+    cursor = SummaryCursor(rows)
+    metric_store.build_tenant(cursor, TENANT_ID)
+    old = metric_store.open_tenant(TENANT_ID)
+
+    rows.append(summary_row(TODAY - timedelta(days=45), 6, '60.00', UPDATED_AT + timedelta(days=1)))
+    assert metric_store.update_tenant(cursor, TENANT_ID) == 26
+
+    assert metric_store.file_signature(TENANT_ID) != old.signature
+    assert os.listdir(store_dir) == ['tenant_7.bin']
+    rebuilt = metric_store.open_tenant(TENANT_ID)
+    assert rebuilt.base_date == TODAY - timedelta(days=45)
+    assert list(rebuilt.column('order_count'))[:6] == [6, 0, 0, 0, 0, 3]
+    # 替换前打开的映射仍读取旧文件
+    assert old.base_date == TODAY - timedelta(days=40)
+    assert list(old.column('order_count'))[:3] == [3, 0, 1]
+    rebuilt.close()
+    old.close()
+
+
+def test_mapped_totals_match_database_prefix_sums(rows, monkeypatch):
+    cursor = SummaryCursor(rows)
+    metric_store.build_tenant(cursor, TENANT_ID)
+    rows.append(summary_row(TODAY - timedelta(days=10), 2, '0.01', UPDATED_AT + timedelta(days=1)))
+    metric_store.update_tenant(cursor, TENANT_ID)
+
+    # 前缀和的每日值引用映射，映射随前缀和一起保留
+    sums = TenantPrefixSums.from_mapped(metric_store.open_tenant(TENANT_ID))
+    assert sums.signature == metric_store.file_signature(TENANT_ID)
+
+    file_store = RangeStatsStore()
+    database_store = RangeStatsStore()
+    ranges = [
+        (TODAY - timedelta(days=40), TODAY - timedelta(days=10)),
+        (TODAY - timedelta(days=39), TODAY - timedelta(days=20)),
+        (TODAY - timedelta(days=38), TODAY - timedelta(days=38)),
+        (TODAY - timedelta(days=19), TODAY - timedelta(days=11))
+    ]
+    file_totals = file_store.bucket_totals(None, TENANT_ID, ranges, METRICS)
+    monkeypatch.setattr(metric_store, 'file_signature', lambda tenant_id: None)
+    database_totals = database_store.bucket_totals(cursor, TENANT_ID, ranges, METRICS)
+
+    assert file_totals == database_totals
+    for (date_from, date_to), totals in zip(ranges, file_totals):
+        assert totals == {metric: sums.total(metric, date_from, date_to) for metric in METRICS}
+    assert file_totals[0]['order_amount'] == 3050 + 1200 + 9999 + 1
@@ -0,0 +1,49 @@
+# -*- coding: utf-8 -*-
+"""
+请求指标：并行线程累计数据库耗时、多线程写入指标快照
+"""
+
+import json
+import os
+import threading
+
+import metrics
+import request_metrics
+from config import config
+from parallel import run_parallel
+
+
+def test_db_time_accumulates_across_parallel_threads(app):
+    def execute_many():
+        for _ in range(1000):
+            request_metrics._on_sql_executed('execute', 'SELECT 1', None, 0.001, None)
+
+    with app.test_request_context('/'):
+        request_metrics._start_timer()
+        run_parallel({name: execute_many for name in "abcd"})
+
+        assert request_metrics.g.db_queries == 4000
+        assert round(request_metrics.g.db_seconds, 6) == 4.0
+
+
+def test_concurrent_flush_writes_complete_snapshot(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, 'METRICS_DIR', str(tmp_path))
+    errors = []
+
+    def flush_many():
+        try:
+            for _ in range(50):
+                metrics.flush(force=True)
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=flush_many) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    with open(tmp_path / f'metrics_{os.getpid()}.json') as f:
+        assert 'counters' in json.load(f)
+    assert not [name for name in os.listdir(tmp_path) if name.endswith('.tmp')]
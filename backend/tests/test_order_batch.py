@@ -0,0 +1,37 @@
+# -*- coding: utf-8 -*-
+"""
+批量订单详情：重复ID只查询一次，不重复的ID超过上限时不查询数据库
+"""
+
+import mobile_order_api
+from config import config
+
+
+def batch_handler(order_row):
+    def handler(sql, params):
+        if 'FROM order_items' in sql:
+            return []
+        return [order_row(order_id) for order_id in params[:-1] if order_id != 99]
+    return handler
+
+
+def test_batch_dedups_ids_in_request_order(client, auth_headers, fake_db, order_row):
+    connections = fake_db(batch_handler(order_row), mobile_order_api)
+
+    response = client.get('/api/mobile/orders/batch?ids=12,5,12,99,5', headers=auth_headers)
+    data = response.get_json()['data']
+    assert [entry['order']['id'] for entry in data['list']] == [12, 5]
+    assert data['missing_ids'] == [99]
+    assert connections[0].cursors[0].executed[0][1] == [12, 5, 99, 7]
+
+
+def test_batch_rejects_too_many_unique_ids(client, auth_headers, fake_db, order_row, monkeypatch):
+    monkeypatch.setattr(config, 'ORDER_BATCH_MAX_SIZE', 3)
+    connections = fake_db(batch_handler(order_row), mobile_order_api)
+
+    response = client.get('/api/mobile/orders/batch?ids=1,1,2,2,3,3', headers=auth_headers)
+    assert response.get_json()['success'] is True
+
+    response = client.get('/api/mobile/orders/batch?ids=1,2,3,4,' + ','.join(['x'] * 1000), headers=auth_headers)
+    assert response.get_json()['code'] == 'PARAM_ERROR'
+    assert len(connections) == 1
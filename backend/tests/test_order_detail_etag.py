@@ -0,0 +1,42 @@
+# -*- coding: utf-8 -*-
+"""
+订单详情协商缓存：关联服务的单位、分类变化后ETag随之变化
+"""
+
+from datetime import datetime
+
+import mobile_order_api
+
+UPDATED_AT = datetime(2026, 1, 15, 9, 30)
+
+
+def detail_handler(version, order_row):
+    def handler(sql, params):
+        if 'service_checksum' in sql:
+            return [version]
+        if 'FROM order_items' in sql:
+            return []
+        return [order_row(params[0])]
+    return handler
+
+
+def test_etag_covers_joined_services(client, auth_headers, fake_db, order_row):
+    version = {
+        'updated_at': UPDATED_AT, 'status': 'pending', 'total_amount': 100, 'customer_updated_at': UPDATED_AT,
+        'item_count': 1, 'max_item_id': 5, 'item_total': 100, 'item_quantity': 1, 'service_checksum': 12345
+    }
+    connections = fake_db(detail_handler(version, order_row), mobile_order_api)
+
+    response = client.get('/api/mobile/orders/12', headers=auth_headers)
+    assert response.status_code == 200
+    etag = response.headers['ETag']
+    assert 'LEFT JOIN services s' in connections[0].cursors[0].executed[0][0]
+
+    response = client.get('/api/mobile/orders/12', headers=dict(auth_headers, **{'If-None-Match': etag}))
+    assert response.status_code == 304
+
+    # 服务的单位或分类修改：订单和订单项的更新时间、金额都不变
+    version['service_checksum'] = 67890
+    response = client.get('/api/mobile/orders/12', headers=dict(auth_headers, **{'If-None-Match': etag}))
+    assert response.status_code == 200
+    assert response.headers['ETag'] != etag
@@ -0,0 +1,121 @@
+# -*- coding: utf-8 -*-
+"""
+订单号查找：ID达到1000的订单按新订单号和截断格式的旧订单号都能找到
+"""
+
+from datetime import datetime
+
+import pytest
+
+import mobile_order_api
+from search_index import customer_index
+
+TENANT_ID = 7
+CREATED_AT = datetime(2026, 1, 15, 9, 30)
+
+
+def order_numbers_handler(orders):
+    """按SQL中的条件在orders（内存中的order_numbers）上查找"""
+    def handler(sql, params):
+        if 'FROM order_items' in sql:
+            return []
+        if 'n.legacy_order_no = %s' in sql:
+            return [o for o in orders if o['legacy_order_no'] == params[1]]
+        if 'n.order_no = %s' in sql:
+            return [o for o in orders if o['order_no'] == params[1]]
+        if 'n.order_no LIKE %s' in sql:
+            prefix = params[1].rstrip('%')
+            matched = sorted((o for o in orders if o['order_no'].startswith(prefix)), key=lambda o: o['order_no'])
+            return matched[:params[2]]
+        return []
+    return handler
+
+
+@pytest.fixture
+def orders(fake_db, order_row, monkeypatch):
+    monkeypatch.setattr(customer_index, 'search_names', lambda cursor, tenant_id, keyword, limit: ([], False))
+    rows = [order_row(order_id) for order_id in (12, 123, 1234)]
+    fake_db(order_numbers_handler(rows), mobile_order_api)
+    return rows
+
+
+def test_generate_order_no_keeps_full_id():
+    assert mobile_order_api.generate_order_no(12, CREATED_AT) == 'DD20260115012'
+    assert mobile_order_api.generate_order_no(1234, CREATED_AT) == 'DD202601151234'
+
+
+def test_by_no_resolves_new_and_legacy_numbers(client, auth_headers, orders):
+    for order_no in ('DD202601151234', 'dd202601151234', '202601151234'):
+        response = client.get(f'/api/mobile/orders/by-no/{order_no}', headers=auth_headers)
+        assert response.status_code == 200
+        assert response.get_json()['data']['order']['id'] == 1234
+
+    # 旧订单号DD20260115123与ID 123的新订单号相同，新订单号优先
+    response = client.get('/api/mobile/orders/by-no/DD20260115123', headers=auth_headers)
+    assert response.get_json()['data']['order']['id'] == 123
+
+
+def test_by_no_falls_back_to_legacy_number(client, auth_headers, fake_db, order_row, monkeypatch):
+    fake_db(order_numbers_handler([order_row(1234)]), mobile_order_api)
+
+    response = client.get('/api/mobile/orders/by-no/DD20260115123', headers=auth_headers)
+    assert response.status_code == 200
+    data = response.get_json()['data']['order']
+    assert data['id'] == 1234
+    assert data['order_no'] == 'DD202601151234'
+
+
+def test_by_no_ambiguous_legacy_number(client, auth_headers, fake_db, order_row):
+    fake_db(order_numbers_handler([order_row(1234), order_row(1235)]), mobile_order_api)
+
+    response = client.get('/api/mobile/orders/by-no/DD20260115123', headers=auth_headers)
+    assert response.status_code == 409
+    assert response.get_json()['code'] == 'ORDER_NO_AMBIGUOUS'
+
+
+def test_search_finds_order_by_new_and_legacy_numbers(client, auth_headers, orders):
+    response = client.get('/api/mobile/orders/search?keyword=DD202601151234', headers=auth_headers)
+    assert [row['id'] for row in response.get_json()['data']['list']] == [1234]
+
+    response = client.get('/api/mobile/orders/search?keyword=DD20260115123', headers=auth_headers)
+    ids = [row['id'] for row in response.get_json()['data']['list']]
+    assert ids[:2] == [123, 1234]
+
+
+def test_search_keeps_legacy_match_beyond_limit(client, auth_headers, fake_db, order_row, monkeypatch):
+    monkeypatch.setattr(customer_index, 'search_names', lambda cursor, tenant_id, keyword, limit: ([], False))
+    # 前缀DD20260115123匹配的12300等订单号排在DD202601151234之前，LIMIT 1时只有旧订单号查询能找到它
+    fake_db(order_numbers_handler([order_row(1234), order_row(12300)]), mobile_order_api)
+
+    response = client.get('/api/mobile/orders/search?keyword=DD20260115123&limit=1', headers=auth_headers)
+    assert [row['id'] for row in response.get_json()['data']['list']] == [1234]
+
+
+def test_short_order_no_prefix_is_not_an_order_number():
+    assert mobile_order_api.normalize_order_no('DD') is None
+    assert mobile_order_api.normalize_order_no('dd2026') is None
+    assert mobile_order_api.normalize_order_no('2026011') is None
+    assert mobile_order_api.normalize_order_no('dd20260115') == 'DD20260115'
+    assert mobile_order_api.normalize_order_no('202601150') == 'DD202601150'
+
+
+def test_search_short_prefix_uses_customer_names(client, auth_headers, fake_db, order_row, monkeypatch):
+    searched = []
+    monkeypatch.setattr(customer_index, 'search_names',
+                        lambda cursor, tenant_id, keyword, limit: searched.append(keyword) or ([], False))
+    connections = fake_db(order_numbers_handler([order_row(1234)]), mobile_order_api)
+
+    response = client.get('/api/mobile/orders/search?keyword=DD2026', headers=auth_headers)
+    assert response.get_json()['data']['list'] == []
+    assert searched == ['DD2026']
+    assert not any('order_no LIKE' in sql for cursor in connections[0].cursors for sql, _ in cursor.executed)
+
+
+def test_search_reports_truncated_customer_match(client, auth_headers, fake_db, order_row, monkeypatch):
+    monkeypatch.setattr(customer_index, 'search_names', lambda cursor, tenant_id, keyword, limit: ([3], True))
+    fake_db(lambda sql, params: [order_row(12)] if 'o.customer_id IN' in sql else [], mobile_order_api)
+
+    response = client.get('/api/mobile/orders/search?keyword=测试', headers=auth_headers)
+    data = response.get_json()['data']
+    assert [row['id'] for row in data['list']] == [12]
+    assert data['truncated'] is True
@@ -0,0 +1,72 @@
+# -*- coding: utf-8 -*-
+"""
+游标分页：游标编解码，keyset条件在排序字段含NULL时不重不漏
+"""
+
+import sqlite3
+
+import pytest
+
+from pagination import InvalidCursorError, decode_cursor, encode_cursor, keyset_condition
+
+
+@pytest.mark.parametrize('value', [None, '2026-01-15', '100.50', '刘记桃酥', 'a"b\\c'])
+def test_cursor_round_trip(value):
+    cursor = encode_cursor('order_date', 'DESC', value, 42)
+    assert '=' not in cursor
+    assert decode_cursor(cursor, 'order_date', 'DESC') == (value, 42)
+
+
+def test_cursor_rejects_other_sort():
+    cursor = encode_cursor('order_date', 'DESC', '2026-01-15', 42)
+    with pytest.raises(InvalidCursorError):
+        decode_cursor(cursor, 'order_date', 'ASC')
+    with pytest.raises(InvalidCursorError):
+        decode_cursor(cursor, 'total_amount', 'DESC')
+
+
+@pytest.mark.parametrize('cursor', ['', 'not-base64!', encode_cursor('order_date', 'DESC', None, 1)[:-3]])
+def test_cursor_rejects_garbage(cursor):
+    with pytest.raises(InvalidCursorError):
+        decode_cursor(cursor, 'order_date', 'DESC')
+
+
+@pytest.fixture
+def table():
+    # SQLite与MySQL的NULL排序规则相同（ASC时NULL在前，DESC时NULL在后）
+    connection = sqlite3.connect(':memory:')
+    connection.execute('CREATE TABLE orders (id INTEGER PRIMARY KEY, order_date TEXT)')
+    dates = [None, '2026-01-15', None, '2026-01-14', '2026-01-15', '2026-01-16', None, '2026-01-14', '2026-01-15']
+    connection.executemany('INSERT INTO orders (id, order_date) VALUES (?, ?)', list(enumerate(dates, start=1)))
+    yield connection
+    connection.close()
+
+
+def paginate(connection, sort_order, page_size):
+    """按游标逐页读取，返回读到的ID顺序"""
+    order_by = f'ORDER BY order_date {sort_order}, id {sort_order}'
+    seen = []
+    cursor = None
+    while True:
+        where, params = 'WHERE 1 = 1', []
+        if cursor is not None:
+            value, row_id = decode_cursor(cursor, 'order_date', sort_order)
+            condition, params = keyset_condition('order_date', 'id', sort_order, value, row_id)
+            where += f' AND {condition}'
+        rows = connection.execute(
+            f'SELECT id, order_date FROM orders {where.replace("%s", "?")} {order_by} LIMIT ?',
+            params + [page_size]
+        ).fetchall()
+        seen.extend(row[0] for row in rows)
+        if len(rows) < page_size:
+            return seen
+        cursor = encode_cursor('order_date', sort_order, rows[-1][1], rows[-1][0])
+
+
+@pytest.mark.parametrize('sort_order', ['ASC', 'DESC'])
+@pytest.mark.parametrize('page_size', [1, 2, 3, 4, 10])
+def test_keyset_pages_match_full_ordering_with_nulls(table, sort_order, page_size):
+    expected = [row[0] for row in table.execute(
+        f'SELECT id FROM orders ORDER BY order_date {sort_order}, id {sort_order}'
+    )]
+    assert paginate(table, sort_order, page_size) == expected
@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+"""
+区间统计前缀和：任意区间合计与逐日累加一致，增量写入后重算受影响的前缀和
+"""
+
+import random
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+
+import pytest
+
+from range_stats import METRICS, TenantPrefixSums
+
+BASE_DATE = date(2026, 1, 1)
+DAYS = 60
+
+
+def row(day, order_count, amount, updated_at=datetime(2026, 3, 1)):
+    values = {metric: 0 for metric in METRICS}
+    values.update(order_date=day, order_count=order_count, order_amount=Decimal(amount), updated_at=updated_at)
+    return values
+
+
+@pytest.fixture
+def daily():
+    rng = random.Random(3)
+    return {
+        BASE_DATE + timedelta(days=i): (rng.randint(0, 20), Decimal(rng.randint(0, 100000)) / 100)
+        for i in range(DAYS) if rng.random() < 0.7
+    }
+
+
+def brute_force(daily, date_from, date_to):
+    days = [values for day, values in daily.items() if date_from <= day <= date_to]
+    return sum(count for count, _ in days), sum(int(amount * 100) for _, amount in days)
+
+
+def test_totals_match_daily_sums(daily):
+    sums = TenantPrefixSums(BASE_DATE, DAYS)
+    assert sums.apply_rows([row(day, count, amount) for day, (count, amount) in daily.items()])
+
+    rng = random.Random(5)
+    for _ in range(200):
+        start = BASE_DATE + timedelta(days=rng.randint(-5, DAYS + 5))
+        end = start + timedelta(days=rng.randint(0, 40))
+        count, cents = brute_force(daily, start, end)
+        assert sums.total('order_count', start, end) == count
+        assert sums.total('order_amount', start, end) == cents
+
+    assert sums.total('order_count', date.min, date.max - timedelta(days=1)) == sum(c for c, _ in daily.values())
+
+
+def test_incremental_rows_replace_day_values(daily):
+    sums = TenantPrefixSums(BASE_DATE, DAYS)
+    sums.apply_rows([row(day, count, amount) for day, (count, amount) in daily.items()])
+
+    changed_day = BASE_DATE + timedelta(days=10)
+    daily[changed_day] = (99, Decimal('12.34'))
+    # 同一天的完整值重复写入不会重复累加
+    sums.apply_rows([row(changed_day, 99, '12.34')])
+    sums.apply_rows([row(changed_day, 99, '12.34', updated_at=datetime(2026, 3, 2))])
+
+    assert sums.total('order_count', BASE_DATE, BASE_DATE + timedelta(days=DAYS)) == brute_force(
+        daily, BASE_DATE, BASE_DATE + timedelta(days=DAYS))[0]
+    assert sums.watermark == datetime(2026, 3, 2)
+
+
+def test_rows_beyond_array_extend_it():
+    sums = TenantPrefixSums(BASE_DATE, 1)
+    later = BASE_DATE + timedelta(days=30)
+    assert sums.apply_rows([row(BASE_DATE, 1, '1.00'), row(later, 2, '2.00')])
+
+    assert sums.days == 31
+    assert sums.total('order_count', BASE_DATE, later) == 3
+    assert sums.total('order_count', BASE_DATE + timedelta(days=1), later - timedelta(days=1)) == 0
+
+
+def test_rows_before_base_date_need_reload():
+    sums = TenantPrefixSums(BASE_DATE, 10)
+    assert sums.apply_rows([row(BASE_DATE - timedelta(days=1), 1, '1.00')]) is False
+
+
+def test_before_bucket_counts_only_for_ranges_covering_it():
+    sums = TenantPrefixSums(BASE_DATE, 10)
+    sums.set_before(BASE_DATE - timedelta(days=100), {metric: 5 if metric == 'order_count' else 0 for metric in METRICS})
+    sums.apply_rows([row(BASE_DATE, 1, '1.00')])
+
+    assert sums.total('order_count', BASE_DATE, BASE_DATE) == 1
+    assert sums.total('order_count', date.min, BASE_DATE) == 6
+    assert sums.covers(BASE_DATE, BASE_DATE)
+    assert sums.covers(date.min, BASE_DATE - timedelta(days=1))
+    assert not sums.covers(BASE_DATE - timedelta(days=50), BASE_DATE)
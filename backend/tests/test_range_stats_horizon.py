@@ -0,0 +1,145 @@
+# -*- coding: utf-8 -*-
+"""
+区间统计前缀和的保存期限：早期日期合并为一个合计，部分覆盖早期日期的区间查库补齐；
+不限日期的区间计入没有下单日期的订单
+"""
+
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+
+import pytest
+
+import mobile_order_api
+import mobile_statistics_api
+from config import config
+from range_stats import ALL_TIME, METRICS, RangeStatsStore
+
+TODAY = date.today()
+
+
+def summary_row(day, order_count, amount):
+    row = {metric: 0 for metric in METRICS}
+    row.update(order_date=day, order_count=order_count, order_amount=Decimal(amount),
+               updated_at=datetime(2026, 1, 1))
+    return row
+
+
+class SummaryCursor:
+    """按SQL条件在内存中的daily_order_summary上查询"""
+
+    def __init__(self, rows, undated=()):
+        self.rows = rows
+        self.undated = list(undated)
+        self.result = []
+        self.range_queries = 0
+
+    def execute(self, sql, params):
+        if 'order_date IS NULL' in sql:
+            self.result = [self._sum(self.undated)]
+        elif 'MIN(order_date)' in sql:
+            matched = [row for row in self.rows if row['order_date'] < params[1]]
+            self.result = [self._sum(matched, first_date=min((r['order_date'] for r in matched), default=None))]
+        elif 'BETWEEN' in sql:
+            self.range_queries += 1
+            self.result = [self._sum([r for r in self.rows if params[1] <= r['order_date'] <= params[2]])]
+        elif 'order_date >=' in sql:
+            self.result = sorted((r for r in self.rows if r['order_date'] >= params[1]), key=lambda r: r['order_date'])
+        else:
+            self.result = list(self.rows)
+
+    def _sum(self, rows, **extra):
+        total = {metric: sum(row[metric] for row in rows) for metric in METRICS}
+        total['updated_at'] = max((row['updated_at'] for row in rows), default=None)
+        total.update(extra)
+        return total
+
+    def fetchone(self):
+        return self.result[0] if self.result else None
+
+    def fetchall(self):
+        return self.result
+
+    def close(self):
+        pass
+
+
+class SummaryConnection:
+    def __init__(self, cursor):
+        self._cursor = cursor
+
+    def cursor(self, cursor_class=None):
+        return self._cursor
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def store(monkeypatch):
+    monkeypatch.setattr(config, 'RANGE_STATS_HORIZON_DAYS', 30)
+    monkeypatch.setattr('metric_store.file_signature', lambda tenant_id: None)
+    return RangeStatsStore()
+
+
+@pytest.fixture
+def cursor():
+    rows = [
+        summary_row(TODAY - timedelta(days=100), 1, '10.00'),
+        summary_row(TODAY - timedelta(days=60), 2, '20.00'),
+        summary_row(TODAY - timedelta(days=10), 3, '30.00'),
+        summary_row(TODAY, 4, '40.00')
+    ]
+    return SummaryCursor(rows, undated=[summary_row(None, 5, '50.00')])
+
+
+def test_memory_limited_to_horizon(store, cursor):
+    sums = store.get(cursor, 1)
+    assert sums.base_date == TODAY - timedelta(days=29)
+    assert sums.days == 30
+    assert sums.before_from == TODAY - timedelta(days=100)
+
+
+def test_whole_history_from_memory(store, cursor):
+    totals = store.totals(cursor, 1, TODAY - timedelta(days=365), TODAY)
+    assert totals['order_count'] == 10
+    assert totals['order_amount'] == 10000
+    assert cursor.range_queries == 0
+
+
+def test_all_time_includes_undated_orders(store, cursor):
+    totals = store.totals(cursor, 1, *ALL_TIME)
+    assert totals['order_count'] == 15
+    assert totals['order_amount'] == 15000
+    assert cursor.range_queries == 0
+
+
+def test_overview_total_matches_all_time_statistics(store, cursor, monkeypatch):
+    for module in (mobile_order_api, mobile_statistics_api):
+        monkeypatch.setattr(module, 'range_stats', store)
+        monkeypatch.setattr(module, 'get_db_connection', lambda: SummaryConnection(cursor))
+
+    overview = mobile_statistics_api.query_order_overview(1)
+    statistics = mobile_order_api.compute_order_statistics(1, *mobile_order_api.parse_statistics_range({'period': 'all'}))
+    assert overview['today']['order_count'] == 4
+    assert overview['total']['order_count'] == statistics['total_count'] == 15
+    assert overview['total']['total_amount'] == statistics['total_amount']
+
+
+def test_recent_range_from_memory(store, cursor):
+    totals = store.totals(cursor, 1, TODAY - timedelta(days=10), TODAY)
+    assert totals['order_count'] == 7
+    assert cursor.range_queries == 0
+
+
+def test_partial_early_range_queries_summary(store, cursor):
+    totals = store.totals(cursor, 1, TODAY - timedelta(days=70), TODAY - timedelta(days=5))
+    assert totals['order_count'] == 5
+    assert totals['order_amount'] == 5000
+    assert cursor.range_queries == 1
+
+    buckets = store.bucket_totals(cursor, 1, [
+        (TODAY - timedelta(days=120), TODAY - timedelta(days=80)),
+        (TODAY - timedelta(days=79), TODAY - timedelta(days=1)),
+        (TODAY, TODAY)
+    ], ['order_count'])
+    assert buckets == [{'order_count': 1}, {'order_count': 5}, {'order_count': 4}]
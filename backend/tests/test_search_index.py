@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+"""
+客户搜索索引：n-gram倒排表求交集、子串搜索、前缀区间匹配（与逐条比较的结果一致）
+"""
+
+import random
+from array import array
+
+import pytest
+
+from search_index import NgramIndex, PrefixIndex, intersect_postings, normalize_text
+
+WORDS = ['刘记', '桃酥', '饼店', '食品', 'abc', 'ABD', '１２３', '123', '老店', '刘']
+
+
+@pytest.fixture
+def documents():
+    rng = random.Random(7)
+    return [
+        (doc_id, [''.join(rng.sample(WORDS, rng.randint(1, 3))), rng.choice(WORDS + [None, ''])])
+        for doc_id in range(1, 300)
+    ]
+
+
+def test_intersect_postings():
+    assert intersect_postings([array('q', [1, 3, 5, 7]), array('q', [3, 4, 5])]) == [3, 5]
+    assert intersect_postings([array('q', [2]), array('q', range(0, 1000, 2))]) == [2]
+    assert intersect_postings([array('q', [1, 2]), array('q', [3, 4])]) == []
+
+    rng = random.Random(1)
+    for _ in range(50):
+        lists = [sorted(rng.sample(range(500), rng.randint(1, 200))) for _ in range(rng.randint(2, 4))]
+        expected = sorted(set.intersection(*map(set, lists)))
+        assert intersect_postings([array('q', ids) for ids in lists]) == expected
+
+
+@pytest.mark.parametrize('keyword', ['刘', '刘记', '桃酥饼', '记桃', 'ab', 'abd', '123', '１２', '不存在', 'c刘'])
+def test_ngram_search_matches_substring_scan(documents, keyword):
+    index = NgramIndex.build(documents)
+    query = normalize_text(keyword)
+    expected = [
+        doc_id for doc_id, texts in documents
+        if any(query in normalize_text(text) for text in texts)
+    ]
+    assert index.search(keyword) == expected
+
+
+def test_ngram_add_and_remove(documents):
+    index = NgramIndex.build(documents)
+    index.add(1000, ['新桃酥'])
+    index.add(5, ['改名了'])
+    index.remove(6)
+
+    assert 1000 in index.search('新桃')
+    assert index.search('改名') == [5]
+    assert 6 not in (index.search('') or [])
+    assert all(6 not in posting for posting in index.postings.values())
+    assert index.search('') is None
+
+
+@pytest.mark.parametrize('prefix', ['刘', '刘记', '桃', 'ab', 'abd', '12', '不'])
+def test_prefix_match_range(documents, prefix):
+    index = PrefixIndex.build(documents)
+    prefix = normalize_text(prefix)
+    expected = {
+        doc_id for doc_id, texts in documents
+        if any(normalize_text(text).strip().startswith(prefix) for text in texts if text)
+    }
+    assert index.match(prefix) == expected
+
+
+def test_prefix_add_replaces_keys(documents):
+    index = PrefixIndex.build(documents)
+    index.add(3, ['zzz店'])
+    assert index.match('zz') == {3}
+    assert index.texts_of(3) == ['zzz店']
+    assert sorted(doc_id for _, doc_id in index.keys).count(3) == 1
+
+    index.remove(3)
+    assert index.match('zz') == set()
+    assert index.keys == sorted(index.keys)
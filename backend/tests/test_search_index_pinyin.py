@@ -0,0 +1,23 @@
+# -*- coding: utf-8 -*-
+"""
+拼音联想的可选依赖：开启SEARCH_INDEX_PINYIN但未安装pypinyin时给出警告
+"""
+
+import search_index
+from config import config
+
+
+def test_warns_when_pinyin_enabled_without_pypinyin(monkeypatch, capsys):
+    monkeypatch.setattr(search_index, 'lazy_pinyin', None)
+    monkeypatch.setattr(config, 'SEARCH_INDEX_PINYIN', True)
+
+    assert search_index.warn_missing_pinyin() is True
+    assert 'pypinyin' in capsys.readouterr().out
+
+
+def test_no_warning_when_pinyin_disabled(monkeypatch, capsys):
+    monkeypatch.setattr(search_index, 'lazy_pinyin', None)
+    monkeypatch.setattr(config, 'SEARCH_INDEX_PINYIN', False)
+
+    assert search_index.warn_missing_pinyin() is False
+    assert capsys.readouterr().out == ''
@@ -0,0 +1,46 @@
+# -*- coding: utf-8 -*-
+"""
+慢查询EXPLAIN：流式游标的结果未读完时不在同一连接上执行EXPLAIN
+"""
+
+import pymysql
+
+import sql_tracer
+
+
+class ExplainConnection:
+    def __init__(self):
+        self.explained = []
+
+    def cursor(self, cursor_class=None):
+        connection = self
+
+        class Cursor:
+            def execute(self, sql, params=None):
+                connection.explained.append(sql)
+
+            def fetchall(self):
+                return [{'id': 1, 'type': 'ref'}]
+
+            def close(self):
+                pass
+
+        return Cursor()
+
+
+def test_explain_runs_on_buffered_cursor():
+    connection = ExplainConnection()
+    cursor = pymysql.cursors.DictCursor(connection)
+
+    assert sql_tracer._explain(cursor, 'SELECT * FROM orders WHERE id = %s', (1,)) == [{'id': 1, 'type': 'ref'}]
+    assert connection.explained == ['EXPLAIN SELECT * FROM orders WHERE id = %s']
+    cursor.close()
+
+
+def test_explain_skips_unbuffered_cursor():
+    connection = ExplainConnection()
+    for cursor_class in (pymysql.cursors.SSCursor, pymysql.cursors.SSDictCursor):
+        cursor = cursor_class(connection)
+        assert sql_tracer._explain(cursor, 'SELECT * FROM orders', None) == {'skipped': 'unbuffered cursor'}
+        cursor.close()
+    assert connection.explained == []
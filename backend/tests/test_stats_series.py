@@ -0,0 +1,25 @@
+# -*- coding: utf-8 -*-
+"""
+趋势分段：周从周一开始、月从1日开始，首尾两段按实际范围截断
+"""
+
+from datetime import date
+
+from stats_series import aggregate_series, bucket_ranges
+
+
+def test_week_buckets_are_clipped_to_range():
+    assert bucket_ranges(date(2026, 1, 14), date(2026, 1, 27), 'week') == [
+        ('2026-01-14', date(2026, 1, 14), date(2026, 1, 18)),
+        ('2026-01-19', date(2026, 1, 19), date(2026, 1, 25)),
+        ('2026-01-26', date(2026, 1, 26), date(2026, 1, 27))
+    ]
+
+
+def test_month_buckets_feed_series():
+    buckets = bucket_ranges(date(2025, 12, 20), date(2026, 1, 10), 'month')
+    series = aggregate_series(buckets, [{'order_count': 2, 'order_amount': 1050}, {'order_count': 1, 'order_amount': 5}])
+    assert series == [
+        {'date': '2025-12', 'date_from': '2025-12-20', 'date_to': '2025-12-31', 'order_count': 2, 'order_amount': 10.5},
+        {'date': '2026-01', 'date_from': '2026-01-01', 'date_to': '2026-01-10', 'order_count': 1, 'order_amount': 0.05}
+    ]
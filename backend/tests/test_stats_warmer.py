@@ -0,0 +1,59 @@
+# -*- coding: utf-8 -*-
+"""
+统计预热：统计缓存在各worker进程内，每个worker各自预热，预热时刻在抖动时间内随机错开
+"""
+
+import pytest
+
+import stats_warmer
+from config import config
+from stats_warmer import StatsWarmer
+
+
+@pytest.fixture
+def make_warmer():
+    def create(versions):
+        warmer = StatsWarmer()
+        warmer.load_active_tenants = lambda: [1, 2]
+        warmer.load_order_versions = lambda: dict(versions)
+        warmer.warmed = []
+        warmer.warm_tenant = warmer.warmed.append
+        return warmer
+
+    return create
+
+
+def test_every_worker_warms_its_own_cache(make_warmer, monkeypatch):
+    monkeypatch.setattr(config, 'STATS_WARMER_JITTER_SECONDS', 0)
+    invalidated = []
+    monkeypatch.setattr(stats_warmer, 'invalidate_stats', invalidated.append)
+    versions = {1: 5, 2: 7}
+    first, second = make_warmer(versions), make_warmer(versions)
+
+    first.tick()
+    second.tick()
+    assert sorted(first.warmed) == [1, 2]
+    assert sorted(second.warmed) == [1, 2]
+
+    # 订单变化：每个worker都失效并重新预热本进程缓存
+    versions[1] = 6
+    monkeypatch.setattr(config, 'STATS_WARMER_EVENT_JITTER_SECONDS', 0)
+    monkeypatch.setattr(config, 'STATS_WARMER_MIN_INTERVAL_SECONDS', 0)
+    first.tick()
+    second.tick()
+    assert invalidated == [1, 1]
+    assert sorted(first.warmed) == [1, 1, 2]
+    assert sorted(second.warmed) == [1, 1, 2]
+
+
+def test_warmups_spread_over_jitter_window(make_warmer, monkeypatch):
+    monkeypatch.setattr(config, 'STATS_WARMER_JITTER_SECONDS', 600)
+    monkeypatch.setattr(stats_warmer.time, 'monotonic', lambda: 1000.0)
+    draws = iter([30.0, 450.0])
+    monkeypatch.setattr(stats_warmer.random, 'uniform', lambda low, high: next(draws))
+    warmer = make_warmer({})
+
+    warmer.tick()
+    # 预热时刻尚未到达：不在启动时同时访问数据库
+    assert warmer.warmed == []
+    assert sorted(warmer._queue) == [(1030.0, 1), (1450.0, 2)]
@@ -31,3 +31,15 @@ export function getRanking(params) {
     params
   })
 }
+
+/**
+ * 获取首页聚合数据（概览、趋势、排行榜、订单统计一次返回）
+ * @param {Object} params - sections、趋势参数、ranking_type等，见后端接口说明
+ */
+export function getDashboard(params) {
+  return request({
+    url: '/api/mobile/statistics/dashboard',
+    method: 'GET',
+    params
+  })
+}